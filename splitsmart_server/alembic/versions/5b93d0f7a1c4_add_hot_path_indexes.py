@@ -0,0 +1,50 @@
+"""Add foreign-key and composite indexes for hot access paths
+
+Revision ID: 5b93d0f7a1c4
+Revises: d4a7e91c3f06
+Create Date: 2025-12-01 09:27:44.106358
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b93d0f7a1c4'
+down_revision: Union[str, Sequence[str], None] = 'd4a7e91c3f06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, extra kwargs)
+INDEXES = [
+    ('ix_group_members_group_id_user_id', 'group_members', ['group_id', 'user_id'], {}),
+    ('ix_expenses_group_id_expense_date', 'expenses', ['group_id', 'expense_date', 'id'], {}),
+    ('ix_expenses_paid_by_id', 'expenses', ['paid_by_id'], {}),
+    ('ix_expense_splits_expense_id', 'expense_splits', ['expense_id'], {}),
+    ('ix_expense_splits_user_id_expense_id', 'expense_splits', ['user_id', 'expense_id'], {'postgresql_include': ['owed_amount']}),
+    ('ix_payments_group_id_timestamp', 'payments', ['group_id', 'timestamp'], {}),
+    ('ix_payments_paid_by_id', 'payments', ['paid_by_id'], {}),
+    ('ix_payments_paid_to_id', 'payments', ['paid_to_id'], {}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and it avoids
+    # locking out writes on large tables while the index builds.
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+"""Add version to groups
+
+Revision ID: 7f3c9b1d5e28
+Revises: e6b2d8f04a91
+Create Date: 2025-12-08 11:03:52.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3c9b1d5e28'
+down_revision: Union[str, Sequence[str], None] = 'e6b2d8f04a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('groups', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('groups', 'version')
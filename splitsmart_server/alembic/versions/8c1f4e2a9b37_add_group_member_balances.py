@@ -0,0 +1,67 @@
+"""Add group_member_balances ledger
+
+Revision ID: 8c1f4e2a9b37
+Revises: 2371ac577d49
+Create Date: 2025-11-20 10:12:31.482019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4e2a9b37'
+down_revision: Union[str, Sequence[str], None] = '2371ac577d49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('group_member_balances',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_paid', sa.Float(), nullable=False),
+    sa.Column('total_owed', sa.Float(), nullable=False),
+    sa.Column('payments_sent', sa.Float(), nullable=False),
+    sa.Column('payments_received', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+
+    # Backfill the ledger from the existing rows so balances stay correct
+    # for groups created before this migration.
+    op.execute("""
+        INSERT INTO group_member_balances
+            (group_id, user_id, total_paid, total_owed, payments_sent, payments_received)
+        SELECT gm.group_id, gm.user_id,
+               COALESCE(paid.amount, 0), COALESCE(owed.amount, 0),
+               COALESCE(sent.amount, 0), COALESCE(received.amount, 0)
+        FROM group_members gm
+        LEFT JOIN (
+            SELECT group_id, paid_by_id AS user_id, SUM(total_amount) AS amount
+            FROM expenses GROUP BY group_id, paid_by_id
+        ) paid ON paid.group_id = gm.group_id AND paid.user_id = gm.user_id
+        LEFT JOIN (
+            SELECT e.group_id, s.user_id, SUM(s.owed_amount) AS amount
+            FROM expense_splits s JOIN expenses e ON e.id = s.expense_id
+            GROUP BY e.group_id, s.user_id
+        ) owed ON owed.group_id = gm.group_id AND owed.user_id = gm.user_id
+        LEFT JOIN (
+            SELECT group_id, paid_by_id AS user_id, SUM(amount) AS amount
+            FROM payments WHERE status = 'completed' GROUP BY group_id, paid_by_id
+        ) sent ON sent.group_id = gm.group_id AND sent.user_id = gm.user_id
+        LEFT JOIN (
+            SELECT group_id, paid_to_id AS user_id, SUM(amount) AS amount
+            FROM payments WHERE status = 'completed' GROUP BY group_id, paid_to_id
+        ) received ON received.group_id = gm.group_id AND received.user_id = gm.user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('group_member_balances')
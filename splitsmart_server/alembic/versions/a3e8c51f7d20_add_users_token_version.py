@@ -0,0 +1,28 @@
+"""Add token_version to users
+
+Revision ID: a3e8c51f7d20
+Revises: 5b93d0f7a1c4
+Create Date: 2025-12-03 14:12:09.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8c51f7d20'
+down_revision: Union[str, Sequence[str], None] = '5b93d0f7a1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,52 @@
+"""Notification indexes and the users' unread notification counter
+
+Revision ID: b58e0c2d7a49
+Revises: 7f3c9b1d5e28
+Create Date: 2025-12-10 09:27:14.385206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b58e0c2d7a49'
+down_revision: Union[str, Sequence[str], None] = '7f3c9b1d5e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, columns, extra kwargs)
+NOTIFICATION_INDEXES = [
+    ('ix_notifications_user_id_id', ['user_id', 'id'], {}),
+    ('ix_notifications_user_id_id_unread', ['user_id', 'id'], {'postgresql_where': sa.text('NOT is_read')}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+    # Start the counters from whatever unread notifications already exist
+    op.execute(
+        "UPDATE users SET unread_notifications = unread.count "
+        "FROM (SELECT user_id, count(*) AS count FROM notifications WHERE NOT is_read GROUP BY user_id) AS unread "
+        "WHERE users.id = unread.user_id"
+    )
+
+    with op.get_context().autocommit_block():
+        for name, columns, kwargs in NOTIFICATION_INDEXES:
+            op.create_index(
+                name, 'notifications', columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(NOTIFICATION_INDEXES):
+            op.drop_index(name, table_name='notifications', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('users', 'unread_notifications')
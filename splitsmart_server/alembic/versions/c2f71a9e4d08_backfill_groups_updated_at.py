@@ -0,0 +1,39 @@
+"""Backfill groups.updated_at with each group's last activity
+
+Revision ID: c2f71a9e4d08
+Revises: b58e0c2d7a49
+Create Date: 2025-12-11 15:42:08.913527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f71a9e4d08'
+down_revision: Union[str, Sequence[str], None] = 'b58e0c2d7a49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every write to a group now sets its updated_at, which the group summary
+    # reports as the last activity. Groups untouched since then get the time of
+    # their latest expense or payment instead of falling back to creation.
+    op.execute(
+        "UPDATE groups SET updated_at = activity.last_at "
+        "FROM (SELECT group_id, max(at) AS last_at FROM ("
+        "SELECT group_id, created_at AS at FROM expenses "
+        "UNION ALL SELECT group_id, timestamp AS at FROM payments"
+        ") AS events GROUP BY group_id) AS activity "
+        "WHERE groups.id = activity.group_id AND groups.updated_at IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The backfilled values are indistinguishable from real ones; nothing to undo.
+    pass
@@ -0,0 +1,28 @@
+"""Index group_member_balances by user
+
+Revision ID: d4a7e91c3f06
+Revises: 8c1f4e2a9b37
+Create Date: 2025-11-24 16:40:05.913274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e91c3f06'
+down_revision: Union[str, Sequence[str], None] = '8c1f4e2a9b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_group_member_balances_user_id_group_id', 'group_member_balances', ['user_id', 'group_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_group_member_balances_user_id_group_id', table_name='group_member_balances')
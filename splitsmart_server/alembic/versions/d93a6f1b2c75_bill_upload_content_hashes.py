@@ -0,0 +1,48 @@
+"""Content and perceptual hashes on bill uploads for the scan cache
+
+Revision ID: d93a6f1b2c75
+Revises: c2f71a9e4d08
+Create Date: 2025-12-12 10:16:47.204819
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93a6f1b2c75'
+down_revision: Union[str, Sequence[str], None] = 'c2f71a9e4d08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, columns)
+BILL_UPLOAD_INDEXES = [
+    ('ix_bill_uploads_content_sha256', ['content_sha256']),
+    ('ix_bill_uploads_uploader_id_created_at', ['uploader_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bill_uploads', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.add_column('bill_uploads', sa.Column('perceptual_hash', sa.BigInteger(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for name, columns in BILL_UPLOAD_INDEXES:
+            op.create_index(
+                name, 'bill_uploads', columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(BILL_UPLOAD_INDEXES):
+            op.drop_index(name, table_name='bill_uploads', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('bill_uploads', 'perceptual_hash')
+    op.drop_column('bill_uploads', 'content_sha256')
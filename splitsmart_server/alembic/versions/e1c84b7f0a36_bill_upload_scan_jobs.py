@@ -0,0 +1,56 @@
+"""Scan job columns on bill uploads
+
+Revision ID: e1c84b7f0a36
+Revises: d93a6f1b2c75
+Create Date: 2025-12-15 09:42:18.530264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c84b7f0a36'
+down_revision: Union[str, Sequence[str], None] = 'd93a6f1b2c75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('bill_uploads', 'raw_scan_data', existing_type=sa.JSON(), nullable=True)
+    op.add_column('bill_uploads', sa.Column('image_data', sa.LargeBinary(), nullable=True))
+    op.add_column('bill_uploads', sa.Column('image_content_type', sa.String(), nullable=True))
+    op.add_column('bill_uploads', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('bill_uploads', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('bill_uploads', sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_bill_uploads_id_unfinished', 'bill_uploads', ['id'], unique=False,
+            postgresql_where=sa.text("status IN ('pending', 'processing')"),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_bill_uploads_id_unfinished', table_name='bill_uploads',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+    # Unfinished uploads have no result; they end up as failed, with an empty one
+    op.execute(
+        "UPDATE bill_uploads SET raw_scan_data = '{}', status = 'failed' "
+        "WHERE raw_scan_data IS NULL"
+    )
+    op.drop_column('bill_uploads', 'completed_at')
+    op.drop_column('bill_uploads', 'started_at')
+    op.drop_column('bill_uploads', 'attempts')
+    op.drop_column('bill_uploads', 'image_content_type')
+    op.drop_column('bill_uploads', 'image_data')
+    op.alter_column('bill_uploads', 'raw_scan_data', existing_type=sa.JSON(), nullable=False)
@@ -0,0 +1,108 @@
+"""Partial indexes for live expenses and archive tables for archived groups
+
+Revision ID: e6b2d8f04a91
+Revises: a3e8c51f7d20
+Create Date: 2025-12-05 10:48:31.772054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b2d8f04a91'
+down_revision: Union[str, Sequence[str], None] = 'a3e8c51f7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, extra kwargs)
+PARTIAL_INDEXES = [
+    ('ix_expenses_group_id_expense_date_active', 'expenses', ['group_id', 'expense_date', 'id'],
+     {'postgresql_where': sa.text("status = 'active'")}),
+    ('ix_expenses_group_id_expense_date_deleted', 'expenses', ['group_id', 'expense_date', 'id'],
+     {'postgresql_where': sa.text("status = 'deleted'")}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    expense_status = postgresql.ENUM(name='expense_status_enum', create_type=False)
+    split_type = postgresql.ENUM(name='split_type_enum', create_type=False)
+    payment_status = postgresql.ENUM(name='payment_status_enum', create_type=False)
+
+    op.create_table('expenses_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('expense_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('status', expense_status, nullable=False),
+    sa.Column('split_type', split_type, nullable=False),
+    sa.Column('notes', sa.String(), nullable=True),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('paid_by_id', sa.Integer(), nullable=False),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('bill_upload_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_expenses_archive_group_id', 'expenses_archive', ['group_id'], unique=False)
+    op.create_table('expense_splits_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('expense_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('owed_amount', sa.Float(), nullable=False),
+    sa.Column('split_details', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_expense_splits_archive_expense_id', 'expense_splits_archive', ['expense_id'], unique=False)
+    op.create_table('payments_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('payment_method', sa.String(), nullable=True),
+    sa.Column('status', payment_status, nullable=False),
+    sa.Column('notes', sa.String(), nullable=True),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('paid_by_id', sa.Integer(), nullable=False),
+    sa.Column('paid_to_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_payments_archive_group_id', 'payments_archive', ['group_id'], unique=False)
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction, and they avoid
+    # locking out writes on large tables. The full listing index is dropped only
+    # once its partial replacements exist.
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in PARTIAL_INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+        op.drop_index('ix_expenses_group_id_expense_date', table_name='expenses',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_expenses_group_id_expense_date', 'expenses', ['group_id', 'expense_date', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        for name, table, _, _ in reversed(PARTIAL_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.drop_index('ix_payments_archive_group_id', table_name='payments_archive')
+    op.drop_table('payments_archive')
+    op.drop_index('ix_expense_splits_archive_expense_id', table_name='expense_splits_archive')
+    op.drop_table('expense_splits_archive')
+    op.drop_index('ix_expenses_archive_group_id', table_name='expenses_archive')
+    op.drop_table('expenses_archive')
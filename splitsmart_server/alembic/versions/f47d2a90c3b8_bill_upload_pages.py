@@ -0,0 +1,46 @@
+"""Pages of multi-page bill uploads
+
+Revision ID: f47d2a90c3b8
+Revises: e1c84b7f0a36
+Create Date: 2025-12-16 14:05:51.118093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f47d2a90c3b8'
+down_revision: Union[str, Sequence[str], None] = 'e1c84b7f0a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bill_uploads', sa.Column('batch_id', sa.Integer(), nullable=True))
+    op.add_column('bill_uploads', sa.Column('page', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'bill_uploads_batch_id_fkey', 'bill_uploads', 'bill_uploads', ['batch_id'], ['id']
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_bill_uploads_batch_id', 'bill_uploads', ['batch_id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_bill_uploads_batch_id', table_name='bill_uploads',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+    op.drop_constraint('bill_uploads_batch_id_fkey', 'bill_uploads', type_='foreignkey')
+    op.drop_column('bill_uploads', 'page')
+    op.drop_column('bill_uploads', 'batch_id')
@@ -0,0 +1,81 @@
+"""
+Database round trips per authenticated request, with and without the user cache.
+
+Runs the app in-process against the database at DATABASE_URL, registers a user
+with a group and a few expenses, then sends the same authenticated read
+requests twice: once with `crud_user.user_cache` cleared before every request
+(every request looks the user up) and once with it warm. Each request runs
+under a `QueryCounter`, so the numbers are the SQL statements it issued.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.bench_auth_roundtrips --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+from main import app
+from src.crud import crud_user
+from src.db.query_counter import QueryCounter
+from src.db.session import engine
+
+
+async def setup(client: httpx.AsyncClient) -> tuple:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    (await client.post("/api/v1/register", json={"email": email, "password": password})).raise_for_status()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    group = (await client.post("/api/v1/groups/", json={"name": "Benchmark group"}, headers=headers)).json()
+    me = (await client.get("/api/v1/users/me", headers=headers)).json()
+    for i in range(5):
+        (await client.post(
+            f"/api/v1/groups/{group['id']}/expenses",
+            json={"description": f"Expense {i}", "total_amount": 12.5, "paid_by_id": me["id"]},
+            headers=headers,
+        )).raise_for_status()
+    return group["id"], headers
+
+
+async def measure(client: httpx.AsyncClient, paths: list, headers: dict, requests: int, warm: bool) -> tuple:
+    counts, latencies = [], []
+    for i in range(requests):
+        if not warm:
+            crud_user.user_cache.clear()
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            (await client.get(paths[i % len(paths)], headers=headers)).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        counts.append(counter.count)
+    return statistics.fmean(counts), statistics.median(latencies) * 1000
+
+
+async def main(args) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        group_id, headers = await setup(client)
+        paths = [
+            "/api/v1/users/me",
+            f"/api/v1/groups/{group_id}",
+            f"/api/v1/groups/{group_id}/balances",
+            f"/api/v1/groups/{group_id}/expenses",
+        ]
+        cold = await measure(client, paths, headers, args.requests, warm=False)
+        warm = await measure(client, paths, headers, args.requests, warm=True)
+    await engine.dispose()
+
+    print(f"requests per mode: {args.requests}")
+    print(f"user cache off:    {cold[0]:.2f} statements/request  median {cold[1]:.1f} ms")
+    print(f"user cache on:     {warm[0]:.2f} statements/request  median {warm[1]:.1f} ms")
+    print(f"saved:             {cold[0] - warm[0]:.2f} round trips per request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count SQL round trips per authenticated request.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests to send in each mode.")
+    asyncio.run(main(parser.parse_args()))
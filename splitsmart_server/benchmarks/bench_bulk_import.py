@@ -0,0 +1,108 @@
+"""
+Bulk expense import throughput.
+
+Runs the app in-process against the database at DATABASE_URL. It registers a
+few users and puts them in one group, then imports N synthetic expenses
+through `POST /groups/{id}/expenses:bulk` as a single upload (JSON or CSV).
+It reports the time taken and checks that the group's balances still add up
+to zero.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.bench_bulk_import --expenses 100000 --format csv
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from main import app
+from src.db.session import engine
+
+
+async def register(client: httpx.AsyncClient) -> tuple:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    user = (await client.post("/api/v1/register", json={"email": email, "password": password})).json()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+def synthetic_expenses(count: int, member_ids: list) -> list:
+    rng = random.Random(7)
+    start = datetime.now(timezone.utc) - timedelta(days=3 * 365)
+    expenses = []
+    for i in range(count):
+        expense = {
+            "description": f"Imported expense {i}",
+            "total_amount": round(rng.uniform(1, 300), 2),
+            "paid_by_id": rng.choice(member_ids),
+            "category": rng.choice(["food", "travel", "rent", "fun"]),
+            "expense_date": (start + timedelta(minutes=rng.randint(0, 3 * 525_600))).isoformat(),
+        }
+        if i % 3 == 1:
+            expense["split_type"] = "by_shares"
+            expense["splits"] = [{"user_id": uid, "shares": rng.randint(1, 3)} for uid in member_ids]
+        expenses.append(expense)
+    return expenses
+
+
+def to_csv(expenses: list) -> str:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, ["description", "total_amount", "paid_by_id", "category", "expense_date", "split_type", "splits"])
+    writer.writeheader()
+    for expense in expenses:
+        row = {key: value for key, value in expense.items() if key != "splits"}
+        row["splits"] = ";".join(f"{s['user_id']}:{s['shares']}" for s in expense.get("splits", []))
+        writer.writerow(row)
+    return out.getvalue()
+
+
+async def main(args) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        owner, headers = await register(client)
+        group = (await client.post("/api/v1/groups/", json={"name": "Import benchmark"}, headers=headers)).json()
+        member_ids = [owner["id"]]
+        for _ in range(args.members - 1):
+            member, _ = await register(client)
+            (await client.post(f"/api/v1/groups/{group['id']}/members", json={"email": member["email"]}, headers=headers)).raise_for_status()
+            member_ids.append(member["id"])
+
+        expenses = synthetic_expenses(args.expenses, member_ids)
+        if args.format == "csv":
+            content, content_type = to_csv(expenses), "text/csv"
+        else:
+            content, content_type = json.dumps(expenses), "application/json"
+
+        started = time.perf_counter()
+        response = await client.post(
+            f"/api/v1/groups/{group['id']}/expenses:bulk",
+            content=content,
+            headers={**headers, "Content-Type": content_type},
+        )
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        result = response.json()
+
+        balances = (await client.get(f"/api/v1/groups/{group['id']}/balances", headers=headers)).json()
+    await engine.dispose()
+
+    print(f"format:     {args.format} ({len(content) / 1e6:.1f} MB)")
+    print(f"imported:   {result['imported']} expenses, {result['failed']} rejected")
+    print(f"time:       {elapsed:.1f} s ({result['imported'] / elapsed:.0f} expenses/s)")
+    print(f"balances:   sum {sum(b['balance'] for b in balances):.2f} (should be 0.00)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure bulk expense import throughput.")
+    parser.add_argument("--expenses", type=int, default=100_000)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    asyncio.run(main(parser.parse_args()))
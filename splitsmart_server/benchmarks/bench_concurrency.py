@@ -0,0 +1,98 @@
+"""
+Throughput benchmark for the API under many concurrent clients.
+
+Registers a user, creates a group with some expenses, then runs N concurrent
+clients for a fixed duration. Each client loops over the group's read
+endpoints (group, balances, expenses). Reports requests per second and
+latency percentiles.
+
+Run it against a server started the same way before and after a change
+(e.g. `uvicorn main:app --workers 1`) to compare the two:
+
+    python -m benchmarks.bench_concurrency --base-url http://127.0.0.1:8000 --clients 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def setup(client: httpx.AsyncClient, expenses: int) -> tuple:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    (await client.post("/api/v1/register", json={"email": email, "password": password})).raise_for_status()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    group = (await client.post("/api/v1/groups/", json={"name": "Benchmark group"}, headers=headers)).json()
+    me = (await client.get("/api/v1/users/me", headers=headers)).json()
+    for i in range(expenses):
+        (await client.post(
+            f"/api/v1/groups/{group['id']}/expenses",
+            json={
+                "description": f"Expense {i}",
+                "total_amount": 12.5,
+                "paid_by_id": me["id"],
+                "splits": [{"user_id": me["id"], "owed_amount": 12.5}],
+            },
+            headers=headers,
+        )).raise_for_status()
+    return group["id"], headers
+
+
+async def run_client(client: httpx.AsyncClient, paths: list, headers: dict, deadline: float, latencies: list, errors: list) -> None:
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def main(args) -> None:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        group_id, headers = await setup(client, args.expenses)
+        paths = [
+            f"/api/v1/groups/{group_id}",
+            f"/api/v1/groups/{group_id}/balances",
+            f"/api/v1/groups/{group_id}/expenses",
+        ]
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            run_client(client, paths, headers, deadline, latencies, errors) for _ in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float("nan")
+
+    print(f"clients:     {args.clients}")
+    print(f"requests:    {len(latencies)} ok, {len(errors)} failed")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency ms:  p50 {pct(0.50):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}  "
+          f"mean {statistics.fmean(latencies) * 1000 if latencies else float('nan'):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API throughput under concurrent load.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run the load for.")
+    parser.add_argument("--expenses", type=int, default=50, help="Expenses to seed in the benchmark group.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Cost of many idle event subscribers, and how fast an event reaches all of them.
+
+Registers a user with a group, opens N WebSockets to the group's
+`/events` endpoint and leaves them idle for a while. Then posts expenses one
+at a time and measures how long each takes to reach every subscriber. With
+`--server-pid`, also reports the server's resident memory and CPU time as
+read from /proc, before and after the subscribers connect.
+
+Run it against a single worker (`uvicorn main:app --workers 1`), and raise the
+open-files limit of both processes first, e.g. `ulimit -n 20000`. Uvicorn's
+`--ws websockets-sansio` implementation holds about half the memory per idle
+connection of the default one (roughly 70 KB against 130 KB here).
+
+    python -m benchmarks.bench_event_subscribers --base-url http://127.0.0.1:8000 --subscribers 10000 --server-pid 1234
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from typing import Optional
+
+import httpx
+import websockets
+
+CONNECT_BATCH = 500
+
+
+async def setup(client: httpx.AsyncClient) -> tuple:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    response = await client.post("/api/v1/register", json={"email": email, "password": password})
+    response.raise_for_status()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    group = (await client.post("/api/v1/groups/", json={"name": "Benchmark group"}, headers=headers)).json()
+    return group["id"], response.json()["id"], headers, token
+
+
+def process_stats(pid: Optional[int]) -> Optional[tuple]:
+    """(resident MB, CPU seconds) of a local process, from /proc."""
+    if pid is None:
+        return None
+    with open(f"/proc/{pid}/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return rss_kb / 1024, cpu_seconds
+
+
+async def wait_for(connection, event_type: str) -> float:
+    while True:
+        message = await connection.recv()
+        if f'"type": "{event_type}"' in message:
+            return time.perf_counter()
+
+
+def pct(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def main(args) -> None:
+    ws_url = args.base_url.replace("http", "ws", 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        group_id, user_id, headers, token = await setup(client)
+        url = f"{ws_url}/api/v1/groups/{group_id}/events?token={token}"
+
+        before = process_stats(args.server_pid)
+        started = time.perf_counter()
+        connections = []
+        for i in range(0, args.subscribers, CONNECT_BATCH):
+            batch = min(CONNECT_BATCH, args.subscribers - i)
+            connections += await asyncio.gather(*(websockets.connect(url, open_timeout=60) for _ in range(batch)))
+        print(f"connected {len(connections)} subscribers in {time.perf_counter() - started:.1f} s")
+
+        connected = process_stats(args.server_pid)
+        await asyncio.sleep(args.idle)
+        idle = process_stats(args.server_pid)
+        if before:
+            print(f"server RSS {before[0]:.0f} MB -> {idle[0]:.0f} MB "
+                  f"({(idle[0] - before[0]) * 1024 / len(connections):.1f} KB per subscriber)")
+            print(f"server CPU {connected[1] - before[1]:.2f} s connecting, "
+                  f"{idle[1] - connected[1]:.2f} s over {args.idle:.0f} s idle")
+
+        fan_out = []
+        for i in range(args.events):
+            waiters = [asyncio.ensure_future(wait_for(connection, "expense.created")) for connection in connections]
+            posted = time.perf_counter()
+            response = await client.post(
+                f"/api/v1/groups/{group_id}/expenses",
+                json={"description": f"Event {i}", "total_amount": 10, "paid_by_id": user_id},
+                headers=headers,
+            )
+            response.raise_for_status()
+            received = await asyncio.gather(*waiters)
+            fan_out.append(max(received) - posted)
+            print(f"event {i}: first subscriber {(min(received) - posted) * 1000:.0f} ms, "
+                  f"last {(max(received) - posted) * 1000:.0f} ms")
+        print(f"fan-out to all {len(connections)}: p50 {pct(fan_out, 0.5):.0f} ms  max {pct(fan_out, 1):.0f} ms")
+
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure idle event subscribers and event fan-out latency.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--subscribers", type=int, default=10_000, help="WebSockets to open on one group.")
+    parser.add_argument("--events", type=int, default=5, help="Expenses to post once everyone is connected.")
+    parser.add_argument("--idle", type=float, default=10.0, help="Seconds to leave the subscribers idle.")
+    parser.add_argument("--server-pid", type=int, help="Server process to read memory and CPU use from (Linux).")
+    asyncio.run(main(parser.parse_args()))
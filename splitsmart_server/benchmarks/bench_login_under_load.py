@@ -0,0 +1,106 @@
+"""
+Login latency, and its effect on other traffic, during a login burst.
+
+Registers a user with a group, then for a fixed duration runs N clients that
+loop over the group's read endpoints while M other clients log in over and
+over. Reports p50/p99 latency for the logins and for the reads, plus how
+many logins were refused with a 503 by the hashing pool's queue limit.
+
+Run it against a server started the same way before and after a change
+(e.g. `uvicorn main:app --workers 1`) to compare the two:
+
+    python -m benchmarks.bench_login_under_load --base-url http://127.0.0.1:8000 --clients 50 --logins 20
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+async def setup(client: httpx.AsyncClient) -> tuple:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    (await client.post("/api/v1/register", json={"email": email, "password": password})).raise_for_status()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    group = (await client.post("/api/v1/groups/", json={"name": "Benchmark group"}, headers=headers)).json()
+    return group["id"], headers, {"username": email, "password": password}
+
+
+async def run_reader(client: httpx.AsyncClient, paths: list, headers: dict, deadline: float, latencies: list, errors: list) -> None:
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        if response.status_code != 200:
+            errors.append(response.status_code)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_login(client: httpx.AsyncClient, form: dict, deadline: float, latencies: list, errors: list) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/login", data=form)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        if response.status_code != 200:
+            errors.append(response.status_code)
+            if response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def report(name: str, latencies: list, errors: list, elapsed: float) -> None:
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float("nan")
+
+    refused = sum(1 for e in errors if e == 503)
+    print(f"{name:7} {len(latencies) / elapsed:8.1f} ok/s  p50 {pct(0.50):7.1f} ms  p99 {pct(0.99):7.1f} ms  "
+          f"failed {len(errors)} (503: {refused})")
+
+
+async def main(args) -> None:
+    total = args.clients + args.logins
+    limits = httpx.Limits(max_connections=total, max_keepalive_connections=total)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        group_id, headers, form = await setup(client)
+        paths = [
+            f"/api/v1/groups/{group_id}",
+            f"/api/v1/groups/{group_id}/balances",
+            "/api/v1/users/me",
+        ]
+
+        read_latencies, read_errors, login_latencies, login_errors = [], [], [], []
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(run_reader(client, paths, headers, deadline, read_latencies, read_errors) for _ in range(args.clients)),
+            *(run_login(client, form, deadline, login_latencies, login_errors) for _ in range(args.logins)),
+        )
+        elapsed = time.perf_counter() - started
+
+    report("reads", read_latencies, read_errors, elapsed)
+    report("logins", login_latencies, login_errors, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure login and read latency during a login burst.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent clients reading group data.")
+    parser.add_argument("--logins", type=int, default=20, help="Concurrent clients logging in repeatedly.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run the load for.")
+    asyncio.run(main(parser.parse_args()))
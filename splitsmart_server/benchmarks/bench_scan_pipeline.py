@@ -0,0 +1,109 @@
+"""
+Throughput and latency of the whole bill scan pipeline: upload, preprocessing,
+the job queue and the scan, through to a completed upload.
+
+Registers a user, then has N concurrent clients each upload bill photos to
+`POST /scan-bill` (with `refresh=true`, so no scan is served from the cache)
+and poll `GET /bill-uploads/{id}` until it finishes. Reports how long uploads
+took to be accepted, how long until the result was ready, scans per second and
+how many failed.
+
+Run it offline against a server using the fake AI provider, with the delays
+and failure rates to simulate, e.g.
+
+    AI_PROVIDER=fake FAKE_AI_LATENCY_MEDIAN_SECONDS=3 FAKE_AI_ERROR_RATE=0.05 uvicorn main:app --workers 1
+    python -m benchmarks.bench_scan_pipeline --base-url http://127.0.0.1:8000 --clients 20 --scans 200
+"""
+import argparse
+import asyncio
+import io
+import random
+import time
+import uuid
+
+import httpx
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS = ["Pizza", "Beer", "Salad", "Coffee", "Pasta", "Water", "Cake", "Wine", "Bread", "Soup"]
+
+
+async def setup(client: httpx.AsyncClient) -> dict:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    (await client.post("/api/v1/register", json={"email": email, "password": password})).raise_for_status()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def receipt_photo(rng: random.Random) -> bytes:
+    """A phone-sized photo of a made-up printed receipt, different every time."""
+    photo = Image.new("RGB", (1200, 1600), (120, 100, 80))
+    draw = ImageDraw.Draw(photo)
+    draw.rectangle((200, 100, 1000, 1500), fill=(245, 243, 238))
+    font = ImageFont.load_default(size=36)
+    y = 160
+    for _ in range(rng.randint(3, 12)):
+        draw.text((240, y), f"{rng.randint(1, 3)} x {rng.choice(WORDS)}", fill=(20, 20, 20), font=font)
+        draw.text((820, y), f"{rng.uniform(2, 30):.2f}", fill=(20, 20, 20), font=font)
+        y += 60
+    output = io.BytesIO()
+    photo.save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+async def client_loop(client, headers, rng, remaining, results, poll_interval) -> None:
+    while remaining:
+        remaining.pop()
+        photo = receipt_photo(rng)
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/v1/scan-bill", params={"refresh": "true"},
+            files={"file": ("bill.jpg", photo, "image/jpeg")}, headers=headers,
+        )
+        accepted = time.perf_counter()
+        if response.status_code >= 400:
+            results.append((accepted - started, None, "rejected"))
+            continue
+        upload = response.json()
+        while upload["status"] in ("pending", "processing"):
+            await asyncio.sleep(poll_interval)
+            upload = (await client.get(f"/api/v1/bill-uploads/{upload['id']}", headers=headers)).json()
+        results.append((accepted - started, time.perf_counter() - started, upload["status"]))
+
+
+def pct(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else float("nan")
+
+
+async def main(args) -> None:
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=300, limits=limits) as client:
+        headers = await setup(client)
+        remaining = list(range(args.scans))
+        results = []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, headers, random.Random(i), remaining, results, args.poll_interval)
+            for i in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    accepted = [result[0] for result in results]
+    finished = [result[1] for result in results if result[2] == "completed"]
+    statuses = {}
+    for result in results:
+        statuses[result[2]] = statuses.get(result[2], 0) + 1
+    print(f"{args.scans} scans by {args.clients} clients in {elapsed:.1f}s: {len(finished) / elapsed:.1f} completed/s")
+    print(f"  accepted   p50 {pct(accepted, 0.5):7.0f} ms  p95 {pct(accepted, 0.95):7.0f} ms")
+    print(f"  completed  p50 {pct(finished, 0.5):7.0f} ms  p95 {pct(finished, 0.95):7.0f} ms")
+    print("  " + "  ".join(f"{status} {count}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bill scan pipeline end to end.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent uploading clients.")
+    parser.add_argument("--scans", type=int, default=100, help="Total bills to scan.")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Seconds between polls of an upload.")
+    asyncio.run(main(parser.parse_args()))
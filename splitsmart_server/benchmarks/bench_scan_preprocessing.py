@@ -0,0 +1,170 @@
+"""
+Bytes sent, latency and extraction accuracy of bill scans, with and without
+image preprocessing.
+
+Scans every receipt in a fixture directory twice, once as uploaded and once
+after `image_preprocessing.preprocess_bill_image`, through
+`bill_scanner.scan_bill_image` (so the configured AI provider is really called;
+accuracy only means something with a real model, not AI_PROVIDER=fake).
+For each mode it reports the median base64 payload sent, median preprocessing
+and end-to-end latency, how often the grand total was read correctly and the
+share of expected line items that were extracted.
+
+A fixture is an image (`.jpg`, `.jpeg`, `.png` or `.webp`) next to a `.json`
+file of the same name holding the expected `BillScanResponse`. `--generate`
+writes synthetic ones: large, noisy photos of printed receipts on a table,
+some with an EXIF rotation.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.bench_scan_preprocessing --generate fixtures/receipts --count 10
+    python -m benchmarks.bench_scan_preprocessing --fixtures fixtures/receipts
+"""
+import argparse
+import asyncio
+import base64
+import difflib
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from src.core import bill_scanner, image_preprocessing
+from src.core.config import settings
+from src.schemas import scanner as scanner_schema
+
+IMAGE_SUFFIXES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+ITEM_NAMES = [
+    "Margherita pizza", "Peroni", "Caesar salad", "Tiramisu", "Espresso", "Garlic bread",
+    "Sparkling water", "Lasagne", "House red (glass)", "Panna cotta", "Bruschetta", "Risotto",
+]
+
+
+def generate(directory: Path, count: int) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(11)
+    for i in range(count):
+        items = []
+        for name in rng.sample(ITEM_NAMES, rng.randint(3, 8)):
+            quantity = rng.randint(1, 3)
+            unit_price = round(rng.uniform(2, 20), 2)
+            items.append({"item_name": name, "quantity": quantity, "unit_price": unit_price,
+                          "total_price": round(quantity * unit_price, 2)})
+        tax = round(sum(item["total_price"] for item in items) * 0.1, 2)
+        expected = {
+            "line_items": items,
+            "taxes_and_charges": [{"tax_name": "Service charge", "tax_amount": tax}],
+            "grand_total": round(sum(item["total_price"] for item in items) + tax, 2),
+        }
+
+        width, height = 3000, 4000
+        photo = Image.blend(
+            Image.effect_noise((width, height), 40).convert("RGB"), Image.new("RGB", (width, height), (110, 90, 70)), 0.6
+        )
+        draw = ImageDraw.Draw(photo)
+        left, top = rng.randint(500, 900), rng.randint(200, 500)
+        right, bottom = left + rng.randint(1300, 1600), top + rng.randint(2600, 3200)
+        draw.rectangle((left, top, right, bottom), fill=(245, 243, 238))
+        font = ImageFont.load_default(size=64)
+        y = top + 100
+        lines = [(f"{item['quantity']} x {item['item_name']}", item["total_price"]) for item in items]
+        lines += [("Service charge", tax), ("TOTAL", expected["grand_total"])]
+        for text, amount in lines:
+            draw.text((left + 60, y), text, fill=(20, 20, 20), font=font)
+            draw.text((right - 300, y), f"{amount:.2f}", fill=(20, 20, 20), font=font)
+            y += 110
+        photo = photo.filter(ImageFilter.GaussianBlur(1))
+
+        exif = Image.Exif()
+        if i % 2:
+            # Stored sideways, as phones do, with the EXIF tag saying how to turn it
+            photo = photo.rotate(90, expand=True)
+            exif[0x0112] = 6
+        photo.save(directory / f"receipt-{i:03}.jpg", "JPEG", quality=92, exif=exif)
+        (directory / f"receipt-{i:03}.json").write_text(json.dumps(expected, indent=2))
+    print(f"wrote {count} fixtures to {directory}")
+
+
+def load_fixtures(directory: Path) -> list:
+    fixtures = []
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.with_suffix(".json").exists():
+            expected = scanner_schema.BillScanResponse.model_validate_json(path.with_suffix(".json").read_text())
+            fixtures.append((path.name, path.read_bytes(), IMAGE_SUFFIXES[path.suffix.lower()], expected))
+    return fixtures
+
+
+def item_recall(expected: scanner_schema.BillScanResponse, scanned: scanner_schema.BillScanResponse) -> float:
+    """Share of expected line items found with the right total and a similar name."""
+    if not expected.line_items:
+        return 1.0
+    remaining = list(scanned.line_items)
+    found = 0
+    for item in expected.line_items:
+        for candidate in remaining:
+            similar = difflib.SequenceMatcher(None, item.item_name.lower(), candidate.item_name.lower()).ratio() >= 0.8
+            if similar and abs(candidate.total_price - item.total_price) < 0.01:
+                remaining.remove(candidate)
+                found += 1
+                break
+    return found / len(expected.line_items)
+
+
+async def scan(image: bytes, content_type: str, preprocess: bool) -> dict:
+    started = time.perf_counter()
+    if preprocess:
+        prepared = await image_preprocessing.prepare_bill_image(image)
+        image, content_type = prepared.data, prepared.content_type
+    prepared_at = time.perf_counter()
+    try:
+        scanned = scanner_schema.BillScanResponse.model_validate(
+            await bill_scanner.scan_bill_image(image_contents=image, content_type=content_type)
+        )
+    except Exception as e:
+        print(f"  scan failed: {e}")
+        scanned = None
+    return {
+        "payload": len(base64.b64encode(image)),
+        "preprocess": prepared_at - started,
+        "total": time.perf_counter() - started,
+        "scanned": scanned,
+    }
+
+
+async def main(args) -> None:
+    if args.generate:
+        generate(Path(args.generate), args.count)
+        return
+    fixtures = load_fixtures(Path(args.fixtures))
+    if not fixtures:
+        raise SystemExit(f"No fixtures in {args.fixtures}")
+    print(f"{len(fixtures)} fixtures, max dimension {settings.SCAN_IMAGE_MAX_DIMENSION}, "
+          f"{settings.SCAN_IMAGE_FORMAT} quality {settings.SCAN_IMAGE_QUALITY}")
+
+    for preprocess in (False, True):
+        results = []
+        for name, image, content_type, expected in fixtures:
+            result = await scan(image, content_type, preprocess)
+            scanned = result["scanned"]
+            result["total_ok"] = scanned is not None and abs(scanned.grand_total - expected.grand_total) < 0.01
+            result["recall"] = item_recall(expected, scanned) if scanned is not None else 0.0
+            results.append(result)
+        print(
+            f"{'preprocessed' if preprocess else 'original':12}  "
+            f"payload {statistics.median(r['payload'] for r in results) / 1024:8.0f} KB  "
+            f"preprocess {statistics.median(r['preprocess'] for r in results) * 1000:6.0f} ms  "
+            f"end-to-end {statistics.median(r['total'] for r in results) * 1000:7.0f} ms  "
+            f"grand total {sum(r['total_ok'] for r in results)}/{len(results)}  "
+            f"item recall {statistics.mean(r['recall'] for r in results):.0%}"
+        )
+    image_preprocessing.image_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare bill scans with and without image preprocessing.")
+    parser.add_argument("--fixtures", default="fixtures/receipts", help="Directory of receipt images and expected JSON.")
+    parser.add_argument("--generate", metavar="DIR", help="Write synthetic fixtures to DIR instead of benchmarking.")
+    parser.add_argument("--count", type=int, default=10, help="How many fixtures --generate writes.")
+    asyncio.run(main(parser.parse_args()))
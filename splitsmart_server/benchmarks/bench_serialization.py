@@ -0,0 +1,94 @@
+"""
+Serialization cost of a group's expense list.
+
+Builds N in-memory expenses (ORM objects, as the CRUD layer returns them) split
+among the members of one group, and times turning them into a response body:
+
+- fastapi + json:   what a `response_model` route did before, i.e. validate into
+                    models, dump to Python dicts, then `json.dumps` the dicts
+- fastapi + orjson: the same, with `ORJSONResponse` encoding the dicts
+- adapter:          `serialization.json_response`, one pass with a cached TypeAdapter
+- normalized:       the same, in the `shape=normalized` form
+
+No database is needed.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.bench_serialization --expenses 1000 --members 6
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from src.api.endpoints.expenses import _normalized
+from src.core import serialization
+from src.db import models
+from src.schemas import expense as expense_schema
+
+REPEATS = 20
+
+
+def make_expenses(count: int, members: int) -> list:
+    rng = random.Random(3)
+    users = [
+        models.User(id=i, email=f"member-{i}@example.com", full_name=f"Member {i}")
+        for i in range(1, members + 1)
+    ]
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    expenses = []
+    for i in range(1, count + 1):
+        payer = rng.choice(users)
+        total = round(rng.uniform(1, 300), 2)
+        expenses.append(models.Expense(
+            id=i, group_id=1, description=f"Expense {i}", total_amount=total, currency="USD",
+            split_type=models.SplitType.equally, status=models.ExpenseStatus.active,
+            paid_by_id=payer.id, paid_by=payer, created_at=start + timedelta(minutes=i),
+            splits=[
+                models.ExpenseSplit(user_id=user.id, user=user, owed_amount=round(total / members, 2))
+                for user in users
+            ],
+        ))
+    return expenses
+
+
+def fastapi_path(response_class, expenses) -> bytes:
+    adapter = serialization.adapter_for(List[expense_schema.Expense])
+    content = adapter.dump_python(adapter.validate_python(expenses, from_attributes=True), mode="json")
+    return response_class(content).body
+
+
+def time_it(fn) -> tuple:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(body)
+
+
+def main(args) -> None:
+    expenses = make_expenses(args.expenses, args.members)
+    candidates = {
+        "fastapi + json": lambda: fastapi_path(JSONResponse, expenses),
+        "fastapi + orjson": lambda: fastapi_path(ORJSONResponse, expenses),
+        "adapter": lambda: serialization.json_response(List[expense_schema.Expense], expenses).body,
+        "normalized": lambda: serialization.json_response(
+            expense_schema.ExpenseListNormalized, _normalized(expenses)
+        ).body,
+    }
+    print(f"{args.expenses} expenses, {args.members} members each")
+    print(f"{'':>18} {'median ms':>10} {'KB':>10}")
+    for name, fn in candidates.items():
+        median, size = time_it(fn)
+        print(f"{name:>18} {median:>10.2f} {size / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time expense list serialization.")
+    parser.add_argument("--expenses", type=int, default=1_000)
+    parser.add_argument("--members", type=int, default=6)
+    main(parser.parse_args())
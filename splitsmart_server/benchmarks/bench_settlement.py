@@ -0,0 +1,43 @@
+"""
+Micro-benchmark for the settle-up engine in `src.core.settlement`.
+
+Generates random zero-sum group balances and times `simplify_debts` for
+groups of 10, 100, 1,000 and 10,000 members. No database is needed.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.bench_settlement
+"""
+import random
+import statistics
+import time
+
+from src.core.settlement import simplify_debts
+
+GROUP_SIZES = [10, 100, 1_000, 10_000]
+REPEATS = 20
+
+
+def make_balances(members: int, rng: random.Random) -> list:
+    """Random balances in cents that sum to exactly zero, like a real group."""
+    cents = [rng.randint(-50_000, 50_000) for _ in range(members - 1)]
+    cents.append(-sum(cents))
+    return [{"user_id": i, "balance": c / 100} for i, c in enumerate(cents, start=1)]
+
+
+def main() -> None:
+    rng = random.Random(42)
+    print(f"{'members':>8} {'median ms':>10} {'p95 ms':>10} {'transfers':>10}")
+    for size in GROUP_SIZES:
+        balances = make_balances(size, rng)
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            transfers = simplify_debts(balances)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{size:>8} {statistics.median(timings):>10.3f} {p95:>10.3f} {len(transfers):>10}")
+
+
+if __name__ == "__main__":
+    main()
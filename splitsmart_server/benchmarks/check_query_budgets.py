@@ -0,0 +1,163 @@
+"""
+SQL statement budget check for the main API routes.
+
+Runs the app in-process against the database at DATABASE_URL, sets up two groups
+of different sizes (members, expenses and payments) and sends each route's
+request to both under a `QueryCounter` with that route's budget, with the user
+and membership caches cleared first so every lookup is counted. It fails if a
+route issues more statements than its budget, or more for the larger group than
+for the smaller one (an N+1 pattern the budget alone might not catch yet).
+Point it at a scratch database: the users and groups it creates are left behind.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.check_query_budgets
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+
+import httpx
+
+from main import app
+from src.crud import crud_group, crud_user
+from src.db.query_counter import QueryBudgetExceeded, QueryCounter
+from src.db.session import engine
+
+# Most SQL statements each route may issue, cold caches included
+ROUTE_BUDGETS = {
+    "GET /users/me": 1,
+    "GET /users/me/balances": 2,
+    "GET /users/me/notifications": 2,
+    "GET /users/me/notifications/unread-count": 2,
+    "GET /groups/": 3,
+    "GET /groups/summary": 2,
+    "GET /groups/{id}": 5,
+    "GET /groups/{id}/balances": 4,
+    "GET /groups/{id}/settlements": 3,
+    "GET /groups/{id}/expenses": 5,
+    "GET /groups/{id}/expenses?shape=normalized": 5,
+    "GET /groups/{id}/export": 4,
+    "POST /groups/{id}/expenses": 9,
+    "POST /groups/{id}/payments": 7,
+    "DELETE /groups/{id}/expenses/{expense_id}": 8,
+    "POST /groups/{id}/expenses/{expense_id}/restore": 8,
+}
+
+
+async def register(client: httpx.AsyncClient, prefix: str) -> dict:
+    email = f"{prefix}-{uuid.uuid4().hex[:8]}@example.com"
+    password = "budget-check-password"
+    user = (await client.post("/api/v1/register", json={"email": email, "password": password})).raise_for_status().json()
+    token = (await client.post("/api/v1/login", data={"username": email, "password": password})).json()["access_token"]
+    return {"id": user["id"], "email": email, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+async def setup_group(client: httpx.AsyncClient, owner: dict, members: int, expenses: int) -> dict:
+    """A group with `members` members besides the owner, `expenses` expenses and a payment."""
+    group = (await client.post(
+        "/api/v1/groups/", json={"name": f"Budget group ({members} members)"}, headers=owner["headers"]
+    )).raise_for_status().json()
+    others = [await register(client, "budget-member") for _ in range(members)]
+    for member in others:
+        (await client.post(
+            f"/api/v1/groups/{group['id']}/members", json={"email": member["email"]}, headers=owner["headers"]
+        )).raise_for_status()
+    expense_ids = []
+    for i in range(expenses):
+        expense = (await client.post(
+            f"/api/v1/groups/{group['id']}/expenses",
+            json={"description": f"Expense {i}", "total_amount": 30, "paid_by_id": others[i % members]["id"]},
+            headers=owner["headers"],
+        )).raise_for_status().json()
+        expense_ids.append(expense["id"])
+    (await client.post(
+        f"/api/v1/groups/{group['id']}/payments",
+        json={"paid_to_id": owner["id"], "amount": 5}, headers=others[0]["headers"],
+    )).raise_for_status()
+    return {"id": group["id"], "member": others[0], "expense_id": expense_ids[0]}
+
+
+def requests_for(group: dict, owner: dict) -> dict:
+    """(method, path, body, headers) per route, in an order that leaves the group as it found it."""
+    base = f"/api/v1/groups/{group['id']}"
+    expense = f"{base}/expenses/{group['expense_id']}"
+    return {
+        "GET /users/me": ("GET", "/api/v1/users/me", None, owner["headers"]),
+        "GET /users/me/balances": ("GET", "/api/v1/users/me/balances", None, owner["headers"]),
+        "GET /users/me/notifications": ("GET", "/api/v1/users/me/notifications", None, owner["headers"]),
+        "GET /users/me/notifications/unread-count": ("GET", "/api/v1/users/me/notifications/unread-count", None, owner["headers"]),
+        "GET /groups/": ("GET", "/api/v1/groups/", None, owner["headers"]),
+        "GET /groups/summary": ("GET", "/api/v1/groups/summary", None, owner["headers"]),
+        "GET /groups/{id}": ("GET", base, None, owner["headers"]),
+        "GET /groups/{id}/balances": ("GET", f"{base}/balances", None, owner["headers"]),
+        "GET /groups/{id}/settlements": ("GET", f"{base}/settlements", None, owner["headers"]),
+        "GET /groups/{id}/expenses": ("GET", f"{base}/expenses", None, owner["headers"]),
+        "GET /groups/{id}/expenses?shape=normalized": ("GET", f"{base}/expenses?shape=normalized", None, owner["headers"]),
+        "GET /groups/{id}/export": ("GET", f"{base}/export?format=csv", None, owner["headers"]),
+        "POST /groups/{id}/expenses": (
+            "POST", f"{base}/expenses",
+            {"description": "Budget check", "total_amount": 12, "paid_by_id": owner["id"]}, owner["headers"],
+        ),
+        "POST /groups/{id}/payments": (
+            "POST", f"{base}/payments", {"paid_to_id": owner["id"], "amount": 1}, group["member"]["headers"],
+        ),
+        "DELETE /groups/{id}/expenses/{expense_id}": ("DELETE", expense, None, owner["headers"]),
+        "POST /groups/{id}/expenses/{expense_id}/restore": ("POST", f"{expense}/restore", None, owner["headers"]),
+    }
+
+
+async def count_statements(client: httpx.AsyncClient, route: str, request: tuple) -> tuple:
+    """Sends one request under the route's budget. Returns (statement count, QueryBudgetExceeded or None)."""
+    method, path, body, headers = request
+    crud_user.user_cache.clear()
+    crud_group.membership_cache.clear()
+    counter = QueryCounter(budget=ROUTE_BUDGETS[route])
+    try:
+        with counter:
+            (await client.request(method, path, json=body, headers=headers)).raise_for_status()
+    except QueryBudgetExceeded as e:
+        return counter.count, e
+    return counter.count, None
+
+
+async def run(args) -> int:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://budget-check") as client:
+        owner = await register(client, "budget-owner")
+        small = await setup_group(client, owner, members=2, expenses=2)
+        large = await setup_group(client, owner, members=args.members, expenses=args.expenses)
+
+        failures = 0
+        small_requests, large_requests = requests_for(small, owner), requests_for(large, owner)
+        for route in ROUTE_BUDGETS:
+            small_count, small_error = await count_statements(client, route, small_requests[route])
+            large_count, large_error = await count_statements(client, route, large_requests[route])
+            error = small_error or large_error
+            grows = large_count > small_count
+            failures += bool(error or grows)
+            status = "FAIL" if error or grows else "ok"
+            detail = f"{small_count} -> {large_count} statements (budget {ROUTE_BUDGETS[route]})"
+            if grows:
+                detail += ", grows with the group"
+            print(f"[{status}] {route}: {detail}")
+            if error and args.verbose:
+                for statement in error.statements:
+                    print("    " + " ".join(statement.split())[:200])
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Assert the main routes stay within their SQL statement budgets.")
+    parser.add_argument("--members", type=int, default=12, help="Members besides the owner in the larger group.")
+    parser.add_argument("--expenses", type=int, default=30, help="Expenses in the larger group.")
+    parser.add_argument("--verbose", action="store_true", help="Print the statements of routes over budget.")
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
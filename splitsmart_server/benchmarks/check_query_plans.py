@@ -0,0 +1,159 @@
+"""
+Query-plan regression check for the hot read paths.
+
+Seeds a synthetic dataset into the database at DATABASE_URL (PostgreSQL, with
+migrations applied), runs the read functions from `crud_group`, `crud_expense`
+and `crud_user` while capturing the SQL they emit, and EXPLAINs every captured
+statement. It fails if any plan sequentially scans one of the hot tables.
+Everything runs in one transaction that is rolled back, so point it at a
+scratch database but expect no leftovers.
+
+Usage (from the splitsmart_server directory):
+    python -m benchmarks.check_query_plans --expenses 200000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, insert, select, text
+
+from src.crud import crud_balance, crud_expense, crud_group, crud_user
+from src.db import models
+from src.db.session import SessionLocal, engine
+from src.schemas import expense as expense_schema
+
+HOT_TABLES = {"expenses", "expense_splits", "payments", "group_members", "group_member_balances"}
+
+
+async def seed(db, users: int, groups: int, group_size: int, expenses: int) -> None:
+    rng = random.Random(7)
+    await db.execute(insert(models.User), [
+        {"email": f"plan-user-{i}@example.com", "hashed_password": "x", "full_name": f"User {i}",
+         "status": models.UserStatus.active, "default_currency": "USD"}
+        for i in range(users)
+    ])
+    user_ids = list(await db.scalars(select(models.User.id).where(models.User.email.like("plan-user-%"))))
+
+    await db.execute(insert(models.Group), [
+        {"name": f"Plan group {i}", "created_by_id": user_ids[0], "status": models.GroupStatus.active,
+         "default_currency": "USD"}
+        for i in range(groups)
+    ])
+    group_ids = list(await db.scalars(select(models.Group.id).where(models.Group.name.like("Plan group %"))))
+
+    members = {gid: rng.sample(user_ids, group_size) for gid in group_ids}
+    await db.execute(insert(models.group_members_table), [
+        {"group_id": gid, "user_id": uid} for gid, uids in members.items() for uid in uids
+    ])
+
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    batch = 10_000
+    for offset in range(0, expenses, batch):
+        rows = []
+        for _ in range(min(batch, expenses - offset)):
+            gid = rng.choice(group_ids)
+            rows.append({
+                "description": "Synthetic expense", "total_amount": 60.0, "currency": "USD",
+                "category": rng.choice(["food", "travel", "rent", None]),
+                "status": models.ExpenseStatus.active, "split_type": models.SplitType.equally,
+                "group_id": gid, "paid_by_id": rng.choice(members[gid]),
+                "expense_date": start + timedelta(minutes=rng.randint(0, 525_600)),
+            })
+        expense_rows = (await db.execute(
+            insert(models.Expense).returning(models.Expense.id, models.Expense.group_id), rows
+        )).all()
+        await db.execute(insert(models.ExpenseSplit), [
+            {"expense_id": eid, "user_id": uid, "owed_amount": 60.0 / group_size}
+            for eid, gid in expense_rows for uid in members[gid]
+        ])
+
+    await crud_balance.rebuild_balances(db)
+    await db.execute(text("ANALYZE"))
+
+
+async def capture(fn):
+    """Runs `fn` and returns every (statement, parameters) it sent to the database."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        await fn()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def seq_scans(plan: dict) -> set:
+    found = set()
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found |= seq_scans(child)
+    return found
+
+
+async def run(args) -> int:
+    async with SessionLocal() as db:
+        try:
+            await seed(db, args.users, args.groups, args.group_size, args.expenses)
+            group_id = await db.scalar(select(models.Group.id).where(models.Group.name == "Plan group 0"))
+            user_id = await db.scalar(
+                select(models.group_members_table.c.user_id)
+                .where(models.group_members_table.c.group_id == group_id).limit(1)
+            )
+
+            checks = {
+                "crud_group.get_group": lambda: crud_group.get_group(db, group_id=group_id),
+                "crud_group.get_membership": lambda: crud_group.get_membership(db, group_id=group_id, user_id=user_id),
+                "crud_group.get_groups_for_user": lambda: crud_group.get_groups_for_user(db, user_id=user_id),
+                "crud_group.get_group_summaries": lambda: crud_group.get_group_summaries(db, user_id=user_id),
+                "crud_group.get_group_balances": lambda: crud_group.get_group_balances(db, group_id=group_id),
+                "crud_expense.get_expenses_for_group": lambda: crud_expense.get_expenses_for_group(db, group_id=group_id, limit=100),
+                "crud_expense.get_expenses_for_group (deleted)": lambda: crud_expense.get_expenses_for_group(
+                    db, group_id=group_id, limit=100,
+                    filters=expense_schema.ExpenseFilters(status=models.ExpenseStatus.deleted),
+                ),
+                "crud_user.get_user_spending_summary": lambda: crud_user.get_user_spending_summary(db, user_id=user_id),
+                "crud_user.get_user_balances": lambda: crud_user.get_user_balances(db, user_id=user_id),
+            }
+
+            failures = 0
+            connection = await db.connection()
+            for name, fn in checks.items():
+                for statement, parameters in await capture(fn):
+                    explained = (await connection.exec_driver_sql(
+                        "EXPLAIN (FORMAT JSON) " + statement, parameters
+                    )).scalar()
+                    plan = (explained if isinstance(explained, list) else json.loads(explained))[0]["Plan"]
+                    scanned = seq_scans(plan)
+                    status = "FAIL" if scanned else "ok"
+                    failures += bool(scanned)
+                    detail = f" (seq scan on {', '.join(sorted(scanned))})" if scanned else ""
+                    print(f"[{status}] {name}{detail}")
+        finally:
+            await db.rollback()
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Assert the hot queries use index scans.")
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--groups", type=int, default=1_000)
+    parser.add_argument("--group-size", type=int, default=6)
+    parser.add_argument("--expenses", type=int, default=200_000)
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
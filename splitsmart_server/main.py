@@ -1,117 +1,63 @@
-<<<<<<< HEAD
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
 from src.api.api import api_router
+from src.core import ai_providers, image_preprocessing, security
+from src.core.events import event_hub
+from src.core.notifications import notification_service
+from src.core.scan_jobs import scan_queue
+from src.core.config import settings
+from src.db.query_counter import install_query_budget
+from src.db.session import replica_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_checks = None
+    if replica_router.replicas:
+        health_checks = asyncio.create_task(
+            replica_router.run_health_checks(settings.REPLICA_HEALTH_CHECK_SECONDS)
+        )
+    await event_hub.start()
+    await notification_service.start()
+    await scan_queue.start()
+    yield
+    await scan_queue.stop()
+    await notification_service.stop()
+    await event_hub.stop()
+    if health_checks is not None:
+        health_checks.cancel()
+    await replica_router.dispose()
+    security.hash_pool.shutdown()
+    image_preprocessing.image_pool.shutdown()
 
 app = FastAPI(
     title="SplitSmart API",
     description="The backend for the SplitSmart expense splitting application.",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Include the main router with a prefix
 app.include_router(api_router, prefix="/api/v1")
 
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the SplitSmart API!"}
-=======
-# main.py
-import base64
-import openai
-import os
-import json
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from pydantic import BaseModel, Field
-from typing import List
-from dotenv import load_dotenv
-load_dotenv()
-# --- Configuration ---
-# Ensure your OPENAI_API_KEY is set in your environment variables
-client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
-if not client.api_key:
-    raise RuntimeError("OPENAI_API_KEY environment variable not set.")
-
-app = FastAPI(title="Smart Bill Splitter API")
-
-# --- Pydantic Models for Response Validation ---
-class LineItem(BaseModel):
-    item_name: str = Field(..., description="Name of the purchased item")
-    quantity: int = Field(..., description="Quantity of the item")
-    unit_price: float = Field(..., description="Price per unit of the item")
-    total_price: float = Field(..., description="Total price for this line item")
-
-class TaxOrCharge(BaseModel):
-    tax_name: str = Field(..., description="Name of the tax or service charge")
-    tax_amount: float = Field(..., description="Amount of the tax or charge")
+# Fail requests that issue more SQL statements than allowed (tests and local development only)
+if settings.QUERY_BUDGET_PER_REQUEST is not None:
+    install_query_budget(app, budget=settings.QUERY_BUDGET_PER_REQUEST)
 
-class BillScanResponse(BaseModel):
-    line_items: List[LineItem]
-    taxes_and_charges: List[TaxOrCharge]
-    grand_total: float
+@app.exception_handler(security.PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: security.PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in requests right now, please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
 
-# --- The Bulletproof System Prompt ---
-SYSTEM_PROMPT = """
-You are an expert AI data extractor. Your only task is to analyze an image of a bill and extract its contents into a specific JSON format.
-You must adhere to the following rules:
-1. Extract every line item, tax/charge, and the grand total.
-2. Your response must be ONLY the JSON object. Do not include any introductory text, explanations, or markdown like ```json. Just the raw JSON.
-3. The JSON schema must be exactly as follows:
-{
-  "line_items": [{"item_name": "string", "quantity": "integer", "unit_price": "float", "total_price": "float"}],
-  "taxes_and_charges": [{"tax_name": "string", "tax_amount": "float"}],
-  "grand_total": "float"
-}
-"""
+@app.exception_handler(ai_providers.ProviderError)
+async def ai_provider_error_handler(request: Request, exc: ai_providers.ProviderError):
+    return JSONResponse(status_code=503, content={"detail": exc.detail})
 
-@app.post("/scan-bill/", response_model=BillScanResponse)
-async def scan_bill(file: UploadFile = File(...)):
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File provided is not an image.")
-
-    image_contents = await file.read()
-    base64_image = base64.b64encode(image_contents).decode('utf-8')
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            # This is the most important change. It forces the model to output JSON.
-            response_format={"type": "json_object"},  
-            messages=[
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{file.content_type};base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            temperature=0.1,  # <--- NEW: Lower temperature for deterministic output
-            max_tokens=1000
-        )
-        print(response)
-        response_content = response.choices[0].message.content
-        print(response)
-        print(response_content)
-        # The response_content is now guaranteed to be a JSON string
-        bill_data = json.loads(response_content)
-        
-        # Pydantic validates the structure of the JSON
-        validated_data = BillScanResponse(**bill_data)
-        
-        return validated_data
-
-    except json.JSONDecodeError as e:
-        # This error is less likely now but good to keep
-        raise HTTPException(status_code=500, detail=f"AI returned malformed JSON: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
->>>>>>> 360d70f2203c8f276630a0b2d9c94aa975576dfd
+@app.get("/")
+def read_root():
+    return {"message": "Welcome to the SplitSmart API!"}
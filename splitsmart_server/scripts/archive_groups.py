@@ -0,0 +1,44 @@
+"""
+Moves the expenses, splits and payments of archived groups out of the hot tables
+and into the `*_archive` tables. Each group is moved in its own transaction.
+Their balances stay frozen in `group_member_balances`.
+
+Usage (from the splitsmart_server directory):
+    python -m scripts.archive_groups                # every archived group
+    python -m scripts.archive_groups --group-id 42
+"""
+import argparse
+import asyncio
+from typing import Optional
+
+from src.crud import crud_archive
+from src.db.session import SessionLocal, engine
+
+
+async def archive(group_id: Optional[int]) -> None:
+    async with SessionLocal() as db:
+        group_ids = await crud_archive.get_groups_to_archive(db)
+        if group_id is not None:
+            group_ids = [gid for gid in group_ids if gid == group_id]
+        await db.rollback()
+
+        for gid in group_ids:
+            moved = await crud_archive.move_group_to_archive(db, group_id=gid)
+            await db.commit()
+            counts = ", ".join(f"{count} {name}" for name, count in moved.items())
+            print(f"Archived group {gid}: {counts}.")
+    await engine.dispose()
+
+    if not group_ids:
+        print("Nothing to archive.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move archived groups' rows into the archive tables.")
+    parser.add_argument("--group-id", type=int, default=None, help="Only archive this group.")
+    args = parser.parse_args()
+    asyncio.run(archive(args.group_id))
+
+
+if __name__ == "__main__":
+    main()
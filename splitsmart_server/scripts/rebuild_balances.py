@@ -0,0 +1,38 @@
+"""
+Recomputes the `group_member_balances` ledger from the raw expense, split and
+payment rows. Use it after manual data fixes or if the ledger is ever suspected
+to have drifted.
+
+Usage (from the splitsmart_server directory):
+    python -m scripts.rebuild_balances              # every group
+    python -m scripts.rebuild_balances --group-id 42
+"""
+import argparse
+import asyncio
+from typing import Optional
+
+from src.crud import crud_balance
+from src.db.session import SessionLocal, engine
+
+
+async def rebuild(group_id: Optional[int]) -> int:
+    async with SessionLocal() as db:
+        rows = await crud_balance.rebuild_balances(db, group_id=group_id)
+        await db.commit()
+    await engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the group balance ledger.")
+    parser.add_argument("--group-id", type=int, default=None, help="Only rebuild this group.")
+    args = parser.parse_args()
+
+    rows = asyncio.run(rebuild(args.group_id))
+
+    scope = f"group {args.group_id}" if args.group_id is not None else "all groups"
+    print(f"Rebuilt {rows} ledger rows for {scope}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from src.api.endpoints import auth, users, groups , expenses , scanner, payments
+from src.api.endpoints import auth, users, groups , expenses , scanner, payments, events
 
 api_router = APIRouter()
 api_router.include_router(auth.router, tags=["auth"])
@@ -8,4 +8,5 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(groups.router, prefix="/groups", tags=["groups"])
 api_router.include_router(expenses.router, tags=["expenses"]) 
 api_router.include_router(scanner.router, tags=["scanner"])
-api_router.include_router(payments.router, tags=["payments"])
\ No newline at end of file
+api_router.include_router(payments.router, tags=["payments"])
+api_router.include_router(events.router, tags=["events"])
\ No newline at end of file
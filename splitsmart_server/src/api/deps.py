@@ -1,16 +1,17 @@
 from typing import Generator
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db import models
-from src.crud import crud_user
+from src.crud import crud_user, crud_group
 from src.schemas import token as token_schema
 from src.core import security
 from src.core.config import settings
-from src.db.session import get_db
+from src.db.session import SessionLocal, get_db, recent_writers, replica_router
 
 # This tells FastAPI where to look for the token.
 # The tokenUrl should point to our login endpoint.
@@ -18,16 +19,21 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl="/api/v1/login"
 )
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+async def get_current_user(
+    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> models.User:
     """
     Dependency to get the current user from a JWT token.
     1. Decodes the JWT.
     2. Validates the token data.
-    3. Fetches the user from the database.
-    4. Raises an exception if any step fails.
+    3. Fetches the user by the id in `sub`, usually from the user cache.
+    4. Checks the token version and the user's status.
+    5. Raises an exception if any step fails.
     """
+    return await authenticate_token(db, token)
+
+async def authenticate_token(db: AsyncSession, token: str) -> models.User:
+    """The user a JWT access token belongs to (see `get_current_user`)."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -39,11 +45,123 @@ def get_current_user(
             detail="Could not validate credentials",
         )
     
-    user = crud_user.get_user_by_email(db, email=token_data.email)
-    
+    if token_data.sub and token_data.sub.isdigit():
+        user = await crud_user.get_user(db, user_id=int(token_data.sub))
+    else:
+        # Tokens issued before ids were put in `sub` only identify the user by email
+        user = await crud_user.get_user_by_email(db, email=token_data.email)
+
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
-    
-    # You could add a check here for user.status == 'active' if needed
-    
-    return user
\ No newline at end of file
+
+    if (token_data.ver or 0) != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if user.status == models.UserStatus.deactivated:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+
+    return user
+
+async def get_read_db(current_user: models.User = Depends(get_current_user)):
+    """
+    Session dependency for read-only routes. Uses a read replica when one is
+    configured and reachable, and the primary otherwise, or when the user has
+    written something in the last READ_YOUR_WRITES_SECONDS.
+    """
+    session = None
+    if current_user.id not in recent_writers:
+        session = await replica_router.open_session()
+    if session is None:
+        session = SessionLocal()
+    async with session:
+        yield session
+
+async def get_write_db(
+    db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)
+):
+    """
+    Session dependency for routes that write. Always the primary; it also sends
+    the user's reads to the primary for a short while (read-your-writes).
+    """
+    recent_writers.set(current_user.id, True)
+    yield db
+    # Restart the window from the end of the write
+    recent_writers.set(current_user.id, True)
+
+async def require_group_member(
+    group_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> crud_group.GroupHandle:
+    """
+    Dependency for routes under /groups/{group_id}.
+    Ensures the group exists and the current user is a member, using one indexed
+    EXISTS lookup (or the membership cache), and returns a lightweight handle
+    to the group. Routes that need the members load them themselves.
+    """
+    group_exists, group = await crud_group.get_membership(db, group_id=group_id, user_id=current_user.id)
+    if not group_exists:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if group is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this group."
+        )
+    return group
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header value against `etag`."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+async def group_etag(
+    request: Request,
+    response: Response,
+    group: crud_group.GroupHandle = Depends(require_group_member),
+    db: AsyncSession = Depends(get_read_db),
+) -> str:
+    """
+    Dependency for pollable GET routes under /groups/{group_id}.
+    Builds the ETag from the group's version with one primary-key lookup. If the
+    request's If-None-Match matches, answers 304 before the route runs; otherwise
+    sets the ETag on the response and returns it (routes that build their own
+    Response must pass it on).
+    The version is read before the route reads its data, so a response is never
+    labelled with a newer version than its body.
+    """
+    version = await crud_group.get_group_version(db, group_id=group.id)
+    etag = f'W/"{group.id}-{version}"'
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return etag
+
+async def authorize_group_stream(connection: HTTPConnection, group_id: int) -> crud_group.GroupHandle:
+    """
+    Authentication and membership check for the long-lived event streams of a
+    group (WebSocket and server-sent events). Browsers cannot set headers on
+    those, so the token may also come as a `token` query parameter.
+    Uses its own short-lived session: a stream must not hold a pooled
+    connection for as long as it stays open.
+    """
+    token = connection.query_params.get("token")
+    scheme, _, credentials = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        token = credentials
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    async with SessionLocal() as db:
+        user = await authenticate_token(db, token)
+        group_exists, group = await crud_group.get_membership(db, group_id=group_id, user_id=user.id)
+    if not group_exists:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if group is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a member of this group.")
+    return group
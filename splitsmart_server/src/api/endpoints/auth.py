@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 
 from src.schemas import user as user_schema
@@ -7,30 +7,31 @@ from src.schemas import token as token_schema
 from src.crud import crud_user
 from src.api import deps
 from src.core import security
+from src.db import models
 
 router = APIRouter()
 
 @router.post("/register", response_model=user_schema.User)
-def register_user(
+async def register_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: user_schema.UserCreate,
 ):
     """
     Create a new user.
     """
-    user = crud_user.get_user_by_email(db, email=user_in.email)
+    user = await crud_user.get_user_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="A user with this email already exists in the system.",
         )
-    user = crud_user.create_user(db, user=user_in)
+    user = await crud_user.create_user(db, user=user_in)
     return user
 
 @router.post("/login", response_model=token_schema.Token)
-def login_for_access_token(
-    db: Session = Depends(deps.get_db), 
+async def login_for_access_token(
+    db: AsyncSession = Depends(deps.get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
@@ -38,16 +39,24 @@ def login_for_access_token(
     FastAPI's OAuth2PasswordRequestForm requires 'username' and 'password' fields.
     We will treat the 'username' field as the user's email.
     """
-    user = crud_user.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    user = await crud_user.get_user_by_email(db, email=form_data.username)
+    is_valid, new_hash = (False, None)
+    if user:
+        is_valid, new_hash = await security.check_password(form_data.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    if user.status == models.UserStatus.deactivated:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="This account has been deactivated.")
+    if new_hash:
+        # The stored hash was made with an older bcrypt cost factor
+        await crud_user.set_password_hash(db, user=user, hashed_password=new_hash)
+
     access_token = security.create_access_token(
-        data={"sub": user.email, "email": user.email}
+        data={"sub": str(user.id), "email": user.email, "ver": user.token_version}
     )
     return {
         "access_token": access_token,
@@ -0,0 +1,89 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, WebSocketException, status
+from fastapi.responses import StreamingResponse
+
+from src.api import deps
+from src.core.config import settings
+from src.core.events import event_hub
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+router = APIRouter()
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    # Clients have nothing to send; anything they do send is ignored.
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/groups/{group_id}/events")
+async def group_events_websocket(websocket: WebSocket, group_id: int):
+    """
+    Pushes the group's events (new expenses, payments and members, balance
+    deltas) as JSON text messages, replacing polling.
+    - Authenticate with an `Authorization: Bearer` header or a `token` query parameter.
+    - A client that falls too far behind is closed with code 1013 and should
+      reconnect and refetch.
+    """
+    try:
+        group = await deps.authorize_group_stream(websocket, group_id)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+    await websocket.accept()
+
+    with event_hub.subscribe(group.id) as subscription:
+        disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+        disconnected.add_done_callback(lambda _: subscription.close())
+        try:
+            while (message := await subscription.get()) is not None:
+                await websocket.send_text(message[1])
+            if not disconnected.done():
+                # The client fell too far behind; it has to reconnect and refetch.
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except WebSocketDisconnect:
+            # The client went away mid-send
+            pass
+        finally:
+            disconnected.cancel()
+
+
+@router.get("/groups/{group_id}/events")
+async def group_events_stream(request: Request, group_id: int):
+    """
+    The same events as the WebSocket, as server-sent events (`text/event-stream`)
+    for clients that cannot use WebSockets. Each event's `event:` field is its type.
+    - Authenticate with an `Authorization: Bearer` header or a `token` query parameter.
+    - A comment line is sent every SSE_KEEPALIVE_SECONDS while the group is quiet.
+    - A client that falls too far behind has its stream ended and should
+      reconnect and refetch.
+    """
+    group = await deps.authorize_group_stream(request, group_id)
+
+    async def stream():
+        with event_hub.subscribe(group.id) as subscription:
+            # Kept across keepalives: cancelling a pending get could lose an event.
+            next_message = None
+            try:
+                while True:
+                    if next_message is None:
+                        next_message = asyncio.ensure_future(subscription.get())
+                    done, _ = await asyncio.wait({next_message}, timeout=settings.SSE_KEEPALIVE_SECONDS)
+                    if not done:
+                        yield ": keepalive\n\n"
+                        continue
+                    message, next_message = next_message.result(), None
+                    if message is None:
+                        return
+                    event_type, data = message
+                    yield f"event: {event_type}\ndata: {data}\n\n"
+            finally:
+                if next_message is not None:
+                    next_message.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type=SSE_MEDIA_TYPE,
+        # Tell proxies (nginx) not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
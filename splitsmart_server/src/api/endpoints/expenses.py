@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
 
 from src.schemas import expense as expense_schema
 from src.crud import crud_expense, crud_group
 from src.api import deps
 from src.db import models
+from src.core import expense_import, pagination, serialization
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+ExpenseList = List[expense_schema.Expense]
 
 router = APIRouter()
 
 @router.post("/groups/{group_id}/expenses", response_model=expense_schema.Expense)
-def create_expense_for_group(
-    group_id: int,
+async def create_expense_for_group(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_write_db),
     expense_in: expense_schema.ExpenseCreate,
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
@@ -22,43 +29,165 @@ def create_expense_for_group(
     - The current user must be a member of the group.
     - All users involved in the expense (payer and split participants) must be members of the group.
     """
-    group = crud_group.get_group(db=db, group_id=group_id)
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
-
-    # Security check: Ensure the current user is a member of the group
-    if current_user not in group.members:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this group."
-        )
-    
     try:
-        expense = crud_expense.create_expense(db=db, expense_in=expense_in, group=group, creator=current_user)
+        expense = await crud_expense.create_expense(db=db, expense_in=expense_in, group=group, creator=current_user)
         return expense
     except crud_expense.CrudError as e:
         # Catch our custom validation errors and return a user-friendly 400 error
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@router.get("/groups/{group_id}/expenses", response_model=List[expense_schema.Expense])
-def read_group_expenses(
-    group_id: int,
-    db: Session = Depends(deps.get_db),
+@router.post("/groups/{group_id}/expenses:bulk", response_model=expense_schema.ExpenseImportResult)
+async def import_group_expenses(
+    request: Request,
+    atomic: bool = False,
+    db: AsyncSession = Depends(deps.get_write_db),
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
-    Retrieve all expenses for a specific group.
+    Import many expenses into a group in one request, e.g. a history exported from another app.
+    - Send either a JSON array of expenses (`Content-Type: application/json`) or a CSV file
+      (`Content-Type: text/csv`). Each expense takes the same fields as a single new expense,
+      plus optional `expense_date`, `category` and `notes`.
+    - Valid rows are imported together; invalid ones are listed in `errors` by row number.
+    - `atomic=true` imports nothing unless every row is valid.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "application/json")
+    try:
+        if "csv" in content_type:
+            rows, errors = expense_import.parse_csv(body)
+        elif "json" in content_type:
+            rows, errors = expense_import.parse_json(body)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Upload expenses as application/json or text/csv.",
+            )
+    except expense_import.ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+
+    if atomic and errors:
+        imported = 0
+    else:
+        try:
+            imported, row_errors = await crud_expense.import_expenses(
+                db=db, rows=rows, group=group, creator=current_user, atomic=atomic
+            )
+        except crud_expense.CrudError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        errors = sorted(errors + row_errors, key=lambda e: e["row"])
+    return {"imported": imported, "failed": len(errors), "errors": errors}
+
+
+def _normalized(expenses: List[models.Expense]) -> dict:
+    """The `shape=normalized` body: the expenses plus each user they mention, once."""
+    users = {}
+    for expense in expenses:
+        users.setdefault(expense.paid_by_id, expense.paid_by)
+        for split in expense.splits:
+            users.setdefault(split.user_id, split.user)
+    return {"expenses": expenses, "users": list(users.values())}
+
+
+@router.get(
+    "/groups/{group_id}/expenses",
+    response_model=Union[ExpenseList, expense_schema.ExpenseListNormalized],
+)
+async def read_group_expenses(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[str] = None,
+    paid_by_id: Optional[int] = None,
+    participant_id: Optional[int] = None,
+    expense_status: Optional[models.ExpenseStatus] = Query(None, alias="status"),
+    shape: Literal["embedded", "normalized"] = "embedded",
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+    etag: str = Depends(deps.group_etag),
+    db: AsyncSession = Depends(deps.get_read_db),
+):
+    """
+    Retrieve the expenses of a specific group, newest first.
     The current user must be a member of the group.
+    - Pages are `limit` long. When there are more, the `X-Next-Cursor` response header
+      holds the `cursor` to send for the next page.
+    - With `Accept: application/x-ndjson`, every matching expense is streamed instead,
+      one JSON object per line, and `cursor`/`limit` are ignored.
+    - `shape=normalized` returns `{"expenses": [...], "users": [...]}`, where expenses
+      and splits carry user ids and each user is listed once in `users`, instead of
+      embedding the full user in every expense and split. Much smaller for long lists.
+    - Send the `ETag` back as `If-None-Match` to get a `304` while nothing has changed.
     """
-    group = crud_group.get_group(db=db, group_id=group_id)
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
+    filters = expense_schema.ExpenseFilters(
+        start_date=start_date,
+        end_date=end_date,
+        category=category,
+        paid_by_id=paid_by_id,
+        participant_id=participant_id,
+        status=expense_status,
+    )
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        async def ndjson_lines():
+            async for expense in crud_expense.stream_expenses_for_group(db=db, group_id=group.id, filters=filters):
+                yield expense_schema.Expense.model_validate(expense).model_dump_json() + "\n"
+        return StreamingResponse(ndjson_lines(), media_type=NDJSON_MEDIA_TYPE, headers={"ETag": etag, "Vary": "Accept"})
+
+    try:
+        after = pagination.decode_cursor(cursor, size=2) if cursor else None
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+
+    # Fetch one extra row to find out whether there is another page.
+    expenses = await crud_expense.get_expenses_for_group(
+        db=db, group_id=group.id, filters=filters, after=after, limit=limit + 1
+    )
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if len(expenses) > limit:
+        expenses = expenses[:limit]
+        last = expenses[-1]
+        headers["X-Next-Cursor"] = pagination.encode_cursor(last.expense_date, last.id)
+    if shape == "normalized":
+        return serialization.json_response(expense_schema.ExpenseListNormalized, _normalized(expenses), headers)
+    return serialization.json_response(ExpenseList, expenses, headers)
 
-    if current_user not in group.members:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this group."
-        )
 
-    return crud_expense.get_expenses_for_group(db=db, group_id=group_id)
\ No newline at end of file
+@router.delete("/groups/{group_id}/expenses/{expense_id}", response_model=expense_schema.Expense)
+async def delete_group_expense(
+    expense_id: int,
+    db: AsyncSession = Depends(deps.get_write_db),
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+):
+    """
+    Delete an expense. It stops counting towards balances and is hidden from the
+    expense list, but can still be listed with `status=deleted` and restored.
+    """
+    try:
+        expense = await crud_expense.delete_expense(db=db, group=group, expense_id=expense_id)
+    except crud_expense.CrudError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if expense is None:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    return expense
+
+
+@router.post("/groups/{group_id}/expenses/{expense_id}/restore", response_model=expense_schema.Expense)
+async def restore_group_expense(
+    expense_id: int,
+    db: AsyncSession = Depends(deps.get_write_db),
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+):
+    """
+    Restore a deleted expense, so it counts towards balances again.
+    """
+    try:
+        expense = await crud_expense.restore_expense(db=db, group=group, expense_id=expense_id)
+    except crud_expense.CrudError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if expense is None:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    return expense
@@ -1,126 +1,228 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 from src.schemas import balance as balance_schema 
 from src.schemas import group as group_schema
 from src.schemas import user as user_schema
-from src.crud import crud_group, crud_user, crud_expense
+from src.schemas import settlement as settlement_schema
+from src.crud import crud_group, crud_user, crud_expense, crud_export
 from src.api import deps
 from src.db import models
-from src.core import financial_advisor
+from src.core import financial_advisor, ledger_export, pagination, serialization, settlement
 from src.schemas.expense import Expense
 from src.schemas.balance import UserBalance 
 router = APIRouter()
 
 @router.post("/", response_model=group_schema.Group)
-def create_group(
+async def create_group(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_write_db),
     group_in: group_schema.GroupCreate,
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
     Create a new group. The user creating the group is automatically the owner and first member.
     """
-    group = crud_group.create_group_with_owner(db=db, group=group_in, owner=current_user)
+    group = await crud_group.create_group_with_owner(db=db, group=group_in, owner=current_user)
     return group
 
 @router.get("/", response_model=List[group_schema.Group])
-def read_user_groups(
-    db: Session = Depends(deps.get_db),
+async def read_user_groups(
+    include_archived: bool = False,
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
     Retrieve all groups the current user is a member of.
+    Archived groups are only included with `include_archived=true`.
     """
-    groups = crud_group.get_groups_for_user(db=db, user_id=current_user.id)
-    return groups
+    groups = await crud_group.get_groups_for_user(
+        db=db, user_id=current_user.id, include_archived=include_archived
+    )
+    return serialization.json_response(List[group_schema.Group], groups)
 
-@router.get("/{group_id}", response_model=group_schema.Group)
-def read_group(
-    group_id: int,
-    db: Session = Depends(deps.get_db),
+# Declared before `/{group_id}` so "summary" is not taken for a group id.
+@router.get("/summary", response_model=List[group_schema.GroupSummary])
+async def read_user_group_summaries(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    include_archived: bool = False,
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Summarize the current user's groups for the home screen, most recently active
+    first: name, member count, last activity and the current user's balance.
+    One SQL statement however many groups the user is in.
+    - Pages are `limit` long. When there are more, the `X-Next-Cursor` response header
+      holds the `cursor` to send for the next page.
+    - Archived groups are only included with `include_archived=true`.
+    """
+    try:
+        after = pagination.decode_cursor(cursor, size=2) if cursor else None
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+
+    # Fetch one extra row to find out whether there is another page.
+    summaries = await crud_group.get_group_summaries(
+        db, user_id=current_user.id, include_archived=include_archived, after=after, limit=limit + 1
+    )
+    headers = {}
+    if len(summaries) > limit:
+        summaries = summaries[:limit]
+        last = summaries[-1]
+        headers["X-Next-Cursor"] = pagination.encode_cursor(last["last_activity_at"], last["id"])
+    return serialization.json_response(List[group_schema.GroupSummary], summaries, headers)
+
+@router.get("/{group_id}", response_model=group_schema.Group)
+async def read_group(
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+    etag: str = Depends(deps.group_etag),
+    db: AsyncSession = Depends(deps.get_read_db),
 ):
     """
     Retrieve details for a specific group.
     Ensures the current user is a member of the group they are trying to access.
+    Send the `ETag` back as `If-None-Match` to get a `304` while nothing has changed.
     """
-    group = crud_group.get_group(db=db, group_id=group_id)
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
-    
-    if current_user not in group.members:
-        raise HTTPException(status_code=403, detail="Not authorized to access this group")
-        
-    return group
+    return await crud_group.get_group(db=db, group_id=group.id)
 
 @router.post("/{group_id}/members", response_model=group_schema.Group)
-def add_group_member(
-    group_id: int,
+async def add_group_member(
     user_to_add: user_schema.UserBase, # We only need the email to find the user
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    # Security Check: Ensure the user adding a member is part of the group
+    group_handle: crud_group.GroupHandle = Depends(deps.require_group_member),
+    db: AsyncSession = Depends(deps.get_write_db),
 ):
     """
     Add a new member to a group. Only a current member can add others.
     """
-    group = crud_group.get_group(db=db, group_id=group_id)
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
-    
-    # Security Check: Ensure the user adding a member is part of the group
-    if current_user not in group.members:
-        raise HTTPException(status_code=403, detail="Not authorized to add members to this group")
+    try:
+        crud_expense.ensure_group_is_open(group_handle)
+    except crud_expense.CrudError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    group = await crud_group.get_group(db=db, group_id=group_handle.id)
 
     # Find the user to be added by their email
-    user = crud_user.get_user_by_email(db, email=user_to_add.email)
+    user = await crud_user.get_user_by_email(db, email=user_to_add.email)
     if not user:
         raise HTTPException(status_code=404, detail="User to add not found")
 
     # Add the user to the group
-    updated_group = crud_group.add_member_to_group(db=db, group=group, user=user)
+    updated_group = await crud_group.add_member_to_group(db=db, group=group, user=user)
+    if updated_group is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=crud_expense.GROUP_ARCHIVED)
     return updated_group
 
-@router.get("/{group_id}/balances", response_model=List[balance_schema.UserBalance])
-def read_group_balances(
-    group_id: int,
-    db: Session = Depends(deps.get_db),
+@router.post("/{group_id}/archive", response_model=group_schema.Group)
+async def archive_group(
+    group_handle: crud_group.GroupHandle = Depends(deps.require_group_member),
+    db: AsyncSession = Depends(deps.get_write_db),
     current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Archive a group. Only the group's creator can do this.
+    An archived group is read-only: its balances are frozen and it no longer
+    appears in the group list unless asked for.
+    """
+    group = await crud_group.get_group(db=db, group_id=group_handle.id)
+    if group.created_by_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the group's creator can archive it."
+        )
+    if group.status == models.GroupStatus.archived:
+        return group
+    return await crud_group.archive_group(db=db, group_id=group.id)
+
+@router.get("/{group_id}/balances", response_model=List[balance_schema.UserBalance])
+async def read_group_balances(
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+    etag: str = Depends(deps.group_etag),
+    db: AsyncSession = Depends(deps.get_read_db),
 ):
     """
     Retrieve the net balance for each member of a specific group.
     - Positive balance: The group owes this user money.
     - Negative balance: This user owes the group money.
+    Send the `ETag` back as `If-None-Match` to get a `304` while nothing has changed.
     """
-    group = crud_group.get_group(db=db, group_id=group_id)
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
+    balances = await crud_group.get_group_balances(db=db, group_id=group.id)
+    return serialization.json_response(List[balance_schema.UserBalance], balances, headers={"ETag": etag})
 
-    if current_user not in group.members:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this group."
-        )
+@router.get("/{group_id}/settlements", response_model=settlement_schema.SettlementPlan)
+async def read_group_settlements(
+    as_payments: bool = False,
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+    db: AsyncSession = Depends(deps.get_read_db),
+):
+    """
+    Suggest who should pay whom to settle every balance in the group,
+    using close to the minimum number of transfers.
+    - `as_payments=true` also returns each transfer as a ready-to-post payment payload.
+    """
+    balances = await crud_group.get_group_balances(db=db, group_id=group.id)
+    transfers = settlement.simplify_debts(balances)
+    if as_payments:
+        for transfer in transfers:
+            transfer["payment"] = settlement.to_payment_create(transfer, currency=group.default_currency)
 
-    return crud_group.get_group_balances(db=db, group_id=group_id)
+    return {"group_id": group.id, "currency": group.default_currency, "transfers": transfers}
+
+@router.get("/{group_id}/export")
+async def export_group_ledger(
+    format: Literal["csv", "parquet", "arrow"] = "csv",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    since_expense_id: Optional[int] = Query(None, ge=0),
+    since_payment_id: Optional[int] = Query(None, ge=0),
+    include_deleted: bool = False,
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+    db: AsyncSession = Depends(deps.get_read_db),
+):
+    """
+    Download the group's ledger: one row per expense split, then one row per payment.
+    - `format`: `csv`, `parquet` or `arrow` (Arrow IPC stream).
+    - `start_date` / `end_date`: only entries dated in this range.
+    - `since_expense_id` / `since_payment_id`: only expenses/payments with a higher id,
+      for incremental exports. Rows are ordered by id, so pass the highest ids seen last time.
+    - `include_deleted`: also export the splits of deleted expenses (see the `status` column).
+    The file is streamed as it is read from the database.
+    """
+    try:
+        ledger_export.check_format(format)
+    except ledger_export.ExportFormatUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+
+    chunks = crud_export.stream_group_ledger(
+        db=db,
+        group_id=group.id,
+        start_date=start_date,
+        end_date=end_date,
+        since_expense_id=since_expense_id,
+        since_payment_id=since_payment_id,
+        include_deleted=include_deleted,
+        archived=group.status == models.GroupStatus.archived,
+    )
+    return StreamingResponse(
+        ledger_export.encode(format, chunks),
+        media_type=ledger_export.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="group-{group.id}-ledger.{format}"'},
+    )
 
 @router.get("/{group_id}/financial-advice", response_model=str)
 async def get_group_advice(
-    group_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    group: crud_group.GroupHandle = Depends(deps.require_group_member),
+    db: AsyncSession = Depends(deps.get_read_db),
 ):
     """
     Analyzes the group's spending and provides AI-powered financial advice.
     """
-    group = crud_group.get_group(db=db, group_id=group_id)
-    if not group or current_user not in group.members:
-        raise HTTPException(status_code=403, detail="Not authorized to access this group")
-
     # 1. Gather the data from the database
-    expenses_db = crud_expense.get_expenses_for_group(db=db, group_id=group_id)
-    balances_data = crud_group.get_group_balances(db=db, group_id=group_id)
+    expenses_db = await crud_expense.get_expenses_for_group(db=db, group_id=group.id)
+    balances_data = await crud_group.get_group_balances(db=db, group_id=group.id)
     
     # 2. Convert raw data to Pydantic models
     expenses_pydantic = [Expense.model_validate(exp) for exp in expenses_db]
@@ -1,40 +1,139 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api import deps
 from src.db import models
-from src.core import bill_scanner
+from src.core.config import settings
+from src.core.image_preprocessing import InvalidImage
+from src.crud import crud_bill_upload
 from src.schemas import scanner as scanner_schema
 
 router = APIRouter()
 
-@router.post("/scan-bill", response_model=scanner_schema.BillScanResponse)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+# How often clients are asked to poll an unfinished scan
+SCAN_POLL_SECONDS = 2
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Reads an upload in chunks, refusing it with a 413 as soon as it is known to
+    be larger than `max_bytes` rather than after reading all of it.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"The image is too large. The limit is {max_bytes // (1024 * 1024)} MB.",
+    )
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+    contents = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        contents += chunk
+        if len(contents) > max_bytes:
+            raise too_large
+    return bytes(contents)
+
+def ensure_image(file: UploadFile) -> None:
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Invalid file type. Please upload an image."
+        )
+
+@router.post("/scan-bill", response_model=scanner_schema.BillUpload, status_code=status.HTTP_202_ACCEPTED)
 async def scan_bill_endpoint(
     *,
     file: UploadFile = File(...),
+    refresh: bool = False,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_write_db),
     # This dependency ensures that only logged-in users can use the scanner.
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
-    Accepts an image file of a bill, processes it with the AI model,
-    and returns the structured itemized data.
+    Accepts an image file of a bill and queues it to be scanned by the AI model,
+    returning the new upload (202) without waiting for the scan. Poll
+    `GET /bill-uploads/{id}` (the `Location` header) until its `status` is
+    `completed` or `failed`; the uploader also gets a notification when it is done.
+    - An image scanned before (the same file, or a near-identical photo of the same
+      bill taken by someone sharing a group with you) is completed straight away
+      (200) without calling the model. The `X-Scan-Cache` header says which: `hit`,
+      `similar` or `miss`.
+    - Uploading the same file again while its scan is queued returns that upload.
+    - `refresh=true` always scans the image again.
+    - Images over SCAN_MAX_UPLOAD_BYTES are refused with a 413, and files that
+      are not images with a 400.
     """
-    if not file.content_type or not file.content_type.startswith("image/"):
+    ensure_image(file)
+    image_contents = await read_upload(file, max_bytes=settings.SCAN_MAX_UPLOAD_BYTES)
+    try:
+        upload, cache_status = await crud_bill_upload.create_scan(
+            db, image_contents=image_contents, uploader=current_user, refresh=refresh,
+        )
+    except InvalidImage as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+    if upload.status == models.BillUploadStatus.completed:
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = str(request.url_for("read_bill_upload", upload_id=upload.id))
+    response.headers["X-Scan-Cache"] = cache_status
+    return upload
+
+@router.post("/scan-bills", response_model=scanner_schema.BillUpload, status_code=status.HTTP_202_ACCEPTED)
+async def scan_bill_pages_endpoint(
+    *,
+    files: List[UploadFile] = File(...),
+    refresh: bool = False,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_write_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Accepts several photos of one bill (a long receipt, a multi-page invoice), in
+    order, and queues them to be scanned side by side. Returns the new upload (202),
+    to poll like a single scan: once every page has finished, its `result` is the
+    pages' results merged into one, with line items repeated where photos overlap
+    kept once, and `pages` has each page's own.
+    - Pages scanned before are reused, as with `POST /scan-bill`. If all of them
+      are, the upload is completed straight away (200).
+    - If only some pages can be scanned, the upload is `review_needed`, with the
+      merged result of those that could.
+    - At most SCAN_BATCH_MAX_PAGES photos, each within SCAN_MAX_UPLOAD_BYTES (413).
+    """
+    if len(files) > settings.SCAN_BATCH_MAX_PAGES:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="Invalid file type. Please upload an image."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many pages. Upload at most {settings.SCAN_BATCH_MAX_PAGES} photos of a bill.",
         )
-    
+    for file in files:
+        ensure_image(file)
+    images = [await read_upload(file, max_bytes=settings.SCAN_MAX_UPLOAD_BYTES) for file in files]
     try:
-        image_contents = await file.read()
-        # Call our decoupled core logic function
-        scanned_data = await bill_scanner.scan_bill_image(
-            image_contents=image_contents, content_type=file.content_type
+        upload = await crud_bill_upload.create_batch_scan(
+            db, images=images, uploader=current_user, refresh=refresh,
         )
-        # Pydantic automatically validates the AI's response against our schema
-        return scanned_data
-    except Exception as e:
-        # Catch any potential errors from the AI or processing
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-            detail=f"Failed to process bill image: {str(e)}"
-        )
\ No newline at end of file
+    except InvalidImage as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+    if upload.status not in (models.BillUploadStatus.pending, models.BillUploadStatus.processing):
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = str(request.url_for("read_bill_upload", upload_id=upload.id))
+    return upload
+
+@router.get("/bill-uploads/{upload_id}", response_model=scanner_schema.BillUpload)
+async def read_bill_upload(
+    upload_id: int,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Get one of your bill uploads, to poll its scan. While it is queued or
+    running, `Retry-After` suggests when to ask again.
+    """
+    upload = await crud_bill_upload.get_bill_upload(db, upload_id=upload_id, uploader_id=current_user.id)
+    if upload is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill upload not found")
+    if upload.status in (models.BillUploadStatus.pending, models.BillUploadStatus.processing):
+        response.headers["Retry-After"] = str(SCAN_POLL_SECONDS)
+    return upload
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas import user as user_schema
+from src.schemas import balance as balance_schema
+from src.schemas import notification as notification_schema
 from src.api import deps
 from src.db import models
-from src.core import financial_advisor
-from src.crud import crud_user
+from src.core import financial_advisor, pagination, serialization
+from src.crud import crud_user, crud_notification
 
 router = APIRouter()
 
 @router.get("/me", response_model=user_schema.User)
-def read_users_me(
+async def read_users_me(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
@@ -18,16 +21,105 @@ def read_users_me(
     """
     return current_user
 
+@router.put("/me", response_model=user_schema.User)
+async def update_user_me(
+    user_in: user_schema.UserUpdate,
+    db: AsyncSession = Depends(deps.get_write_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Update the current user. Changing the password signs out every existing token.
+    """
+    if user_in.email and user_in.email != current_user.email:
+        if await crud_user.get_user_by_email(db, email=user_in.email):
+            raise HTTPException(
+                status_code=400,
+                detail="A user with this email already exists in the system.",
+            )
+    return await crud_user.update_user(db, user_id=current_user.id, user_in=user_in)
+
+@router.delete("/me", response_model=user_schema.User)
+async def deactivate_user_me(
+    db: AsyncSession = Depends(deps.get_write_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Deactivate the current user's account. Existing tokens stop working at once on this
+    worker, and on the others within USER_CACHE_TTL_SECONDS.
+    """
+    return await crud_user.deactivate_user(db, user_id=current_user.id)
+
+@router.get("/me/balances", response_model=balance_schema.UserNetBalance)
+async def read_my_balances(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Get the current user's balance in each of their groups and their net balance in each currency.
+    - Positive balance: The user is owed money.
+    - Negative balance: The user owes money.
+    """
+    return await crud_user.get_user_balances(db=db, user_id=current_user.id)
+
+@router.get("/me/notifications", response_model=List[notification_schema.Notification])
+async def read_my_notifications(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    unread_only: bool = False,
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Get the current user's notifications, newest first.
+    - Pages are `limit` long. When there are more, the `X-Next-Cursor` response header
+      holds the `cursor` to send for the next page.
+    - Notifications are written shortly after the change they are about, not with it.
+    """
+    try:
+        after = pagination.decode_cursor(cursor, size=1)[0] if cursor else None
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.detail)
+
+    # Fetch one extra row to find out whether there is another page.
+    notifications = await crud_notification.get_notifications_for_user(
+        db, user_id=current_user.id, unread_only=unread_only, after=after, limit=limit + 1
+    )
+    headers = {}
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        headers["X-Next-Cursor"] = pagination.encode_cursor(notifications[-1].id)
+    return serialization.json_response(List[notification_schema.Notification], notifications, headers)
+
+@router.get("/me/notifications/unread-count", response_model=notification_schema.UnreadCount)
+async def read_my_unread_count(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Get how many of the current user's notifications are unread, for the badge.
+    """
+    return {"unread": await crud_notification.get_unread_count(db, user_id=current_user.id)}
+
+@router.post("/me/notifications/read-all", response_model=notification_schema.NotificationsMarkedRead)
+async def mark_my_notifications_read(
+    db: AsyncSession = Depends(deps.get_write_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Mark all of the current user's notifications as read.
+    """
+    return {"marked": await crud_notification.mark_all_read(db, user_id=current_user.id)}
+
 @router.get("/me/financial-advice", response_model=str)
 async def get_my_advice(
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """
     Analyzes the current user's spending across all groups and provides personalized advice.
     """
     # 1. Gather the data
-    spending_summary = crud_user.get_user_spending_summary(db=db, user_id=current_user.id)
+    spending_summary = await crud_user.get_user_spending_summary(db=db, user_id=current_user.id)
     
     # 2. Call the AI
     advice = await financial_advisor.get_user_financial_advice(user_spending_summary=spending_summary)
@@ -0,0 +1,202 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import random
+from typing import Optional
+
+import openai
+
+from src.core import receipt_ocr
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- AI Providers ---
+# Bill scans and financial advice go through a provider chosen by AI_PROVIDER:
+# the OpenAI API, or a fake that answers locally for load tests and offline
+# development. With SCAN_OCR_FIRST, scans try local OCR before the provider.
+# The prompts belong to the callers (`bill_scanner`, `financial_advisor`); the
+# fake ignores them.
+
+FAKE_ITEM_NAMES = [
+    "Margherita pizza", "Peroni", "Caesar salad", "Tiramisu", "Espresso", "Garlic bread",
+    "Sparkling water", "Lasagne", "House red (glass)", "Panna cotta", "Bruschetta", "Risotto",
+]
+
+
+class ProviderError(Exception):
+    """Raised when a provider cannot answer."""
+    def __init__(self, detail: str):
+        self.detail = detail
+        super().__init__(detail)
+
+
+class OpenAIProvider:
+    """The OpenAI API. The client is created on first use, so nothing needs a key until then."""
+    def __init__(self, api_key: Optional[str], scan_model: str, advisor_model: str):
+        self.api_key = api_key
+        self.scan_model = scan_model
+        self.advisor_model = advisor_model
+        self._client: Optional[openai.AsyncOpenAI] = None
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        if self._client is None:
+            if not self.api_key:
+                raise ProviderError("OPENAI_API_KEY is not set.")
+            self._client = openai.AsyncOpenAI(api_key=self.api_key)
+        return self._client
+
+    async def _complete(self, **request):
+        try:
+            return await self.client.chat.completions.create(**request)
+        except openai.OpenAIError:
+            logger.warning("OpenAI request failed", exc_info=True)
+            raise ProviderError("The AI provider could not answer, please retry shortly.")
+
+    async def scan_bill(self, image_contents: bytes, content_type: str, instructions: str) -> dict:
+        base64_image = base64.b64encode(image_contents).decode('utf-8')
+        response = await self._complete(
+            model=self.scan_model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": instructions},
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": f"data:{content_type};base64,{base64_image}"}
+                        }
+                    ]
+                }
+            ],
+            temperature=0.1,
+            max_tokens=1500
+        )
+        return json.loads(response.choices[0].message.content)
+
+    async def advise(self, instructions: str, prompt: str) -> str:
+        response = await self._complete(
+            model=self.advisor_model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.6,
+            max_tokens=500
+        )
+        return response.choices[0].message.content
+
+
+class FakeProvider:
+    """
+    Answers locally after a simulated delay. What it answers depends only on the
+    input: a scan returns a made-up bill that adds up, derived from the image's
+    bytes. Delays (lognormal around `latency_median`) and failures are drawn from
+    a generator seeded with `seed`, so the same calls in the same order see the
+    same ones. A share `error_rate` of calls raise ProviderError, and a further
+    `malformed_rate` of scans return a bill without its total.
+    """
+    def __init__(
+        self,
+        latency_median: float,
+        latency_sigma: float,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self._random = random.Random(seed)
+
+    async def _answer(self) -> bool:
+        """Waits out the call's delay, raises if it fails, and says whether to answer malformed."""
+        delay = self._random.lognormvariate(math.log(self.latency_median), self.latency_sigma) \
+            if self.latency_median > 0 else 0
+        roll = self._random.random()
+        await asyncio.sleep(delay)
+        if roll < self.error_rate:
+            raise ProviderError("Simulated provider error.")
+        return roll < self.error_rate + self.malformed_rate
+
+    async def scan_bill(self, image_contents: bytes, content_type: str, instructions: str) -> dict:
+        malformed = await self._answer()
+        bill = random.Random(hashlib.sha256(image_contents).digest())
+        line_items = []
+        for name in bill.sample(FAKE_ITEM_NAMES, bill.randint(2, 8)):
+            quantity = bill.randint(1, 3)
+            unit_price = round(bill.uniform(2, 20), 2)
+            line_items.append({
+                "item_name": name,
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "total_price": round(quantity * unit_price, 2),
+            })
+        subtotal = round(sum(item["total_price"] for item in line_items), 2)
+        taxes = [{"tax_name": "Service charge", "tax_amount": round(subtotal * 0.1, 2)}]
+        result = {"line_items": line_items, "taxes_and_charges": taxes}
+        if not malformed:
+            result["grand_total"] = round(subtotal + taxes[0]["tax_amount"], 2)
+        return result
+
+    async def advise(self, instructions: str, prompt: str) -> str:
+        await self._answer()
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        return (f"(Simulated advice {digest}.) Your group is doing well: settle up regularly "
+                f"and keep an eye on your largest category of spending.")
+
+
+class OCRFirstProvider:
+    """
+    Reads bills with local OCR, and passes those it can't read reliably, and all
+    advice, to `fallback`.
+    """
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    async def scan_bill(self, image_contents: bytes, content_type: str, instructions: str) -> dict:
+        try:
+            result = await receipt_ocr.scan_receipt(image_contents)
+        except Exception:
+            logger.exception("Local OCR failed, falling back to the provider")
+            result = None
+        if result is not None:
+            return result
+        return await self.fallback.scan_bill(image_contents, content_type, instructions)
+
+    async def advise(self, instructions: str, prompt: str) -> str:
+        return await self.fallback.advise(instructions, prompt)
+
+
+def _create_provider():
+    if settings.AI_PROVIDER == "fake":
+        provider = FakeProvider(
+            latency_median=settings.FAKE_AI_LATENCY_MEDIAN_SECONDS,
+            latency_sigma=settings.FAKE_AI_LATENCY_SIGMA,
+            error_rate=settings.FAKE_AI_ERROR_RATE,
+            malformed_rate=settings.FAKE_AI_MALFORMED_RATE,
+            seed=settings.FAKE_AI_SEED,
+        )
+    else:
+        provider = OpenAIProvider(
+            api_key=settings.OPENAI_API_KEY,
+            scan_model=settings.OPENAI_SCAN_MODEL,
+            advisor_model=settings.OPENAI_ADVISOR_MODEL,
+        )
+    if settings.SCAN_OCR_FIRST:
+        try:
+            receipt_ocr.check_available()
+        except receipt_ocr.OCRUnavailable as e:
+            logger.warning("SCAN_OCR_FIRST is set, but %s Scanning every bill with the provider.", e.detail)
+        else:
+            provider = OCRFirstProvider(provider)
+    return provider
+
+
+ai_provider = _create_provider()
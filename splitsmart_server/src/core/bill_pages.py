@@ -0,0 +1,91 @@
+import difflib
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from src.db import models
+from src.schemas import scanner as scanner_schema
+
+# --- Multi-Page Bills ---
+# A long receipt is photographed in several overlapping pages, top to bottom.
+# Their scans are merged into one: a run of line items at the top of a page that
+# repeats the bottom of the page before it is the overlap, and kept once. Items
+# repeating anywhere else are kept, since a bill can list the same thing twice.
+# Taxes and charges are never listed twice, so repeats of those are dropped
+# wherever they are. The grand total is the one printed last.
+
+# Item names read from two photos of the same line can differ by a character or two
+SIMILAR_NAME_RATIO = 0.8
+
+Status = models.BillUploadStatus
+UNFINISHED = (Status.pending, Status.processing)
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def _same_item(a: scanner_schema.LineItem, b: scanner_schema.LineItem) -> bool:
+    if abs(a.total_price - b.total_price) >= 0.005:
+        return False
+    return difflib.SequenceMatcher(None, _normalize(a.item_name), _normalize(b.item_name)).ratio() >= SIMILAR_NAME_RATIO
+
+
+def _overlap(previous: List[scanner_schema.LineItem], page: List[scanner_schema.LineItem]) -> int:
+    """How many of the first items of `page` repeat the last items of `previous`."""
+    for size in range(min(len(previous), len(page)), 0, -1):
+        if all(_same_item(a, b) for a, b in zip(previous[-size:], page[:size])):
+            return size
+    return 0
+
+
+def merge_pages(pages: Sequence[scanner_schema.BillScanResponse]) -> scanner_schema.BillScanResponse:
+    """Merges the scans of a bill's pages, in order, into one."""
+    line_items: List[scanner_schema.LineItem] = []
+    previous: List[scanner_schema.LineItem] = []
+    for page in pages:
+        line_items.extend(page.line_items[_overlap(previous, page.line_items):])
+        if page.line_items:
+            previous = page.line_items
+
+    taxes: List[scanner_schema.TaxOrCharge] = []
+    seen = set()
+    for page in pages:
+        for tax in page.taxes_and_charges:
+            key = (_normalize(tax.tax_name), round(tax.tax_amount, 2))
+            if key not in seen:
+                seen.add(key)
+                taxes.append(tax)
+
+    # Pages without a total read it as 0
+    totals = [page.grand_total for page in pages if page.grand_total]
+    grand_total = totals[-1] if totals else round(
+        sum(item.total_price for item in line_items) + sum(tax.tax_amount for tax in taxes), 2
+    )
+    return scanner_schema.BillScanResponse(line_items=line_items, taxes_and_charges=taxes, grand_total=grand_total)
+
+
+def batch_outcome(pages: Sequence[Tuple[Status, Optional[dict]]]) -> Optional[dict]:
+    """
+    The columns to set on a multi-page upload given its pages' (status, result),
+    in page order, or None while any page is still unfinished. With every page
+    scanned it is completed; with only some, review_needed, holding what the
+    scanned pages merge to; with none, failed.
+    """
+    if any(status in UNFINISHED for status, _ in pages):
+        return None
+    results = [
+        scanner_schema.BillScanResponse.model_validate(result)
+        for status, result in pages
+        if status == Status.completed
+    ]
+    outcome = {"completed_at": datetime.now(timezone.utc)}
+    if not results:
+        return {**outcome, "status": Status.failed, "error_message": "None of the pages could be scanned."}
+    failed = len(pages) - len(results)
+    return {
+        **outcome,
+        "status": Status.review_needed if failed else Status.completed,
+        "human_review_needed": bool(failed),
+        "raw_scan_data": merge_pages(results).model_dump(),
+        "error_message": f"{failed} of {len(pages)} pages could not be scanned." if failed else None,
+    }
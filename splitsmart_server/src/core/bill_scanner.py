@@ -1,10 +1,4 @@
-import base64
-import openai
-import json
-from src.core.config import settings # We use our central config for the API key
-
-# Initialize the client using the key from our settings
-client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+from src.core.ai_providers import ai_provider
 
 # The same proven system prompt from your prototype
 SYSTEM_PROMPT = """
@@ -22,30 +16,7 @@ You must adhere to the following rules:
 
 async def scan_bill_image(image_contents: bytes, content_type: str) -> dict:
     """
-    Takes image bytes, sends them to GPT-4o, and returns the structured data as a dictionary.
+    Takes image bytes, has the configured AI provider read them, and returns the
+    structured data as a dictionary.
     """
-    base64_image = base64.b64encode(image_contents).decode('utf-8')
-
-    response = await client.chat.completions.create(
-        model="gpt-4o",
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{content_type};base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
-        ],
-        temperature=0.1,
-        max_tokens=1500
-    )
-    
-    response_content = response.choices[0].message.content
-    return json.loads(response_content)
\ No newline at end of file
+    return await ai_provider.scan_bill(image_contents, content_type, instructions=SYSTEM_PROMPT)
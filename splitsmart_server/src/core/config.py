@@ -1,9 +1,111 @@
-from pydantic_settings import BaseSettings
+from typing import Annotated, List, Literal, Optional
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
-    OPENAI_API_KEY: str 
+    # Only needed with AI_PROVIDER=openai
+    OPENAI_API_KEY: Optional[str] = None
+    # Connection pool for the async engine
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Optional read replicas, comma-separated. Read-only routes use them round-robin;
+    # writes always go to DATABASE_URL.
+    REPLICA_DATABASE_URLS: Annotated[List[str], NoDecode] = []
+    # How often replicas are probed, and how long one that failed is skipped
+    REPLICA_HEALTH_CHECK_SECONDS: float = 10
+    # After a user writes, their reads go to the primary for this long
+    READ_YOUR_WRITES_SECONDS: float = 5
+    # Per-worker cache of group membership checks. Other workers' writes can
+    # leave an entry stale for this long (see `crud_group.membership_cache`).
+    MEMBERSHIP_CACHE_TTL_SECONDS: float = 30
+    MEMBERSHIP_CACHE_SIZE: int = 50_000
+    # Per-worker cache of the users behind access tokens. Revoking tokens or
+    # deactivating an account takes up to this long to reach the other workers
+    # (see `crud_user.user_cache`); 0 turns the cache off.
+    USER_CACHE_TTL_SECONDS: float = 10
+    USER_CACHE_SIZE: int = 10_000
+    # bcrypt cost factor. Existing hashes are upgraded on the user's next login.
+    BCRYPT_ROUNDS: int = 12
+    # Password hashing runs in a separate process pool. Once this many hashes are
+    # queued or running, further logins/registrations are refused with a 503.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # How group events reach the subscribers of other workers: "postgres"
+    # (LISTEN/NOTIFY) or "memory" (this worker only; single worker and tests).
+    EVENT_BACKEND: Literal["memory", "postgres"] = "memory"
+    # A subscriber this many events behind is disconnected and has to resync
+    EVENT_QUEUE_SIZE: int = 100
+    # Server-sent event streams send a comment this often to stay open through proxies
+    SSE_KEEPALIVE_SECONDS: float = 15
+    # Notifications are written by a background worker. Once this many fan-outs are
+    # waiting, new ones are dropped (and logged) rather than slowing requests down.
+    NOTIFICATION_QUEUE_SIZE: int = 10_000
+    # Most notification rows the worker inserts in one statement
+    NOTIFICATION_BATCH_SIZE: int = 1_000
+    # Times the worker tries to write a batch with its counter updates before
+    # writing the rows alone and recounting the counters
+    NOTIFICATION_WRITE_ATTEMPTS: int = 3
+    # Bill scan results are cached by image content. Exact re-uploads are served
+    # from this per-worker LRU, then from earlier uploads in the database.
+    SCAN_CACHE_SIZE: int = 1_000
+    SCAN_CACHE_TTL_SECONDS: float = 24 * 3600
+    # A re-shot of the same bill matches an earlier upload if their perceptual
+    # hashes differ in at most this many of 64 bits (0 turns matching off), and
+    # the earlier one was uploaded within the window by someone sharing a group.
+    SCAN_SIMILAR_MAX_DISTANCE: int = 3
+    SCAN_SIMILAR_WINDOW_HOURS: float = 24
+    # Uploads larger than this are refused with a 413
+    SCAN_MAX_UPLOAD_BYTES: int = 15 * 1024 * 1024
+    # Bill photos are oriented, cropped to the receipt, made grayscale and shrunk
+    # to fit SCAN_IMAGE_MAX_DIMENSION before scanning, in a separate process pool.
+    SCAN_IMAGE_MAX_DIMENSION: int = 1600
+    SCAN_IMAGE_FORMAT: Literal["jpeg", "webp"] = "jpeg"
+    SCAN_IMAGE_QUALITY: int = 80
+    IMAGE_PREPROCESS_WORKERS: int = 2
+    # Scans run as background jobs: at most SCAN_WORKERS at a time per worker
+    # process, each given SCAN_JOB_TIMEOUT_SECONDS and SCAN_JOB_MAX_ATTEMPTS tries.
+    # Every SCAN_JOB_SWEEP_SECONDS the database is checked for jobs to retry, or
+    # left behind by a worker that stopped.
+    SCAN_WORKERS: int = 4
+    SCAN_QUEUE_SIZE: int = 1_000
+    SCAN_JOB_TIMEOUT_SECONDS: float = 60
+    SCAN_JOB_MAX_ATTEMPTS: int = 3
+    SCAN_JOB_SWEEP_SECONDS: float = 30
+    # Most photos in one multi-page scan, and how many of them one request
+    # preprocesses at a time (so a long bill can't fill the preprocessing pool's
+    # queue ahead of everyone else's uploads).
+    SCAN_BATCH_MAX_PAGES: int = 10
+    SCAN_BATCH_CONCURRENCY: int = 2
+    # Who reads bills and writes financial advice: "openai", or "fake", which
+    # answers locally with made-up results after a simulated delay, for load
+    # tests and development without network access or a key.
+    AI_PROVIDER: Literal["openai", "fake"] = "openai"
+    OPENAI_SCAN_MODEL: str = "gpt-4o"
+    OPENAI_ADVISOR_MODEL: str = "gpt-4o"
+    # The fake provider's delays are lognormal around the median; that share of
+    # calls fails, and that share returns a bill missing required fields. Delays
+    # and failures repeat from run to run for the same seed and order of calls.
+    FAKE_AI_LATENCY_MEDIAN_SECONDS: float = 2.0
+    FAKE_AI_LATENCY_SIGMA: float = 0.5
+    FAKE_AI_ERROR_RATE: float = 0.0
+    FAKE_AI_MALFORMED_RATE: float = 0.0
+    FAKE_AI_SEED: int = 0
+    # Read bills with local OCR first (needs pytesseract and the tesseract
+    # binary), and only send them to AI_PROVIDER when the numbers read don't add up.
+    SCAN_OCR_FIRST: bool = False
+    # When set, any request issuing more SQL statements than this fails with a 500.
+    # Meant for tests and local development to catch N+1 query patterns.
+    QUERY_BUDGET_PER_REQUEST: Optional[int] = None
+
+    @field_validator("REPLICA_DATABASE_URLS", mode="before")
+    @classmethod
+    def split_urls(cls, value):
+        if isinstance(value, str):
+            return [url.strip() for url in value.split(",") if url.strip()]
+        return value
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import settings
+from src.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# --- Group Event Hub ---
+# Pushes group changes (new expenses, payments, members, balance deltas) to the
+# clients subscribed to `/groups/{group_id}/events`. The CRUD functions publish
+# after committing; the backend carries the events to every worker, and each
+# worker's hub fans them out to its own subscribers. Events are sent at most
+# once: a client that reconnects, or falls too far behind and is dropped, should
+# refetch what it shows (the group's ETags make that cheap).
+#
+# Every event looks like
+#   {"type": "expense.created", "group_id": 1, "version": 42, "data": {...}}
+# where `version` is the group's version after the change.
+
+Deliver = Callable[[int, List[dict]], None]
+
+
+def group_event(event_type: str, group_id: int, version: Optional[int], data: Optional[dict] = None) -> dict:
+    return {"type": event_type, "group_id": group_id, "version": version, "data": data}
+
+
+def balances_event(group_id: int, version: Optional[int], deltas: Dict[int, float]) -> dict:
+    """A `balances.changed` event with how much each member's net balance moved."""
+    return group_event("balances.changed", group_id, version, {
+        "deltas": [{"user_id": user_id, "delta": round(delta, 2)} for user_id, delta in sorted(deltas.items())]
+    })
+
+
+class Subscription:
+    """
+    The queue of one subscriber's encoded events, as (type, json) pairs. Once
+    closed, the queue is emptied and `get` returns None. A subscriber that falls
+    `maxsize` events behind is closed, and has to disconnect and resync.
+    """
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[Optional[Tuple[str, str]]]" = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def push(self, message: Tuple[str, str]) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[Tuple[str, str]]:
+        return await self.queue.get()
+
+
+class MemoryEventBackend:
+    """
+    Delivers events to this worker's own subscribers only. Enough for a single
+    worker, and for tests.
+    """
+    def __init__(self):
+        self.deliver: Optional[Deliver] = None
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, group_id: int, events: List[dict]) -> None:
+        self.deliver(group_id, events)
+
+
+class PostgresEventBackend:
+    """
+    Shares events between workers with LISTEN/NOTIFY. Each worker keeps one
+    dedicated connection listening on `channel` (reconnecting if it drops) and
+    delivers what arrives there, its own notifications included.
+    """
+    # PostgreSQL refuses notification payloads of 8000 bytes or more
+    MAX_PAYLOAD_BYTES = 7999
+
+    def __init__(self, engine: AsyncEngine, channel: str = "group_events", reconnect_seconds: float = 1.0):
+        self.engine = engine
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self.deliver: Optional[Deliver] = None
+        self._dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listening = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.warning("Not listening for group events yet; will keep retrying in the background")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                connection = await asyncpg.connect(self._dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("Cannot connect to listen for group events: %s", e)
+                await asyncio.sleep(self.reconnect_seconds)
+                continue
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            try:
+                await connection.add_listener(self.channel, self._on_notification)
+                self._listening.set()
+                await closed.wait()
+                logger.warning("Lost the group events connection, reconnecting")
+            finally:
+                self._listening.clear()
+                if not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_seconds)
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        message = json.loads(payload)
+        self.deliver(message["group_id"], message["events"])
+
+    async def publish(self, group_id: int, events: List[dict]) -> None:
+        payload = json.dumps({"group_id": group_id, "events": events})
+        if len(payload.encode()) > self.MAX_PAYLOAD_BYTES:
+            # Too big to send whole: subscribers get the event types and versions
+            # and refetch the details.
+            payload = json.dumps({"group_id": group_id, "events": [{**event, "data": None} for event in events]})
+        async with self.engine.connect() as connection:
+            await connection.execute(select(func.pg_notify(self.channel, payload)))
+            await connection.commit()
+
+
+class EventHub:
+    """
+    Keeps this worker's subscribers per group and fans out the events the backend
+    delivers. Each event is encoded once, however many subscribers receive it.
+    """
+    def __init__(self, backend, queue_size: int):
+        self.backend = backend
+        self.backend.deliver = self._deliver
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def start(self) -> None:
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    async def publish(self, group_id: int, *events: dict) -> None:
+        """
+        Sends events to the group's subscribers on every worker. Call it after the
+        change is committed. Failures are logged, not raised: the change itself
+        has been made, and clients catch up when they next refetch.
+        """
+        try:
+            await self.backend.publish(group_id, list(events))
+        except Exception:
+            logger.exception("Could not publish events for group %s", group_id)
+
+    def _deliver(self, group_id: int, events: List[dict]) -> None:
+        subscribers = self._subscribers.get(group_id)
+        if not subscribers:
+            return
+        messages = [(event["type"], json.dumps(event)) for event in events]
+        for subscription in list(subscribers):
+            for message in messages:
+                subscription.push(message)
+
+    @contextmanager
+    def subscribe(self, group_id: int) -> Iterator[Subscription]:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.setdefault(group_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers[group_id]
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[group_id]
+
+
+def _create_backend():
+    if settings.EVENT_BACKEND == "postgres":
+        return PostgresEventBackend(engine)
+    return MemoryEventBackend()
+
+
+event_hub = EventHub(_create_backend(), queue_size=settings.EVENT_QUEUE_SIZE)
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from src.schemas import expense as expense_schema
+
+# --- Bulk Expense Upload Parsing ---
+# Turns an uploaded JSON array or CSV file into validated `ExpenseImportRow`s.
+# A row that fails validation is reported by its number instead of failing the
+# whole upload.
+#
+# CSV files need a header row. Columns: description, total_amount, paid_by_id
+# (required), and currency, category, expense_date, split_type, notes, splits
+# (optional). `splits` lists the participants as `user_id[:value]` separated by
+# `;`. The value is the percentage for by_percentage, the shares for by_shares,
+# and the exact owed amount otherwise. An empty `splits` splits equally among
+# all members.
+
+CSV_REQUIRED_COLUMNS = {"description", "total_amount", "paid_by_id"}
+CSV_SPLIT_VALUE_FIELDS = {"by_percentage": "percentage", "by_shares": "shares"}
+
+_row_adapter = TypeAdapter(expense_schema.ExpenseImportRow)
+
+ParsedRows = Tuple[List[Tuple[int, expense_schema.ExpenseImportRow]], List[Dict]]
+
+
+class ImportFormatError(Exception):
+    """Raised when an upload cannot be read at all (as opposed to individual bad rows)."""
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def _validate(records: Iterable[Tuple[int, object]]) -> ParsedRows:
+    rows, errors = [], []
+    for row_number, record in records:
+        try:
+            rows.append((row_number, _row_adapter.validate_python(record)))
+        except ValidationError as e:
+            errors.append({"row": row_number, "detail": _describe(e)})
+    return rows, errors
+
+
+def parse_json(body: bytes) -> ParsedRows:
+    """Parses a JSON array of expenses."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ImportFormatError("The request body is not valid JSON.")
+    if not isinstance(data, list):
+        raise ImportFormatError("Expected a JSON array of expenses.")
+    return _validate(enumerate(data, start=1))
+
+
+def _parse_csv_splits(value: str, split_type: str) -> List[Dict]:
+    field = CSV_SPLIT_VALUE_FIELDS.get(split_type, "owed_amount")
+    splits = []
+    for part in filter(None, (p.strip() for p in value.split(";"))):
+        user_id, _, amount = part.partition(":")
+        split = {"user_id": user_id.strip()}
+        if amount.strip():
+            split[field] = amount.strip()
+        splits.append(split)
+    return splits
+
+
+def parse_csv(body: bytes) -> ParsedRows:
+    """Parses a CSV file of expenses (see the column description above)."""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFormatError("CSV uploads must be UTF-8 encoded.")
+    reader = csv.DictReader(io.StringIO(text))
+    missing = CSV_REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        raise ImportFormatError(f"The CSV header is missing: {', '.join(sorted(missing))}.")
+
+    def records():
+        for row_number, record in enumerate(reader, start=1):
+            # Empty cells mean the column was not given for this row
+            record = {key: value for key, value in record.items() if key and value not in (None, "")}
+            record["splits"] = _parse_csv_splits(record.pop("splits", ""), record.get("split_type", "equally"))
+            yield row_number, record
+
+    return _validate(records())
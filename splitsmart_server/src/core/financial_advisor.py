@@ -1,8 +1,6 @@
-import openai
-from src.core.config import settings
 from typing import List, Dict
 import json
-client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+from src.core.ai_providers import ai_provider
 from src.schemas.expense import Expense
 from src.schemas.balance import UserBalance
 # --- Group Level Analysis ---
@@ -23,7 +21,7 @@ Keep the tone positive and collaborative, not accusatory. Format the output as a
 # --- THIS IS THE CORRECTED FUNCTION ---
 async def get_group_financial_advice(expenses: List[Expense], balances: List[UserBalance]) -> str:
     """
-    Takes group expense and balance Pydantic models, gets financial advice from GPT-4o.
+    Takes group expense and balance Pydantic models, gets financial advice from the AI provider.
     """
     # Create the dictionary that will be serialized
     prompt_data = {
@@ -35,25 +33,17 @@ async def get_group_financial_advice(expenses: List[Expense], balances: List[Use
     # Use Pydantic's built-in JSON serialization which correctly handles datetimes/enums
     prompt_json = json.dumps(prompt_data, default=str) # Using default=str is a robust way to handle any non-serializable types
 
-    response = await client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": GROUP_ADVISOR_PROMPT},
-            {"role": "user", "content": f"Here is the group's financial data:\n\n{prompt_json}"}
-        ],
-        temperature=0.6,
-        max_tokens=500
+    return await ai_provider.advise(
+        GROUP_ADVISOR_PROMPT, f"Here is the group's financial data:\n\n{prompt_json}"
     )
-    print(response)
-    return response.choices[0].message.content
 
 # --- User Level Analysis ---
 
 USER_ADVISOR_PROMPT = """
 You are a personal financial advisor. Your task is to analyze an individual's spending data across all their shared groups and provide a private, helpful summary.
 
-Based on the JSON data provided below, which includes a summary of the user's spending in different categories and their net balance, please generate a report covering these key points:
-1.  **Overall Financial Position:** Start by stating the user's total net balance (whether they are owed money or owe money overall).
+Based on the JSON data provided below, which includes a summary of the user's spending in different categories and their net balance in each currency, please generate a report covering these key points:
+1.  **Overall Financial Position:** Start by stating the user's net balance in each currency (whether they are owed money or owe money). Never add up or convert balances in different currencies.
 2.  **Top Spending Categories:** Identify the top 2-3 categories where the user's share of spending is highest.
 3.  **Spending Habit Insights:** Briefly analyze their spending. For example, "A significant portion of your shared spending goes towards dining out."
 4.  **Personalized Tip:** Offer one actionable, personalized tip for managing their shared expenses better. For example, if they spend a lot on transport, suggest carpooling.
@@ -63,16 +53,9 @@ Keep the tone encouraging and private. Format the output as a clean, human-reada
 
 async def get_user_financial_advice(user_spending_summary: Dict) -> str:
     """
-    Takes a user's spending summary and gets personalized financial advice from GPT-4o.
+    Takes a user's spending summary and gets personalized financial advice from the AI provider.
     """
-    response = await client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": USER_ADVISOR_PROMPT},
-            {"role": "user", "content": f"Here is my personal spending data:\n\n{json.dumps(user_spending_summary, indent=2)}"}
-        ],
-        temperature=0.6,
-        max_tokens=500
-    )
-    print(response)
-    return response.choices[0].message.content
\ No newline at end of file
+    return await ai_provider.advise(
+        USER_ADVISOR_PROMPT,
+        f"Here is my personal spending data:\n\n{json.dumps(user_spending_summary, indent=2)}"
+    )
\ No newline at end of file
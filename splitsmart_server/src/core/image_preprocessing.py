@@ -0,0 +1,122 @@
+import io
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+from src.core import scan_cache
+from src.core.config import settings
+from src.core.process_pool import SpawnPool
+
+# --- Bill Image Preprocessing ---
+# Phone photos of bills are 4-12 MB. Sent as they are, they make a request to
+# the model of up to 16 MB of base64 and cost more vision tokens than the text
+# on them needs. Before scanning, each photo is turned upright (EXIF orientation),
+# made grayscale, cropped to the bright paper of the receipt, shrunk to fit
+# SCAN_IMAGE_MAX_DIMENSION and re-encoded as a compressed JPEG or WebP, usually
+# around a tenth of its original size. Decoding and encoding take hundreds of
+# milliseconds of CPU, so it runs in a process pool, like password hashing.
+
+# The receipt is found on a small copy of the photo
+CROP_DETECTION_SIZE = 256
+# A candidate crop smaller than this share of the photo is more likely a glare
+# spot than the receipt, and is ignored.
+MIN_CROP_AREA = 0.2
+# Kept around the detected receipt, as a share of the photo's size
+CROP_MARGIN = 0.02
+
+CONTENT_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+class InvalidImage(Exception):
+    """Raised when uploaded bytes cannot be decoded as an image."""
+    def __init__(self, detail: str = "The file could not be read as an image."):
+        self.detail = detail
+        super().__init__(detail)
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    data: bytes
+    content_type: str
+    perceptual_hash: int
+
+
+def _receipt_box(image: Image.Image) -> Optional[tuple]:
+    """
+    The bounding box of the bright paper in a grayscale image, or None if none
+    stands out. Pixels well above the image's mean brightness count as paper; a
+    median filter drops isolated specks of glare before the box is taken.
+    """
+    small = image.copy()
+    small.thumbnail((CROP_DETECTION_SIZE, CROP_DETECTION_SIZE))
+    histogram = small.histogram()
+    mean = sum(level * count for level, count in enumerate(histogram)) / max(1, sum(histogram))
+    threshold = (mean + 255) / 2
+    mask = small.point(lambda level: 255 if level > threshold else 0).filter(ImageFilter.MedianFilter(5))
+    box = mask.getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    if (right - left) * (bottom - top) < MIN_CROP_AREA * small.width * small.height:
+        return None
+
+    scale_x, scale_y = image.width / small.width, image.height / small.height
+    margin_x, margin_y = CROP_MARGIN * image.width, CROP_MARGIN * image.height
+    return (
+        max(0, int(left * scale_x - margin_x)),
+        max(0, int(top * scale_y - margin_y)),
+        min(image.width, int(right * scale_x + margin_x)),
+        min(image.height, int(bottom * scale_y + margin_y)),
+    )
+
+
+def preprocess_bill_image(
+    image_contents: bytes, max_dimension: int, image_format: str, quality: int
+) -> PreparedImage:
+    """
+    Orients, crops, grayscales, shrinks and re-encodes a bill photo, and takes its
+    perceptual hash on the way. Runs in the preprocessing pool.
+
+    Raises:
+        InvalidImage: If the bytes are not an image Pillow can decode.
+    """
+    try:
+        with Image.open(io.BytesIO(image_contents)) as original:
+            # JPEGs can decode straight at a fraction of their size, which is most
+            # of the speed-up for large photos. The margin leaves room for the crop.
+            original.draft("L", (max_dimension * 2, max_dimension * 2))
+            image = ImageOps.exif_transpose(original).convert("L")
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        raise InvalidImage()
+
+    box = _receipt_box(image)
+    if box is not None:
+        image = image.crop(box)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    if image_format == "webp":
+        image.save(output, "WEBP", quality=quality, method=4)
+    else:
+        image.save(output, "JPEG", quality=quality, optimize=True)
+    return PreparedImage(output.getvalue(), CONTENT_TYPES[image_format], scan_cache.dhash(image))
+
+
+# --- Preprocessing Pool ---
+
+image_pool = SpawnPool(max_workers=settings.IMAGE_PREPROCESS_WORKERS)
+
+async def run_in_image_pool(function, *args):
+    """Runs `function(*args)` in the preprocessing pool. It must be importable at module level."""
+    return await image_pool.run(function, *args)
+
+async def prepare_bill_image(image_contents: bytes) -> PreparedImage:
+    """Runs `preprocess_bill_image` with the configured settings in the preprocessing pool."""
+    return await run_in_image_pool(
+        preprocess_bill_image,
+        image_contents,
+        settings.SCAN_IMAGE_MAX_DIMENSION,
+        settings.SCAN_IMAGE_FORMAT,
+        settings.SCAN_IMAGE_QUALITY,
+    )
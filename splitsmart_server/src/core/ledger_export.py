@@ -0,0 +1,157 @@
+import csv
+import io
+from typing import AsyncIterator, List, Sequence
+
+# --- Ledger Export Encoders ---
+# Turn the row chunks from `crud_export.stream_group_ledger` into the bytes of a
+# CSV, Parquet or Arrow IPC stream as they arrive, so an export is never held in
+# memory as a whole. Parquet and Arrow need pyarrow, which is only imported when
+# one of those formats is requested.
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Columns of the flattened ledger, in the order `crud_export` selects them: one row
+# per expense split, then one per payment. For a split, `user_id` is the
+# participant and `amount` what they owe; for a payment, `user_id` is the
+# recipient and `amount` what was paid.
+LEDGER_COLUMNS = [
+    "entry_type",
+    "expense_id",
+    "split_id",
+    "payment_id",
+    "date",
+    "description",
+    "category",
+    "currency",
+    "total_amount",
+    "paid_by_id",
+    "user_id",
+    "amount",
+    "status",
+]
+
+RowChunks = AsyncIterator[List[Sequence]]
+
+
+class ExportFormatUnavailable(Exception):
+    """Raised when an export format needs a library that is not installed."""
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportFormatUnavailable("Parquet and Arrow exports need pyarrow, which is not installed.")
+    return pyarrow
+
+
+def check_format(format: str) -> None:
+    """Raises ExportFormatUnavailable if `format` cannot be produced here."""
+    if format in ("parquet", "arrow"):
+        _import_pyarrow()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    A write-only file that hands out whatever has been written since the last
+    `drain()`. It keeps counting the position, so writers that record offsets
+    (Parquet's footer) still see the file as one continuous stream.
+    """
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("entry_type", pa.string()),
+        ("expense_id", pa.int64()),
+        ("split_id", pa.int64()),
+        ("payment_id", pa.int64()),
+        ("date", pa.timestamp("us", tz="UTC")),
+        ("description", pa.string()),
+        ("category", pa.string()),
+        ("currency", pa.string()),
+        ("total_amount", pa.float64()),
+        ("paid_by_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("amount", pa.float64()),
+        ("status", pa.string()),
+    ])
+
+
+def _record_batch(pa, schema, rows: List[Sequence]):
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+    )
+
+
+async def _encode_csv(chunks: RowChunks) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LEDGER_COLUMNS)
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # The header of an empty export
+        yield buffer.getvalue().encode()
+
+
+async def _encode_arrow(chunks: RowChunks) -> AsyncIterator[bytes]:
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        async for rows in chunks:
+            writer.write_batch(_record_batch(pa, schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def _encode_parquet(chunks: RowChunks) -> AsyncIterator[bytes]:
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    # Each chunk becomes one row group, written out as soon as it is encoded.
+    with pa.parquet.ParquetWriter(sink, schema) as writer:
+        async for rows in chunks:
+            writer.write_batch(_record_batch(pa, schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+_ENCODERS = {"csv": _encode_csv, "parquet": _encode_parquet, "arrow": _encode_arrow}
+
+
+def encode(format: str, chunks: RowChunks) -> AsyncIterator[bytes]:
+    """Returns the byte stream of the ledger rows in `chunks`, in `format`."""
+    return _ENCODERS[format](chunks)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config import settings
+from src.db import models
+from src.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# --- Notification Fan-Out ---
+# Requests only queue a notification (after their commit); a background worker
+# writes the rows. An expense in a 200-member group becomes one multi-row
+# INSERT of 200 rows plus an UPDATE of each recipient's unread counter, in the
+# worker's own transaction, and the request that created it waits for neither.
+# Under load the worker takes everything queued since its last write, so many
+# fan-outs share a statement. A failed write is retried; if the counters still
+# can't be updated, the rows are written alone and the counters recounted. The
+# queue is in memory: notifications still queued when a worker dies are lost.
+
+
+def display_name(user: models.User) -> str:
+    return user.full_name or user.email
+
+
+@dataclass(frozen=True)
+class PendingNotification:
+    user_ids: Tuple[int, ...]
+    type: str
+    message: str
+    related_entity_id: Optional[int] = None
+
+
+class NotificationService:
+    def __init__(self, session_factory: async_sessionmaker, queue_size: int, batch_size: int, write_attempts: int = 3):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.write_attempts = write_attempts
+        self._queue: "asyncio.Queue[PendingNotification]" = asyncio.Queue(queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, user_ids: Iterable[int], type: str, message: str, related_entity_id: Optional[int] = None) -> None:
+        """
+        Queues the same notification for each of `user_ids`. Never blocks: if the
+        queue is full the notification is dropped and logged.
+        """
+        user_ids = tuple(sorted(set(user_ids)))
+        if not user_ids:
+            return
+        try:
+            self._queue.put_nowait(PendingNotification(user_ids, type, message, related_entity_id))
+        except asyncio.QueueFull:
+            logger.warning("Notification queue is full, dropping %s for %d users", type, len(user_ids))
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Gives the worker up to `timeout` seconds to write what is queued, then stops it."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping with %d notification fan-outs unwritten", self._queue.qsize())
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0].user_ids)
+            while rows < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                rows += len(batch[-1].user_ids)
+            try:
+                await self._write_with_retries(batch)
+            except Exception:
+                logger.exception("Could not write %d notifications", rows)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_with_retries(self, batch: List[PendingNotification]) -> None:
+        """
+        Writes the batch, retrying with backoff. If the rows and counters still
+        cannot be written together, writes the rows alone and recounts the
+        recipients' counters from them, so a failing counter update never costs
+        the notifications themselves.
+        """
+        for attempt in range(self.write_attempts):
+            try:
+                return await self._write(batch)
+            except Exception:
+                logger.warning("Writing %d notification fan-outs failed (attempt %d of %d)",
+                               len(batch), attempt + 1, self.write_attempts, exc_info=True)
+                if attempt + 1 < self.write_attempts:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+        await self._write_rows_and_recount(batch)
+
+    def _rows(self, batch: List[PendingNotification]) -> List[dict]:
+        return [
+            {
+                "user_id": user_id,
+                "type": pending.type,
+                "message": pending.message,
+                "related_entity_id": pending.related_entity_id,
+                "is_read": False,
+            }
+            for pending in batch
+            for user_id in pending.user_ids
+        ]
+
+    async def _insert_rows(self, db: AsyncSession, rows: List[dict]) -> None:
+        for start in range(0, len(rows), self.batch_size):
+            await db.execute(insert(models.Notification).values(rows[start:start + self.batch_size]))
+
+    async def _write(self, batch: List[PendingNotification]) -> None:
+        rows = self._rows(batch)
+        unread = Counter(row["user_id"] for row in rows)
+        users = models.User.__table__
+
+        async with self.session_factory() as db:
+            # Lock the recipients in id order first, so workers writing overlapping
+            # batches at the same time cannot deadlock on the counter updates.
+            await db.execute(
+                select(models.User.id)
+                .where(models.User.id.in_(unread.keys()))
+                .order_by(models.User.id)
+                .with_for_update()
+            )
+            await self._insert_rows(db, rows)
+            # One UPDATE per recipient, sent as a single executemany
+            await db.execute(
+                update(users)
+                .where(users.c.id == bindparam("recipient_id"))
+                .values(unread_notifications=users.c.unread_notifications + bindparam("unread")),
+                [{"recipient_id": user_id, "unread": count} for user_id, count in sorted(unread.items())],
+            )
+            await db.commit()
+
+    async def _write_rows_and_recount(self, batch: List[PendingNotification]) -> None:
+        rows = self._rows(batch)
+        async with self.session_factory() as db:
+            await self._insert_rows(db, rows)
+            await db.commit()
+        logger.warning("Wrote %d notifications without their counter updates; recounting", len(rows))
+
+        unread = (
+            select(func.count(models.Notification.id))
+            .where(models.Notification.user_id == models.User.id, models.Notification.is_read.is_(False))
+            .scalar_subquery()
+        )
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(models.User)
+                    .where(models.User.id.in_({row["user_id"] for row in rows}))
+                    .values(unread_notifications=unread),
+                    execution_options={"synchronize_session": False},
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Could not recount unread notifications for %d users", len(rows))
+
+
+notification_service = NotificationService(
+    SessionLocal,
+    queue_size=settings.NOTIFICATION_QUEUE_SIZE,
+    batch_size=settings.NOTIFICATION_BATCH_SIZE,
+    write_attempts=settings.NOTIFICATION_WRITE_ATTEMPTS,
+)
@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+# --- Keyset Pagination Cursors ---
+# A cursor is the sort key of the last row on a page, made opaque to clients.
+# Datetimes are encoded as ISO strings and restored on the way back in.
+
+
+class InvalidCursor(Exception):
+    """Raised when a client sends a cursor that was not produced by `encode_cursor`."""
+    def __init__(self, detail: str = "Invalid pagination cursor."):
+        self.detail = detail
+        super().__init__(detail)
+
+
+def encode_cursor(*key: Any) -> str:
+    values = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in key]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[Any, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = tuple(
+            datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values
+        )
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor()
+    if len(key) != size:
+        raise InvalidCursor()
+    return key
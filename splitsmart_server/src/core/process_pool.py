@@ -0,0 +1,34 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# --- Process Pools ---
+# CPU-heavy work (password hashing, bill image preprocessing) runs in small
+# process pools so it never stalls the event loop. Each pool is started on
+# first use and shut down with the app.
+
+
+class SpawnPool:
+    """A lazily started process pool of `max_workers` spawned workers."""
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def get(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" so the workers don't inherit the server's event loop, threads or sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, function, *args):
+        """Runs `function(*args)` in the pool. It must be importable at module level."""
+        return await asyncio.get_running_loop().run_in_executor(self.get(), function, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,100 @@
+import io
+import re
+from typing import Optional
+
+from PIL import Image
+
+from src.core import image_preprocessing
+
+# --- Local Receipt OCR ---
+# Plain printed receipts, one item per line with its price at the end, can be read
+# without the model: Tesseract gives the text and the lines are parsed here. A
+# reading is only trusted when its items, taxes and charges add up to the total
+# it found; anything else (handwriting, odd layouts, misread digits) goes to the
+# model. pytesseract and the tesseract binary are optional.
+
+# "2 x Margherita pizza ..... 25.00": an optional quantity, a name with at least
+# one letter, then the amount at the end of the line.
+PRICE_LINE = re.compile(
+    r"^(?:(?P<quantity>\d{1,3})\s*[xX@*]?\s+)?(?P<name>.*?[A-Za-z].*?)[\s.:$€£]*(?P<amount>-?\d{1,6}[.,]\d{2})$"
+)
+TOTAL_NAMES = re.compile(r"\b(grand\s*total|total|amount\s*due|balance\s*due|to\s*pay)\b", re.IGNORECASE)
+SUBTOTAL_NAMES = re.compile(r"\bsub\s*-?\s*total\b", re.IGNORECASE)
+TAX_NAMES = re.compile(r"\b(tax|vat|gst|hst|service|tip|gratuity|charge|surcharge|discount)\b", re.IGNORECASE)
+# Lines with amounts that are about paying, not about the bill
+PAYMENT_NAMES = re.compile(r"\b(cash|change|card|visa|mastercard|amex|tendered|paid)\b", re.IGNORECASE)
+
+
+class OCRUnavailable(Exception):
+    """Raised when receipts cannot be read locally because pytesseract or tesseract is missing."""
+    def __init__(self, detail: str):
+        self.detail = detail
+        super().__init__(detail)
+
+
+def _import_pytesseract():
+    try:
+        import pytesseract
+    except ImportError:
+        raise OCRUnavailable("Local OCR needs pytesseract, which is not installed.")
+    return pytesseract
+
+
+def check_available() -> None:
+    """Raises OCRUnavailable if receipts cannot be read locally here."""
+    pytesseract = _import_pytesseract()
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        raise OCRUnavailable("Local OCR needs the tesseract binary, which is not installed.")
+
+
+def read_text(image_contents: bytes) -> str:
+    """The text Tesseract reads in an image. Runs in the preprocessing pool."""
+    pytesseract = _import_pytesseract()
+    with Image.open(io.BytesIO(image_contents)) as image:
+        # A single uniform block of text, which is what a receipt is
+        return pytesseract.image_to_string(image, config="--psm 6")
+
+
+def parse_receipt_text(text: str) -> Optional[dict]:
+    """
+    A `BillScanResponse`-shaped dict read from a receipt's text, or None unless it
+    has line items and a total that they, with the taxes and charges, add up to
+    within a cent. Lines after the total are ignored.
+    """
+    items, taxes, total = [], [], None
+    for line in text.splitlines():
+        match = PRICE_LINE.match(line.strip())
+        if match is None:
+            continue
+        name = match["name"].strip(" .:-")
+        amount = float(match["amount"].replace(",", "."))
+        if SUBTOTAL_NAMES.search(name) or PAYMENT_NAMES.search(name):
+            continue
+        if TOTAL_NAMES.search(name):
+            total = amount
+            break
+        if TAX_NAMES.search(name):
+            taxes.append({"tax_name": name, "tax_amount": amount})
+            continue
+        quantity = int(match["quantity"] or 1) or 1
+        items.append({
+            "item_name": name,
+            "quantity": quantity,
+            "unit_price": round(amount / quantity, 2),
+            "total_price": amount,
+        })
+
+    if not items or total is None:
+        return None
+    read_total = sum(item["total_price"] for item in items) + sum(tax["tax_amount"] for tax in taxes)
+    if abs(read_total - total) > 0.01:
+        return None
+    return {"line_items": items, "taxes_and_charges": taxes, "grand_total": total}
+
+
+async def scan_receipt(image_contents: bytes) -> Optional[dict]:
+    """Reads a receipt locally, in the preprocessing pool. None if the reading can't be trusted."""
+    text = await image_preprocessing.run_in_image_pool(read_text, image_contents)
+    return parse_receipt_text(text)
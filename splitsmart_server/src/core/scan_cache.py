@@ -0,0 +1,40 @@
+import hashlib
+
+from PIL import Image
+
+from src.core.cache import TTLCache
+from src.core.config import settings
+
+# --- Bill Scan Cache Keys ---
+# Scans are keyed by the image itself. The SHA-256 of the uploaded bytes finds
+# exact re-uploads (the app retrying, a photo shared and scanned again), and a
+# difference hash finds re-shots of the same bill: a 9x8 grayscale thumbnail
+# where each bit says whether a pixel is brighter than its right-hand neighbour.
+# Small changes in framing, exposure or compression flip only a few of its bits.
+
+DHASH_SIZE = 8
+
+# content SHA-256 -> scan result. Exact matches only: the same bytes always
+# scan to the same result, whoever uploads them.
+scan_cache = TTLCache(maxsize=settings.SCAN_CACHE_SIZE, ttl_seconds=settings.SCAN_CACHE_TTL_SECONDS)
+
+
+def content_hash(image_contents: bytes) -> str:
+    return hashlib.sha256(image_contents).hexdigest()
+
+
+def dhash(image: Image.Image) -> int:
+    """The 64-bit dHash of an image as a signed integer (so it fits a BIGINT column)."""
+    thumbnail = image.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = thumbnail.tobytes()
+    value = 0
+    for row in range(DHASH_SIZE):
+        for col in range(DHASH_SIZE):
+            left = pixels[row * (DHASH_SIZE + 1) + col]
+            right = pixels[row * (DHASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFF_FFFF_FFFF_FFFF).bit_count()
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core import bill_pages, bill_scanner, scan_cache
+from src.core.config import settings
+from src.core.notifications import notification_service
+from src.db import models
+from src.db.session import SessionLocal
+from src.schemas import scanner as scanner_schema
+
+logger = logging.getLogger(__name__)
+
+# --- Bill Scan Jobs ---
+# `POST /scan-bill` stores the preprocessed image on a pending `BillUpload` and
+# returns; a pool of SCAN_WORKERS tasks per worker process sends it to the model.
+# The database is the queue, the in-memory queue only a shortcut to it: a job is
+# claimed by moving it from pending to processing in one UPDATE, so each attempt
+# runs once however many processes hear of it, and a periodic sweep finds what
+# the in-memory queues lost (jobs queued when a process stopped or its queue was
+# full, failed attempts due a retry, and attempts abandoned mid-scan).
+# When the scan finishes the uploader gets a notification; for a bill of several
+# pages, once, when the last of them finishes and their results are merged.
+
+Status = models.BillUploadStatus
+
+
+class ScanQueue:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        concurrency: int,
+        queue_size: int,
+        timeout_seconds: float,
+        max_attempts: int,
+        sweep_seconds: float,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.sweep_seconds = sweep_seconds
+        self._queue: "asyncio.Queue[int]" = asyncio.Queue(queue_size)
+        # Jobs waiting in this process's queue, and the ones its workers are running
+        self._queued: Set[int] = set()
+        self._running: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def abandoned_after(self) -> timedelta:
+        # An attempt still processing this long after it started outlived its
+        # scan's timeout by a wide margin: the process running it has stopped.
+        return timedelta(seconds=2 * self.timeout_seconds)
+
+    def enqueue(self, upload_id: int) -> None:
+        """
+        Tells this process's workers about a job. Call it after the job is committed.
+        Never blocks: if the queue is full the next sweep picks the job up.
+        """
+        if upload_id in self._queued or upload_id in self._running:
+            return
+        try:
+            self._queue.put_nowait(upload_id)
+        except asyncio.QueueFull:
+            logger.warning("Scan queue is full, leaving upload %s for the next sweep", upload_id)
+            return
+        self._queued.add(upload_id)
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        # The first sweep runs straight away and picks up what the last run left.
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self) -> None:
+        """
+        Stops the workers without waiting for their scans. Jobs they were running
+        go back to pending, for the next process to start to pick up.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if not self._running:
+            return
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(models.BillUpload)
+                    .where(models.BillUpload.id.in_(self._running), models.BillUpload.status == Status.processing)
+                    # The interrupted attempt doesn't count
+                    .values(status=Status.pending, started_at=None, attempts=models.BillUpload.attempts - 1)
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Could not release %d running scans; they will be retried later", len(self._running))
+        self._running.clear()
+
+    async def _sweep(self) -> None:
+        while True:
+            try:
+                for upload_id in await self._due_jobs():
+                    self.enqueue(upload_id)
+            except Exception:
+                logger.exception("Could not look for scan jobs")
+            await asyncio.sleep(self.sweep_seconds)
+
+    async def _due_jobs(self) -> List[int]:
+        abandoned = datetime.now(timezone.utc) - self.abandoned_after
+        async with self.session_factory() as db:
+            return list(await db.scalars(
+                select(models.BillUpload.id)
+                .where(
+                    models.BillUpload.status.in_([Status.pending, Status.processing]),
+                    models.BillUpload.image_data.is_not(None),
+                    or_(models.BillUpload.status == Status.pending, models.BillUpload.started_at < abandoned),
+                )
+                .order_by(models.BillUpload.id)
+                .limit(self._queue.maxsize - self._queue.qsize())
+            ))
+
+    async def _work(self) -> None:
+        while True:
+            upload_id = await self._queue.get()
+            self._queued.discard(upload_id)
+            self._running.add(upload_id)
+            try:
+                await self._process(upload_id)
+            except Exception:
+                logger.exception("Scan job for upload %s failed; it will be retried", upload_id)
+            finally:
+                self._running.discard(upload_id)
+
+    async def _process(self, upload_id: int) -> None:
+        upload = models.BillUpload
+        abandoned = datetime.now(timezone.utc) - self.abandoned_after
+        async with self.session_factory() as db:
+            job = (await db.execute(
+                update(upload)
+                .where(
+                    upload.id == upload_id,
+                    # Bills of several pages have no image of their own; their pages do
+                    upload.image_data.is_not(None),
+                    or_(
+                        upload.status == Status.pending,
+                        and_(upload.status == Status.processing, upload.started_at < abandoned),
+                    ),
+                )
+                .values(status=Status.processing, started_at=datetime.now(timezone.utc), attempts=upload.attempts + 1)
+                .returning(
+                    upload.image_data, upload.image_content_type, upload.content_sha256,
+                    upload.uploader_id, upload.attempts, upload.batch_id,
+                )
+            )).first()
+            await db.commit()
+        if job is None:
+            # Another worker claimed it, or it is finished
+            return
+
+        # No connection is held through the model call, which takes seconds.
+        error: Optional[str] = None
+        try:
+            scanned = await asyncio.wait_for(
+                bill_scanner.scan_bill_image(image_contents=job.image_data, content_type=job.image_content_type),
+                self.timeout_seconds,
+            )
+            # Only results that match the response schema are worth keeping.
+            result = scanner_schema.BillScanResponse.model_validate(scanned).model_dump()
+        except asyncio.TimeoutError:
+            error = f"The scan took longer than {self.timeout_seconds:g} seconds."
+        except Exception as e:
+            error = f"Failed to process bill image: {e}"
+
+        if error is not None and job.attempts < self.max_attempts:
+            # Back to pending: the next sweep retries it
+            await self._finish(upload_id, None, status=Status.pending, started_at=None, error_message=error)
+            return
+        if error is not None:
+            logger.warning("Giving up on upload %s after %d attempts: %s", upload_id, job.attempts, error)
+            values = {"status": Status.failed, "error_message": error}
+        else:
+            values = {"status": Status.completed, "raw_scan_data": result, "error_message": None}
+            scan_cache.scan_cache.set(job.content_sha256, result)
+        finished = await self._finish(
+            upload_id, job.batch_id, image_data=None, completed_at=datetime.now(timezone.utc), **values
+        )
+        if finished is not None:
+            self._notify(job.uploader_id, *finished)
+
+    async def _finish(self, upload_id: int, batch_id: Optional[int], **values) -> Optional[Tuple[int, Status, Optional[dict]]]:
+        """
+        Updates a job's upload and, when it is the last page of a bill to finish,
+        the bill's. Returns the (upload id, status, result) to tell the uploader
+        about, if something finished.
+        """
+        async with self.session_factory() as db:
+            updated = await db.execute(
+                update(models.BillUpload)
+                .where(models.BillUpload.id == upload_id, models.BillUpload.status == Status.processing)
+                .values(**values)
+            )
+            finished = None
+            if updated.rowcount and values["status"] not in bill_pages.UNFINISHED:
+                if batch_id is None:
+                    finished = (upload_id, values["status"], values.get("raw_scan_data"))
+                else:
+                    finished = await self._finish_batch(db, batch_id)
+            await db.commit()
+        return finished
+
+    async def _finish_batch(self, db: AsyncSession, batch_id: int) -> Optional[Tuple[int, Status, Optional[dict]]]:
+        # The bill is locked first. Of several pages finishing at once, each waits
+        # for the one before to commit, so the last sees all the others finished.
+        batch_status = await db.scalar(
+            select(models.BillUpload.status).where(models.BillUpload.id == batch_id).with_for_update()
+        )
+        if batch_status not in bill_pages.UNFINISHED:
+            return None
+        pages = (await db.execute(
+            select(models.BillUpload.status, models.BillUpload.raw_scan_data)
+            .where(models.BillUpload.batch_id == batch_id)
+            .order_by(models.BillUpload.page)
+        )).all()
+        outcome = bill_pages.batch_outcome([(page.status, page.raw_scan_data) for page in pages])
+        if outcome is None:
+            return None
+        await db.execute(update(models.BillUpload).where(models.BillUpload.id == batch_id).values(**outcome))
+        return batch_id, outcome["status"], outcome.get("raw_scan_data")
+
+    def _notify(self, uploader_id: int, upload_id: int, status: Status, result: Optional[dict]) -> None:
+        if status == Status.failed:
+            message = "Your bill couldn't be scanned. Please try again with a clearer photo."
+        else:
+            items = len(result["line_items"])
+            message = (f"Your bill is scanned: {items} item{'' if items == 1 else 's'}, "
+                       f"{result['grand_total']:.2f} in total")
+            if status == Status.review_needed:
+                message += ". Some pages couldn't be read, so please check it"
+        notification_service.notify(
+            [uploader_id], type=f"bill_scan.{status.value}", message=message, related_entity_id=upload_id
+        )
+
+
+scan_queue = ScanQueue(
+    SessionLocal,
+    concurrency=settings.SCAN_WORKERS,
+    queue_size=settings.SCAN_QUEUE_SIZE,
+    timeout_seconds=settings.SCAN_JOB_TIMEOUT_SECONDS,
+    max_attempts=settings.SCAN_JOB_MAX_ATTEMPTS,
+    sweep_seconds=settings.SCAN_JOB_SWEEP_SECONDS,
+)
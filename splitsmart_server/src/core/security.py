@@ -2,10 +2,13 @@ from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from src.core.config import settings
-from typing import Optional
+from src.core.process_pool import SpawnPool
+from typing import Optional, Tuple
 # --- Password Hashing ---
 # We use passlib's CryptContext to handle hashing. bcrypt is a strong choice.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost factor than BCRYPT_ROUNDS are reported as
+# needing an update by `verify_and_update`.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a plain password against a hashed one."""
@@ -15,6 +18,44 @@ def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
     return pwd_context.hash(password)
 
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if its hash uses outdated settings, also returns a new hash.
+    Returns (is_valid, new_hash_or_None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# --- Password Hashing Pool ---
+# bcrypt takes a few hundred milliseconds of CPU per call, which would stall the
+# event loop (or hog a threadpool slot and the GIL). The async wrappers below run
+# it in a small process pool instead, and refuse work once too much is queued so
+# a burst of logins cannot build an unbounded backlog.
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool already has too much work queued."""
+
+hash_pool = SpawnPool(max_workers=settings.PASSWORD_HASH_WORKERS)
+_pending_hashes = 0
+
+async def _run_in_hash_pool(fn, *args):
+    global _pending_hashes
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHasherBusy()
+    _pending_hashes += 1
+    try:
+        return await hash_pool.run(fn, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def hash_password(password: str) -> str:
+    """Hashes a plain password in the hashing pool."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def check_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Runs `verify_and_update` in the hashing pool."""
+    return await _run_in_hash_pool(verify_and_update, plain_password, hashed_password)
+
 
 # --- JSON Web Tokens (JWT) ---
 # These are used for authenticating users after they log in.
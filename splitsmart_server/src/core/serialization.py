@@ -0,0 +1,33 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# --- Response Serialization ---
+# For a route with a `response_model`, FastAPI validates what the route returns
+# into models, dumps them back to Python dicts and only then encodes JSON. List
+# routes can skip the middle step: `json_response` reads the ORM objects and
+# writes JSON bytes in one pass inside pydantic-core, with a TypeAdapter that is
+# built once per response type rather than per request.
+
+
+@lru_cache(maxsize=None)
+def adapter_for(response_type: Any) -> TypeAdapter:
+    """The (cached) TypeAdapter for `response_type`, e.g. `List[Expense]`."""
+    return TypeAdapter(response_type)
+
+
+def json_response(
+    response_type: Any,
+    content: Any,
+    headers: Optional[Mapping[str, str]] = None,
+    status_code: int = 200,
+) -> Response:
+    """
+    Serializes `content` (ORM objects or plain data) as `response_type` into a
+    ready JSON response. Routes should still declare `response_model` for the docs.
+    """
+    adapter = adapter_for(response_type)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
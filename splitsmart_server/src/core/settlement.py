@@ -0,0 +1,78 @@
+import heapq
+from collections import defaultdict
+from typing import Dict, List
+
+from src.schemas.payment import PaymentCreate
+
+# --- Debt Simplification ---
+# Balances are converted to integer cents up front so that matching is exact
+# and no transfer is ever produced from floating-point residue.
+
+
+def _to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def simplify_debts(balances: List[dict]) -> List[dict]:
+    """
+    Builds a settle-up plan from the output of `crud_group.get_group_balances`.
+
+    1. Debtors and creditors whose amounts cancel exactly are paired first,
+       since each such pair settles two people with a single transfer.
+    2. The rest are matched greedily with two max-heaps: the largest debtor pays
+       the largest creditor, and whoever is left with a remainder goes back on
+       the heap. This produces at most (n - 1) transfers in O(n log n).
+
+    Returns a list of {"from_user_id", "to_user_id", "amount"} dictionaries.
+    """
+    creditors: Dict[int, List[int]] = defaultdict(list)  # cents -> user ids owed that amount
+    debtors: Dict[int, List[int]] = defaultdict(list)    # cents -> user ids owing that amount
+    for entry in balances:
+        cents = _to_cents(entry["balance"])
+        if cents > 0:
+            creditors[cents].append(entry["user_id"])
+        elif cents < 0:
+            debtors[-cents].append(entry["user_id"])
+
+    transfers = []
+
+    # 1. Exact matches.
+    for cents, debtor_ids in debtors.items():
+        creditor_ids = creditors.get(cents)
+        while debtor_ids and creditor_ids:
+            transfers.append((debtor_ids.pop(), creditor_ids.pop(), cents))
+
+    # 2. Greedy matching on whatever is left.
+    creditor_heap = [(-cents, uid) for cents, ids in creditors.items() for uid in ids]
+    debtor_heap = [(-cents, uid) for cents, ids in debtors.items() for uid in ids]
+    heapq.heapify(creditor_heap)
+    heapq.heapify(debtor_heap)
+
+    while creditor_heap and debtor_heap:
+        credit, creditor_id = heapq.heappop(creditor_heap)
+        debt, debtor_id = heapq.heappop(debtor_heap)
+        amount = min(-credit, -debt)
+        transfers.append((debtor_id, creditor_id, amount))
+
+        if -credit > amount:
+            heapq.heappush(creditor_heap, (credit + amount, creditor_id))
+        elif -debt > amount:
+            heapq.heappush(debtor_heap, (debt + amount, debtor_id))
+
+    return [
+        {"from_user_id": debtor_id, "to_user_id": creditor_id, "amount": cents / 100}
+        for debtor_id, creditor_id, cents in transfers
+    ]
+
+
+def to_payment_create(transfer: dict, currency: str) -> PaymentCreate:
+    """
+    Converts a settle-up transfer into a payload that the paying user
+    (`from_user_id`) can post as-is to `POST /groups/{group_id}/payments`.
+    """
+    return PaymentCreate(
+        amount=transfer["amount"],
+        currency=currency,
+        paid_to_id=transfer["to_user_id"],
+        notes="Settle up",
+    )
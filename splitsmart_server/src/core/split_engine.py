@@ -0,0 +1,172 @@
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # The pure-Python path below covers every case, just more slowly.
+    np = None
+
+from src.db.models import SplitType
+from src.schemas import expense as expense_schema
+
+# Above this many participants the allocation switches to the NumPy path.
+VECTORIZE_THRESHOLD = 200
+
+# Percentages are user input; allow for the usual rounding of things like 33.33 + 33.33 + 33.34.
+PERCENTAGE_TOLERANCE = 0.01
+
+
+class SplitError(Exception):
+    """Raised when the split instructions in an expense cannot be turned into amounts."""
+    def __init__(self, detail: str):
+        self.detail = detail
+        super().__init__(detail)
+
+
+@dataclass
+class ComputedSplit:
+    user_id: int
+    owed_cents: int
+    split_details: Optional[dict] = field(default=None)
+
+    @property
+    def owed_amount(self) -> float:
+        return self.owed_cents / 100
+
+
+def to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+# --- Largest-Remainder Allocation ---
+
+def allocate_cents(total_cents: int, weights: Sequence[float]) -> List[int]:
+    """
+    Splits `total_cents` in proportion to `weights` so that the parts are whole
+    cents and always add up to exactly `total_cents`.
+    Every part is first rounded down; the cents left over go to the parts with
+    the largest fractional remainders (earlier parts win ties).
+    """
+    if not weights:
+        return []
+    if total_cents < 0:
+        return [-part for part in allocate_cents(-total_cents, weights)]
+    if np is not None and len(weights) >= VECTORIZE_THRESHOLD:
+        return _allocate_cents_vectorized(total_cents, weights)
+
+    weight_sum = math.fsum(weights)
+    if weight_sum <= 0:
+        raise SplitError("Split weights must add up to more than zero.")
+
+    quotas = [total_cents * w / weight_sum for w in weights]
+    parts = [math.floor(q) for q in quotas]
+    leftover = min(max(total_cents - sum(parts), 0), len(parts))
+    by_remainder = sorted(range(len(parts)), key=lambda i: parts[i] - quotas[i])
+    for i in by_remainder[:leftover]:
+        parts[i] += 1
+    return parts
+
+
+def _allocate_cents_vectorized(total_cents: int, weights: Sequence[float]) -> List[int]:
+    """NumPy version of `allocate_cents` for large groups."""
+    w = np.asarray(weights, dtype=np.float64)
+    weight_sum = w.sum()
+    if weight_sum <= 0:
+        raise SplitError("Split weights must add up to more than zero.")
+
+    quotas = total_cents * w / weight_sum
+    parts = np.floor(quotas).astype(np.int64)
+    leftover = int(min(max(total_cents - int(parts.sum()), 0), len(parts)))
+    if leftover:
+        order = np.argsort(parts - quotas, kind="stable")
+        parts[order[:leftover]] += 1
+    return parts.tolist()
+
+
+# --- Split Computation ---
+
+def compute_splits(expense_in: expense_schema.ExpenseCreate, member_ids: Sequence[int]) -> List[ComputedSplit]:
+    """
+    Works out what each participant owes for an expense, in whole cents.
+
+    - equally: the listed participants (or every member if none are listed) get equal parts.
+    - by_percentage: each split carries a `percentage`; together they must make 100.
+    - by_shares: each split carries a number of `shares`.
+    - by_item: each item is shared equally by its `user_ids`. Whatever is left of the
+      total (tax, tip, discounts) is spread in proportion to each person's items.
+
+    If a mode's inputs are missing but every split has an explicit `owed_amount`, those
+    amounts are used as-is and must add up to the total to the cent.
+    """
+    total_cents = to_cents(expense_in.total_amount)
+    splits = expense_in.splits
+    split_type = expense_in.split_type
+
+    # Every mode gives each listed user one row, so a repeated user would be
+    # stored twice and owe twice.
+    _ensure_unique([s.user_id for s in splits], "the split")
+
+    if split_type == SplitType.equally:
+        user_ids = [s.user_id for s in splits] or list(member_ids)
+        parts = allocate_cents(total_cents, [1] * len(user_ids))
+        return [ComputedSplit(uid, cents) for uid, cents in zip(user_ids, parts)]
+
+    if split_type == SplitType.by_item and expense_in.items:
+        return _compute_item_splits(total_cents, expense_in.items)
+
+    if split_type == SplitType.by_percentage and splits and all(s.percentage is not None for s in splits):
+        total_percentage = math.fsum(s.percentage for s in splits)
+        if abs(total_percentage - 100) > PERCENTAGE_TOLERANCE:
+            raise SplitError(f"Split percentages add up to {total_percentage}, not 100.")
+        parts = allocate_cents(total_cents, [s.percentage for s in splits])
+        return [
+            ComputedSplit(s.user_id, cents, {"percentage": s.percentage})
+            for s, cents in zip(splits, parts)
+        ]
+
+    if split_type == SplitType.by_shares and splits and all(s.shares is not None for s in splits):
+        parts = allocate_cents(total_cents, [s.shares for s in splits])
+        return [
+            ComputedSplit(s.user_id, cents, {"shares": s.shares})
+            for s, cents in zip(splits, parts)
+        ]
+
+    if splits and all(s.owed_amount is not None for s in splits):
+        computed = [ComputedSplit(s.user_id, to_cents(s.owed_amount)) for s in splits]
+        split_cents = sum(c.owed_cents for c in computed)
+        if split_cents != total_cents:
+            raise SplitError(
+                f"Sum of splits ({split_cents / 100}) does not match total amount ({expense_in.total_amount})."
+            )
+        return computed
+
+    raise SplitError(f"Missing split information for split type '{split_type.value}'.")
+
+
+def _ensure_unique(user_ids: Sequence[int], where: str) -> None:
+    seen = set()
+    for user_id in user_ids:
+        if user_id in seen:
+            raise SplitError(f"User with ID {user_id} appears more than once in {where}.")
+        seen.add(user_id)
+
+
+def _compute_item_splits(total_cents: int, items: List[expense_schema.ExpenseItemCreate]) -> List[ComputedSplit]:
+    item_cents: Dict[int, int] = defaultdict(int)
+    for item in items:
+        # Users can share several items, but each item only once.
+        _ensure_unique(item.user_ids, "an item")
+        for user_id, cents in zip(item.user_ids, allocate_cents(to_cents(item.amount), [1] * len(item.user_ids))):
+            item_cents[user_id] += cents
+
+    user_ids = list(item_cents)
+    subtotals = [item_cents[uid] for uid in user_ids]
+    # Tax, tip or a discount: the part of the total not covered by the items.
+    extras = allocate_cents(total_cents - sum(subtotals), subtotals)
+
+    return [
+        ComputedSplit(uid, subtotal + extra, {"items_amount": subtotal / 100})
+        for uid, subtotal, extra in zip(user_ids, subtotals, extras)
+    ]
@@ -0,0 +1,64 @@
+from typing import Dict, List
+
+from sqlalchemy import delete, exists, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db import models
+
+
+async def get_groups_to_archive(db: AsyncSession) -> List[int]:
+    """
+    Ids of archived groups that still have expenses or payments in the hot tables.
+    """
+    Expense, Payment = models.Expense, models.Payment
+    result = await db.execute(
+        select(models.Group.id)
+        .where(
+            models.Group.status == models.GroupStatus.archived,
+            or_(
+                exists().where(Expense.group_id == models.Group.id),
+                exists().where(Payment.group_id == models.Group.id),
+            ),
+        )
+        .order_by(models.Group.id)
+    )
+    return list(result.scalars())
+
+
+async def move_group_to_archive(db: AsyncSession, group_id: int) -> Dict[str, int]:
+    """
+    Moves a group's expenses, splits and payments into the archive tables, keeping
+    their ids. The group's ledger rows are left alone, so its balances stay frozen
+    at their final values. Returns how many rows of each kind were moved.
+    The caller is responsible for committing.
+    """
+    expenses = models.Expense.__table__
+    splits = models.ExpenseSplit.__table__
+    payments = models.Payment.__table__
+    group_expense_ids = select(expenses.c.id).where(expenses.c.group_id == group_id)
+
+    moves = [
+        (
+            "expense_splits",
+            splits,
+            models.expense_splits_archive_table,
+            splits.c.expense_id.in_(group_expense_ids),
+        ),
+        ("expenses", expenses, models.expenses_archive_table, expenses.c.group_id == group_id),
+        ("payments", payments, models.payments_archive_table, payments.c.group_id == group_id),
+    ]
+    moved = {}
+    # Copy everything before deleting anything: splits reference their expenses.
+    for name, source, archive, condition in moves:
+        columns = [column.name for column in source.columns]
+        result = await db.execute(
+            insert(archive).from_select(columns, select(*source.columns).where(condition))
+        )
+        moved[name] = result.rowcount
+    for name, source, archive, condition in moves:
+        await db.execute(delete(source).where(condition))
+    # The group's expense list is now empty, so its ETags must change
+    await db.execute(
+        update(models.Group).where(models.Group.id == group_id).values(version=models.Group.version + 1)
+    )
+    return moved
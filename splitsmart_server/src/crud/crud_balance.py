@@ -0,0 +1,216 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db import models
+
+Ledger = models.GroupMemberBalance
+
+
+async def add_member_rows(db: AsyncSession, group_id: int, user_ids: Iterable[int]) -> None:
+    """
+    Stages an empty ledger row for each new member of a group.
+    The caller is responsible for committing.
+    """
+    await db.execute(
+        insert(Ledger),
+        [
+            {
+                "group_id": group_id,
+                "user_id": user_id,
+                "total_paid": 0,
+                "total_owed": 0,
+                "payments_sent": 0,
+                "payments_received": 0,
+            }
+            for user_id in user_ids
+        ],
+    )
+
+
+LEDGER_COLUMNS = ("total_paid", "total_owed", "payments_sent", "payments_received")
+
+
+async def _upsert_ledger_rows(db: AsyncSession, group_id: int, deltas_by_user: Dict[int, Dict[str, float]]) -> None:
+    """
+    Atomically adds each member's deltas to their ledger row, creating the row if
+    the member predates the ledger and `rebuild_balances` has not been run yet.
+    One multi-row `INSERT ... ON CONFLICT DO UPDATE` however many members there are,
+    using `col = col + delta` so concurrent writers never lose each other's updates,
+    with the rows in id order so writers lock them in the same order and cannot deadlock.
+    """
+    if not deltas_by_user:
+        return
+    connection = await db.connection()
+    upsert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    statement = upsert(Ledger).values([
+        {"group_id": group_id, "user_id": user_id, **{name: 0 for name in LEDGER_COLUMNS}, **deltas_by_user[user_id]}
+        for user_id in sorted(deltas_by_user)
+    ])
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[Ledger.group_id, Ledger.user_id],
+            set_={name: getattr(Ledger, name) + statement.excluded[name] for name in LEDGER_COLUMNS},
+        )
+    )
+
+
+async def apply_expense(
+    db: AsyncSession,
+    group_id: int,
+    paid_by_id: int,
+    total_amount: float,
+    splits: Iterable[Tuple[int, float]],
+    sign: int = 1,
+) -> Dict[int, float]:
+    """
+    Stages the ledger changes for an expense: the payer's `total_paid` grows by the
+    total and each participant's `total_owed` grows by their share.
+    Pass `sign=-1` to reverse a previously applied expense.
+    """
+    return await apply_expenses(db, group_id, [(paid_by_id, total_amount, splits)], sign=sign)
+
+
+async def apply_expenses(
+    db: AsyncSession,
+    group_id: int,
+    expenses: Iterable[Tuple[int, float, Iterable[Tuple[int, float]]]],
+    sign: int = 1,
+) -> Dict[int, float]:
+    """
+    Stages the ledger changes for many expenses of one group, given as
+    (paid_by_id, total_amount, splits) tuples. The changes are summed per member
+    first, so each member's row is updated once however many expenses there are.
+    Returns the change in each affected member's net balance.
+    """
+    paid_by_user = defaultdict(float)
+    owed_by_user = defaultdict(float)
+    for paid_by_id, total_amount, splits in expenses:
+        paid_by_user[paid_by_id] += total_amount
+        for user_id, owed_amount in splits:
+            owed_by_user[user_id] += owed_amount
+
+    deltas_by_user = defaultdict(dict)
+    for user_id, amount in paid_by_user.items():
+        deltas_by_user[user_id]["total_paid"] = sign * amount
+    for user_id, amount in owed_by_user.items():
+        deltas_by_user[user_id]["total_owed"] = sign * amount
+    await _upsert_ledger_rows(db, group_id, deltas_by_user)
+    return {
+        user_id: deltas.get("total_paid", 0) - deltas.get("total_owed", 0)
+        for user_id, deltas in deltas_by_user.items()
+    }
+
+
+async def apply_payment(
+    db: AsyncSession, group_id: int, paid_by_id: int, paid_to_id: int, amount: float, sign: int = 1
+) -> Dict[int, float]:
+    """
+    Stages the ledger changes for a settlement payment between two members.
+    Returns the change in both members' net balances.
+    """
+    await _upsert_ledger_rows(db, group_id, {
+        paid_by_id: {"payments_sent": sign * amount},
+        paid_to_id: {"payments_received": sign * amount},
+    })
+    return {paid_by_id: sign * amount, paid_to_id: -sign * amount}
+
+
+async def rebuild_balances(db: AsyncSession, group_id: Optional[int] = None) -> int:
+    """
+    Recomputes the ledger from the raw expense, split and payment rows, counting
+    only active expenses and completed payments.
+    Rebuilds a single group when `group_id` is given, otherwise every group.
+    Archived groups are skipped: their rows have moved to the archive tables and
+    their ledger rows hold the frozen final balances.
+    Returns the number of ledger rows written. The caller is responsible for committing.
+    """
+    members = models.group_members_table
+    live = models.expense_status_is(models.ExpenseStatus.active)
+
+    paid = (
+        select(
+            models.Expense.group_id,
+            models.Expense.paid_by_id.label("user_id"),
+            func.sum(models.Expense.total_amount).label("amount"),
+        )
+        .where(live)
+        .group_by(models.Expense.group_id, models.Expense.paid_by_id)
+        .subquery()
+    )
+    owed = (
+        select(
+            models.Expense.group_id,
+            models.ExpenseSplit.user_id,
+            func.sum(models.ExpenseSplit.owed_amount).label("amount"),
+        )
+        .join(models.Expense, models.ExpenseSplit.expense_id == models.Expense.id)
+        .where(live)
+        .group_by(models.Expense.group_id, models.ExpenseSplit.user_id)
+        .subquery()
+    )
+    completed = models.Payment.status == models.PaymentStatus.completed
+    sent = (
+        select(
+            models.Payment.group_id,
+            models.Payment.paid_by_id.label("user_id"),
+            func.sum(models.Payment.amount).label("amount"),
+        )
+        .where(completed)
+        .group_by(models.Payment.group_id, models.Payment.paid_by_id)
+        .subquery()
+    )
+    received = (
+        select(
+            models.Payment.group_id,
+            models.Payment.paid_to_id.label("user_id"),
+            func.sum(models.Payment.amount).label("amount"),
+        )
+        .where(completed)
+        .group_by(models.Payment.group_id, models.Payment.paid_to_id)
+        .subquery()
+    )
+
+    def _join(query, sub):
+        return query.outerjoin(
+            sub, (sub.c.group_id == members.c.group_id) & (sub.c.user_id == members.c.user_id)
+        )
+
+    source = select(
+        members.c.group_id,
+        members.c.user_id,
+        func.coalesce(paid.c.amount, 0),
+        func.coalesce(owed.c.amount, 0),
+        func.coalesce(sent.c.amount, 0),
+        func.coalesce(received.c.amount, 0),
+    ).select_from(members)
+    for sub in (paid, owed, sent, received):
+        source = _join(source, sub)
+
+    archived_groups = select(models.Group.id).where(models.Group.status == models.GroupStatus.archived)
+    source = source.where(members.c.group_id.not_in(archived_groups))
+    clear = delete(Ledger).where(Ledger.group_id.not_in(archived_groups))
+    # Rebuilt balances may differ from the cached ones, so the groups' ETags must change.
+    # `updated_at` is the groups' last activity, which a rebuild is not.
+    bump = (
+        update(models.Group)
+        .where(models.Group.status != models.GroupStatus.archived)
+        .values(version=models.Group.version + 1, updated_at=models.Group.updated_at)
+    )
+    if group_id is not None:
+        source = source.where(members.c.group_id == group_id)
+        clear = clear.where(Ledger.group_id == group_id)
+        bump = bump.where(models.Group.id == group_id)
+
+    await db.execute(clear)
+    result = await db.execute(
+        insert(Ledger).from_select(
+            ["group_id", "user_id", "total_paid", "total_owed", "payments_sent", "payments_received"],
+            source,
+        )
+    )
+    await db.execute(bump, execution_options={"synchronize_session": False})
+    return result.rowcount
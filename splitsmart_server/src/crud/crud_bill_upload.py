@@ -0,0 +1,225 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, selectinload
+from src.db import models
+from src.core import bill_pages, image_preprocessing, scan_cache
+from src.core.scan_jobs import scan_queue
+from src.core.config import settings
+
+async def get_scan_by_content_hash(db: AsyncSession, content_sha256: str) -> Optional[dict]:
+    """The result of the latest completed scan of exactly these image bytes, if any."""
+    return await db.scalar(
+        select(models.BillUpload.raw_scan_data)
+        .where(
+            models.BillUpload.content_sha256 == content_sha256,
+            models.BillUpload.status == models.BillUploadStatus.completed,
+        )
+        .order_by(models.BillUpload.id.desc())
+        .limit(1)
+    )
+
+async def find_similar_scan(db: AsyncSession, perceptual_hash: int, user_id: int) -> Optional[dict]:
+    """
+    The result of the closest recent completed scan whose perceptual hash is within
+    SCAN_SIMILAR_MAX_DISTANCE bits of `perceptual_hash`, if any.
+    Only uploads from the last SCAN_SIMILAR_WINDOW_HOURS by the user or by people
+    sharing a group with them are considered: two different bills can look alike,
+    and a stranger's bill must never come back as this one.
+    """
+    members = models.group_members_table
+    peers = select(members.c.user_id).where(
+        members.c.group_id.in_(select(members.c.group_id).where(members.c.user_id == user_id))
+    )
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.SCAN_SIMILAR_WINDOW_HOURS)
+    candidates = (await db.execute(
+        select(models.BillUpload.id, models.BillUpload.perceptual_hash)
+        .where(
+            or_(models.BillUpload.uploader_id == user_id, models.BillUpload.uploader_id.in_(peers)),
+            models.BillUpload.created_at >= since,
+            models.BillUpload.perceptual_hash.is_not(None),
+            models.BillUpload.status == models.BillUploadStatus.completed,
+        )
+        # Newest first, so ties go to the latest upload
+        .order_by(models.BillUpload.id.desc())
+    )).all()
+
+    best_id, best_distance = None, settings.SCAN_SIMILAR_MAX_DISTANCE + 1
+    for candidate in candidates:
+        distance = scan_cache.hamming_distance(candidate.perceptual_hash, perceptual_hash)
+        if distance < best_distance:
+            best_id, best_distance = candidate.id, distance
+    if best_id is None:
+        return None
+    return await db.scalar(select(models.BillUpload.raw_scan_data).where(models.BillUpload.id == best_id))
+
+async def get_bill_upload(db: AsyncSession, upload_id: int, uploader_id: int) -> Optional[models.BillUpload]:
+    """One of the user's uploads, with its pages if it has any, without the stored images."""
+    return await db.scalar(
+        select(models.BillUpload)
+        .options(
+            defer(models.BillUpload.image_data),
+            selectinload(models.BillUpload.pages).defer(models.BillUpload.image_data),
+        )
+        .where(models.BillUpload.id == upload_id, models.BillUpload.uploader_id == uploader_id)
+    )
+
+async def get_unfinished_upload(db: AsyncSession, content_sha256: str, uploader_id: int) -> Optional[models.BillUpload]:
+    """The user's queued or running single-image scan of exactly these bytes, if any."""
+    return await db.scalar(
+        select(models.BillUpload)
+        .options(defer(models.BillUpload.image_data), selectinload(models.BillUpload.pages))
+        .where(
+            models.BillUpload.content_sha256 == content_sha256,
+            models.BillUpload.uploader_id == uploader_id,
+            models.BillUpload.batch_id.is_(None),
+            models.BillUpload.status.in_([models.BillUploadStatus.pending, models.BillUploadStatus.processing]),
+        )
+        .order_by(models.BillUpload.id.desc())
+        .limit(1)
+    )
+
+async def _get_cached_scan(db: AsyncSession, content_sha256: str) -> Optional[dict]:
+    """An earlier result for exactly these bytes: from the in-process cache, else the database."""
+    result = scan_cache.scan_cache.get(content_sha256)
+    if result is None:
+        result = await get_scan_by_content_hash(db, content_sha256)
+        if result is not None:
+            scan_cache.scan_cache.set(content_sha256, result)
+    return result
+
+def _image_upload(
+    uploader: models.User,
+    content_sha256: str,
+    prepared: Optional[image_preprocessing.PreparedImage],
+    result: Optional[dict],
+    **columns,
+) -> models.BillUpload:
+    """A completed upload if there is a `result` to reuse, else a pending one holding the prepared image."""
+    upload = models.BillUpload(
+        # Images are not kept once scanned; the content hash identifies the one that was.
+        image_url=f"sha256:{content_sha256}",
+        uploader_id=uploader.id,
+        content_sha256=content_sha256,
+        perceptual_hash=prepared.perceptual_hash if prepared is not None else None,
+        pages=[],
+        **columns,
+    )
+    if result is not None:
+        upload.status = models.BillUploadStatus.completed
+        upload.raw_scan_data = result
+        upload.completed_at = datetime.now(timezone.utc)
+    else:
+        upload.status = models.BillUploadStatus.pending
+        upload.image_data = prepared.data
+        upload.image_content_type = prepared.content_type
+    return upload
+
+async def create_scan(
+    db: AsyncSession,
+    image_contents: bytes,
+    uploader: models.User,
+    refresh: bool = False,
+) -> Tuple[models.BillUpload, str]:
+    """
+    Creates a `BillUpload` for a bill image, reusing an earlier result for the same
+    image when there is one. Lookups go from cheapest to dearest: the in-process
+    cache by content hash, earlier uploads with the same content hash, then recent
+    near-identical uploads by perceptual hash; any of them gives a completed upload.
+    Otherwise the image, preprocessed to a small grayscale crop of the receipt, is
+    stored on a pending upload and queued to be scanned. Uploading the same bytes
+    again while their scan is still queued or running returns that upload.
+    With `refresh`, the image is always scanned again.
+
+    Returns the upload and how it was found: "hit" (same bytes), "similar"
+    (a near-identical image) or "miss" (queued to be scanned).
+
+    Raises:
+        InvalidImage: If the bytes are not an image.
+    """
+    content_sha256 = scan_cache.content_hash(image_contents)
+    result, cache_status, prepared = None, "miss", None
+    if not refresh:
+        result = await _get_cached_scan(db, content_sha256)
+        if result is not None:
+            cache_status = "hit"
+        else:
+            unfinished = await get_unfinished_upload(db, content_sha256, uploader_id=uploader.id)
+            if unfinished is not None:
+                return unfinished, "miss"
+
+    if result is None:
+        prepared = await image_preprocessing.prepare_bill_image(image_contents)
+        if not refresh and settings.SCAN_SIMILAR_MAX_DISTANCE > 0:
+            result = await find_similar_scan(db, prepared.perceptual_hash, user_id=uploader.id)
+            if result is not None:
+                cache_status = "similar"
+
+    upload = _image_upload(uploader, content_sha256, prepared, result)
+    db.add(upload)
+    await db.commit()
+    await db.refresh(upload, ["created_at"])
+    if upload.status == models.BillUploadStatus.pending:
+        scan_queue.enqueue(upload.id)
+    return upload, cache_status
+
+async def create_batch_scan(
+    db: AsyncSession,
+    images: List[bytes],
+    uploader: models.User,
+    refresh: bool = False,
+) -> models.BillUpload:
+    """
+    Creates one `BillUpload` for a bill photographed in several pages, in order,
+    with an upload per page. Each page is looked up and queued like a single image
+    (`create_scan`), the pages needing it preprocessed SCAN_BATCH_CONCURRENCY at a
+    time, and all of them are queued at once so they are scanned side by side.
+    When the last page finishes the pages' results are merged into the bill's
+    (`bill_pages.merge_pages`); if every page is a cache hit, that is straight away.
+
+    Raises:
+        InvalidImage: If a page is not an image.
+    """
+    hashes = [scan_cache.content_hash(image) for image in images]
+    results: List[Optional[dict]] = [None] * len(images)
+    if not refresh:
+        for index, content_sha256 in enumerate(hashes):
+            results[index] = await _get_cached_scan(db, content_sha256)
+
+    semaphore = asyncio.Semaphore(settings.SCAN_BATCH_CONCURRENCY)
+    async def prepare(index: int) -> image_preprocessing.PreparedImage:
+        async with semaphore:
+            try:
+                return await image_preprocessing.prepare_bill_image(images[index])
+            except image_preprocessing.InvalidImage:
+                raise image_preprocessing.InvalidImage(f"Page {index + 1} could not be read as an image.")
+
+    to_prepare = [index for index, result in enumerate(results) if result is None]
+    prepared: List[Optional[image_preprocessing.PreparedImage]] = [None] * len(images)
+    for index, page in zip(to_prepare, await asyncio.gather(*(prepare(index) for index in to_prepare))):
+        prepared[index] = page
+        if not refresh and settings.SCAN_SIMILAR_MAX_DISTANCE > 0:
+            results[index] = await find_similar_scan(db, page.perceptual_hash, user_id=uploader.id)
+
+    pages = [
+        _image_upload(uploader, content_sha256, page_prepared, result, page=number)
+        for number, (content_sha256, page_prepared, result) in enumerate(zip(hashes, prepared, results), start=1)
+    ]
+    batch = models.BillUpload(
+        image_url=f"pages:{len(pages)}",
+        uploader_id=uploader.id,
+        status=models.BillUploadStatus.pending,
+        pages=pages,
+    )
+    outcome = bill_pages.batch_outcome([(page.status, page.raw_scan_data) for page in pages])
+    for column, value in (outcome or {}).items():
+        setattr(batch, column, value)
+    db.add(batch)
+    await db.commit()
+    await db.refresh(batch, ["created_at"])
+    for page in pages:
+        if page.status == models.BillUploadStatus.pending:
+            scan_queue.enqueue(page.id)
+    return batch
@@ -1,10 +1,26 @@
-import math
-from sqlalchemy.orm import Session
-from typing import List
+import json
+from datetime import datetime, timezone
+from sqlalchemy import Select, exists, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from src.db import models
 from src.schemas import expense as expense_schema
-from src.crud import crud_group
+from src.crud import crud_group, crud_balance
+from src.core import split_engine
+from src.core.events import balances_event, event_hub, group_event
+from src.core.notifications import display_name, notification_service
+
+# Everything the `Expense` response schema touches, loaded up front so that
+# serializing a list of expenses does not lazy-load users and splits one row at a time.
+EXPENSE_LOAD_OPTIONS = (
+    joinedload(models.Expense.paid_by),
+    selectinload(models.Expense.splits).joinedload(models.ExpenseSplit.user),
+)
+
+# Expenses per INSERT ... RETURNING statement in a bulk import
+IMPORT_CHUNK_SIZE = 1000
 
 class CrudError(Exception):
     """Custom exception class for CRUD operations."""
@@ -12,32 +28,78 @@ class CrudError(Exception):
         self.detail = detail
 
 
-def create_expense(db: Session, expense_in: expense_schema.ExpenseCreate, group: models.Group, creator: models.User) -> models.Expense:
+GROUP_ARCHIVED = "This group is archived and can no longer be changed."
+
+
+def ensure_group_is_open(group: crud_group.GroupHandle) -> None:
     """
-    Creates a new expense and its corresponding splits within a single database transaction.
+    Archived groups are read-only. This only checks the (possibly cached) handle,
+    to fail fast; `bump_open_group_version` is the authoritative check.
+    """
+    if group.status == models.GroupStatus.archived:
+        raise CrudError(GROUP_ARCHIVED)
+
+
+async def bump_open_group_version(db: AsyncSession, group_id: int) -> int:
+    """
+    Advances the group's version in the write's transaction, checking the group
+    row itself is still open. Raises CrudError if it has been archived meanwhile;
+    the caller must roll back.
+    """
+    version = await crud_group.bump_version(db, group_id=group_id)
+    if version is None:
+        raise CrudError(GROUP_ARCHIVED)
+    return version
+
+
+def _event_data(expense: models.Expense) -> dict:
+    """An expense as sent in group events: the normalized shape, with user ids only."""
+    return expense_schema.ExpenseNormalized.model_validate(expense).model_dump(mode="json")
+
+
+def _compute_validated_splits(
+    expense_in: expense_schema.ExpenseCreate, member_ids: List[int], member_id_set: set
+) -> List[split_engine.ComputedSplit]:
+    """
+    Checks an expense against the group's members and works out its splits.
+    Needs no database access, so a whole batch can be validated in memory.
 
     Raises:
         CrudError: If validation fails (e.g., split amounts don't match total, user not in group).
     """
-    # --- Pre-computation and Validation ---
-    
-    # 1. Validate that the sum of splits equals the total amount.
-    # We use math.isclose() to handle potential floating-point inaccuracies.
-    total_split_amount = sum(split.owed_amount for split in expense_in.splits)
-    if not math.isclose(expense_in.total_amount, total_split_amount):
-        raise CrudError(
-            f"Sum of splits ({total_split_amount}) does not match total amount ({expense_in.total_amount})."
-        )
-
-    # 2. Validate that the person who paid is a member of the group.
-    payer_ids = {member.id for member in group.members}
-    if expense_in.paid_by_id not in payer_ids:
+    # 1. Validate that the person who paid is a member of the group.
+    if expense_in.paid_by_id not in member_id_set:
         raise CrudError("The user who paid for the expense is not a member of this group.")
 
+    # 2. Work out each participant's share in whole cents. The engine guarantees
+    # the shares add up to the total exactly, so there is no float tolerance to fail.
+    try:
+        computed_splits = split_engine.compute_splits(expense_in, member_ids)
+    except split_engine.SplitError as e:
+        raise CrudError(e.detail)
+    if any(split.owed_cents < 0 for split in computed_splits):
+        raise CrudError("Split amounts cannot be negative.")
+    # Members whose share rounds to nothing are left out rather than stored as 0.
+    computed_splits = [split for split in computed_splits if split.owed_cents > 0]
+
     # 3. Validate that all users in the split are members of the group.
-    for split in expense_in.splits:
-        if split.user_id not in payer_ids:
+    for split in computed_splits:
+        if split.user_id not in member_id_set:
             raise CrudError(f"User with ID {split.user_id} in the split is not a member of this group.")
+    return computed_splits
+
+
+async def create_expense(db: AsyncSession, expense_in: expense_schema.ExpenseCreate, group: crud_group.GroupHandle, creator: models.User) -> models.Expense:
+    """
+    Creates a new expense and its corresponding splits within a single database transaction.
+
+    Raises:
+        CrudError: If validation fails (e.g., split amounts don't match total, user not in group).
+    """
+    # --- Pre-computation and Validation ---
+    ensure_group_is_open(group)
+    member_ids = sorted(await crud_group.get_member_ids(db, group_id=group.id))
+    computed_splits = _compute_validated_splits(expense_in, member_ids, set(member_ids))
 
     # --- Database Transaction ---
     # The `with db.begin()` block ensures that all the operations within it are
@@ -57,35 +119,328 @@ def create_expense(db: Session, expense_in: expense_schema.ExpenseCreate, group:
         db.add(db_expense)
         
         # Flush the session to get an ID for the new expense before creating splits
-        db.flush()
-
-        # Create the ExpenseSplit objects
-        splits_to_add = []
-        for split_data in expense_in.splits:
-            db_split = models.ExpenseSplit(
-                expense_id=db_expense.id,
-                user_id=split_data.user_id,
-                owed_amount=split_data.owed_amount
-            )
-            splits_to_add.append(db_split)
-        
-        db.add_all(splits_to_add)
+        await db.flush()
+
+        # Create the ExpenseSplit rows in one executemany; nothing needs their ids
+        # before the expense is reloaded below.
+        if computed_splits:
+            await db.execute(insert(models.ExpenseSplit), [
+                {
+                    "expense_id": db_expense.id,
+                    "user_id": split_data.user_id,
+                    "owed_amount": split_data.owed_amount,
+                    "split_details": split_data.split_details,
+                }
+                for split_data in computed_splits
+            ])
+
+        # Keep the per-member balance ledger in step within the same transaction.
+        deltas = await crud_balance.apply_expense(
+            db,
+            group_id=group.id,
+            paid_by_id=expense_in.paid_by_id,
+            total_amount=expense_in.total_amount,
+            splits=[(split.user_id, split.owed_amount) for split in computed_splits],
+        )
+        version = await bump_open_group_version(db, group_id=group.id)
 
         # Everything is staged. Now, commit the transaction to the database.
-        db.commit()
+        await db.commit()
 
     except Exception as e:
         # If any database error occurs, rollback all changes.
-        db.rollback()
+        await db.rollback()
         # Re-raise the exception to be handled by the API layer
         raise e
     # After the 'with' block successfully completes, the transaction is committed.
-    # We need to refresh the expense to load the newly created splits relationship.
-    db.refresh(db_expense)
-    return db_expense
+    # Reload the expense together with its payer and splits for the response.
+    expense = await get_expense(db, expense_id=db_expense.id)
+    await event_hub.publish(
+        group.id,
+        group_event("expense.created", group.id, version, _event_data(expense)),
+        balances_event(group.id, version, deltas),
+    )
+    # Everyone involved except whoever added it
+    notification_service.notify(
+        ({expense.paid_by_id} | {split.user_id for split in computed_splits}) - {creator.id},
+        type="expense.created",
+        message=f'{display_name(creator)} added "{expense.description}" '
+                f'({expense.total_amount:.2f} {expense.currency}) in {group.name}',
+        related_entity_id=expense.id,
+    )
+    return expense
+
+async def _insert_split_rows(db: AsyncSession, split_rows: List[Dict]) -> None:
+    """
+    Inserts expense splits in bulk. On PostgreSQL (asyncpg) this uses COPY, which is
+    several times faster than multi-row INSERTs for the hundreds of thousands of
+    splits a large import produces.
+    """
+    connection = await db.connection()
+    if connection.dialect.driver != "asyncpg":
+        await db.execute(insert(models.ExpenseSplit), split_rows)
+        return
+    columns = ["expense_id", "user_id", "owed_amount", "split_details"]
+    records = [
+        (
+            row["expense_id"],
+            row["user_id"],
+            row["owed_amount"],
+            json.dumps(row["split_details"]) if row["split_details"] is not None else None,
+        )
+        for row in split_rows
+    ]
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        models.ExpenseSplit.__tablename__, records=records, columns=columns
+    )
+
+async def import_expenses(
+    db: AsyncSession,
+    rows: Sequence[Tuple[int, expense_schema.ExpenseImportRow]],
+    group: crud_group.GroupHandle,
+    creator: models.User,
+    atomic: bool = False,
+) -> Tuple[int, List[Dict]]:
+    """
+    Imports many expenses into a group at once. `rows` are (row number, expense) pairs.
+
+    Every row is validated in memory first. The valid ones are then inserted in one
+    transaction with multi-row INSERT ... RETURNING statements, IMPORT_CHUNK_SIZE
+    expenses at a time, and the ledger is updated once per member for the whole batch.
+    With `atomic`, nothing is imported unless every row is valid.
+
+    Returns the number of expenses imported and a {"row", "detail"} dict per rejected row.
+    """
+    ensure_group_is_open(group)
+    member_ids = sorted(await crud_group.get_member_ids(db, group_id=group.id))
+    member_id_set = set(member_ids)
+
+    valid, errors = [], []
+    for row_number, expense_in in rows:
+        try:
+            valid.append((expense_in, _compute_validated_splits(expense_in, member_ids, member_id_set)))
+        except CrudError as e:
+            errors.append({"row": row_number, "detail": e.detail})
+    if not valid or (atomic and errors):
+        return 0, errors
+
+    imported_at = datetime.now(timezone.utc)
+    try:
+        for start in range(0, len(valid), IMPORT_CHUNK_SIZE):
+            chunk = valid[start:start + IMPORT_CHUNK_SIZE]
+            expense_ids = (await db.scalars(
+                insert(models.Expense).returning(models.Expense.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "description": expense_in.description,
+                        "total_amount": expense_in.total_amount,
+                        "currency": expense_in.currency,
+                        "category": expense_in.category,
+                        "notes": expense_in.notes,
+                        "expense_date": expense_in.expense_date or imported_at,
+                        "status": models.ExpenseStatus.active,
+                        "split_type": expense_in.split_type,
+                        "group_id": group.id,
+                        "paid_by_id": expense_in.paid_by_id,
+                        "created_by_id": creator.id,
+                    }
+                    for expense_in, _ in chunk
+                ],
+            )).all()
+            split_rows = [
+                {
+                    "expense_id": expense_id,
+                    "user_id": split.user_id,
+                    "owed_amount": split.owed_amount,
+                    "split_details": split.split_details,
+                }
+                for expense_id, (_, computed_splits) in zip(expense_ids, chunk)
+                for split in computed_splits
+            ]
+            if split_rows:
+                await _insert_split_rows(db, split_rows)
+
+        deltas = await crud_balance.apply_expenses(
+            db,
+            group_id=group.id,
+            expenses=[
+                (expense_in.paid_by_id, expense_in.total_amount, [(s.user_id, s.owed_amount) for s in computed_splits])
+                for expense_in, computed_splits in valid
+            ],
+        )
+        if valid:
+            version = await bump_open_group_version(db, group_id=group.id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    if valid:
+        # One summary event rather than one per imported expense
+        await event_hub.publish(
+            group.id,
+            group_event("expenses.imported", group.id, version, {"count": len(valid)}),
+            balances_event(group.id, version, deltas),
+        )
+        notification_service.notify(
+            member_id_set - {creator.id},
+            type="expenses.imported",
+            message=f"{display_name(creator)} imported {len(valid)} expenses into {group.name}",
+            related_entity_id=group.id,
+        )
+    return len(valid), errors
+
+async def _set_expense_status(
+    db: AsyncSession,
+    group: crud_group.GroupHandle,
+    expense_id: int,
+    from_status: models.ExpenseStatus,
+    to_status: models.ExpenseStatus,
+    sign: int,
+    event_type: str,
+) -> models.Expense | None:
+    """
+    Moves an expense from `from_status` to `to_status` and applies (`sign=1`) or
+    reverses (`sign=-1`) its effect on the ledger, in one transaction. The status
+    check is part of the UPDATE, so two concurrent requests cannot both apply it.
+    Returns None if the group has no such expense.
+    """
+    ensure_group_is_open(group)
+    try:
+        row = (await db.execute(
+            update(models.Expense)
+            .where(
+                models.Expense.id == expense_id,
+                models.Expense.group_id == group.id,
+                models.Expense.status == from_status,
+            )
+            .values(status=to_status)
+            .returning(models.Expense.paid_by_id, models.Expense.total_amount)
+        )).first()
+        if row is None:
+            current = await db.scalar(
+                select(models.Expense.status)
+                .where(models.Expense.id == expense_id, models.Expense.group_id == group.id)
+            )
+            if current is None:
+                return None
+            raise CrudError(f"The expense is {current.value}, not {from_status.value}.")
+
+        splits = (await db.execute(
+            select(models.ExpenseSplit.user_id, models.ExpenseSplit.owed_amount)
+            .where(models.ExpenseSplit.expense_id == expense_id)
+        )).all()
+        deltas = await crud_balance.apply_expense(
+            db,
+            group_id=group.id,
+            paid_by_id=row.paid_by_id,
+            total_amount=row.total_amount,
+            splits=[(split.user_id, split.owed_amount) for split in splits],
+            sign=sign,
+        )
+        version = await bump_open_group_version(db, group_id=group.id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    await event_hub.publish(
+        group.id,
+        group_event(event_type, group.id, version, {"id": expense_id, "status": to_status.value}),
+        balances_event(group.id, version, deltas),
+    )
+    return await get_expense(db, expense_id=expense_id)
+
+async def delete_expense(db: AsyncSession, group: crud_group.GroupHandle, expense_id: int) -> models.Expense | None:
+    """
+    Soft-deletes an expense: it stays in the table with status `deleted` and stops
+    counting towards balances until it is restored.
+    """
+    return await _set_expense_status(
+        db, group, expense_id, models.ExpenseStatus.active, models.ExpenseStatus.deleted, sign=-1,
+        event_type="expense.deleted",
+    )
+
+async def restore_expense(db: AsyncSession, group: crud_group.GroupHandle, expense_id: int) -> models.Expense | None:
+    """
+    Brings a soft-deleted expense back, counting towards balances again.
+    """
+    return await _set_expense_status(
+        db, group, expense_id, models.ExpenseStatus.deleted, models.ExpenseStatus.active, sign=1,
+        event_type="expense.restored",
+    )
+
+async def get_expense(db: AsyncSession, expense_id: int) -> models.Expense | None:
+    """
+    Fetches a single expense with its payer and splits eagerly loaded.
+    """
+    result = await db.execute(
+        select(models.Expense)
+        .options(*EXPENSE_LOAD_OPTIONS)
+        .where(models.Expense.id == expense_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+def _group_expenses_query(group_id: int, filters: Optional[expense_schema.ExpenseFilters]) -> Select:
+    """
+    Builds the filtered, newest-first query behind the group expense listings.
+    Only active expenses are listed unless `filters.status` asks for another status.
+    The partial (group_id, expense_date, id) indexes serve both the filter and the order.
+    """
+    expense_status = filters.status if filters and filters.status else models.ExpenseStatus.active
+    query = select(models.Expense).where(
+        models.Expense.group_id == group_id,
+        models.expense_status_is(expense_status),
+    )
+    if filters:
+        if filters.start_date:
+            query = query.where(models.Expense.expense_date >= filters.start_date)
+        if filters.end_date:
+            query = query.where(models.Expense.expense_date < filters.end_date)
+        if filters.category:
+            query = query.where(models.Expense.category == filters.category)
+        if filters.paid_by_id:
+            query = query.where(models.Expense.paid_by_id == filters.paid_by_id)
+        if filters.participant_id:
+            query = query.where(exists().where(
+                models.ExpenseSplit.expense_id == models.Expense.id,
+                models.ExpenseSplit.user_id == filters.participant_id,
+            ))
+    return query.order_by(models.Expense.expense_date.desc(), models.Expense.id.desc())
+
+async def get_expenses_for_group(
+    db: AsyncSession,
+    group_id: int,
+    filters: Optional[expense_schema.ExpenseFilters] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[models.Expense]:
+    """
+    Retrieves the expenses of a group, newest first.
+    - `after`: the (expense_date, id) of the last expense on the previous page (keyset pagination).
+    - `limit`: the page size. Without it, every matching expense is returned.
+    """
+    query = _group_expenses_query(group_id, filters).options(*EXPENSE_LOAD_OPTIONS)
+    if after:
+        query = query.where(tuple_(models.Expense.expense_date, models.Expense.id) < tuple_(*after))
+    if limit:
+        query = query.limit(limit)
+    return list(await db.scalars(query))
 
-def get_expenses_for_group(db: Session, group_id: int) -> List[models.Expense]:
+async def stream_expenses_for_group(
+    db: AsyncSession,
+    group_id: int,
+    filters: Optional[expense_schema.ExpenseFilters] = None,
+    chunk_size: int = 500,
+) -> AsyncIterator[models.Expense]:
     """
-    Retrieves all expenses associated with a specific group.
+    Yields a group's expenses from a server-side cursor, `chunk_size` rows at a time,
+    so memory stays flat however large the group is.
     """
-    return db.query(models.Expense).filter(models.Expense.group_id == group_id).all()
\ No newline at end of file
+    query = (
+        _group_expenses_query(group_id, filters)
+        .options(*EXPENSE_LOAD_OPTIONS)
+        .execution_options(yield_per=chunk_size)
+    )
+    async for expense in await db.stream_scalars(query):
+        yield expense
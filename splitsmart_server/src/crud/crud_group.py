@@ -1,10 +1,40 @@
-from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func, case
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import exists, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Set, Tuple
 from src.db import models
 from src.schemas import group as group_schema
+from src.crud import crud_balance
+from src.core.cache import TTLCache
+from src.core.events import event_hub, group_event
+from src.core.notifications import notification_service
+from src.core.config import settings
 
-def create_group_with_owner(db: Session, group: group_schema.GroupCreate, owner: models.User) -> models.Group:
+@dataclass(frozen=True)
+class GroupHandle:
+    """
+    The few group columns most routes need, without loading the member list.
+    """
+    id: int
+    name: str
+    status: models.GroupStatus
+    default_currency: str
+
+# (group_id, user_id) -> GroupHandle, for members only. Each worker has its own
+# copy and only drops entries for the writes it handles itself, so an entry can
+# be up to MEMBERSHIP_CACHE_TTL_SECONDS out of date. That is safe because:
+# - non-members are never cached, so a member added in another worker is
+#   recognised at once (members are never removed);
+# - a handle's name and currency never change once the group exists;
+# - a handle's status may say active after another worker archived the group,
+#   but every write re-checks the group row in its transaction (`bump_version`).
+membership_cache = TTLCache(
+    maxsize=settings.MEMBERSHIP_CACHE_SIZE, ttl_seconds=settings.MEMBERSHIP_CACHE_TTL_SECONDS
+)
+
+async def create_group_with_owner(db: AsyncSession, group: group_schema.GroupCreate, owner: models.User) -> models.Group:
     """
     Creates a new group and automatically adds the owner as the first member.
     """
@@ -12,97 +42,264 @@ def create_group_with_owner(db: Session, group: group_schema.GroupCreate, owner:
     db_group = models.Group(
         name=group.name,
         description=group.description,
-        creator=owner
+        created_by_id=owner.id
     )
-    
-    # Add the owner to the group's members list
-    db_group.members.append(owner)
-    
     db.add(db_group)
-    db.commit()
-    db.refresh(db_group)
-    return db_group
+    await db.flush()
+
+    # Add the owner to the group's members list. This goes by id because `owner`
+    # may be a cached, detached instance that must not join this session.
+    await db.execute(
+        insert(models.group_members_table).values(group_id=db_group.id, user_id=owner.id)
+    )
+    await crud_balance.add_member_rows(db, group_id=db_group.id, user_ids=[owner.id])
+    await db.commit()
+    return await get_group(db, group_id=db_group.id)
 
-def get_group(db: Session, group_id: int) -> models.Group | None:
+async def get_group(db: AsyncSession, group_id: int) -> models.Group | None:
     """
-    Fetches a single group by its ID.
+    Fetches a single group by its ID, with its members loaded.
     """
-    return db.query(models.Group).filter(models.Group.id == group_id).first()
+    result = await db.execute(
+        select(models.Group)
+        .options(selectinload(models.Group.members))
+        .where(models.Group.id == group_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
-def get_groups_for_user(db: Session, user_id: int) -> List[models.Group]:
+async def get_groups_for_user(db: AsyncSession, user_id: int, include_archived: bool = False) -> List[models.Group]:
     """
-    Fetches all groups that a specific user is a member of.
+    Fetches all groups that a specific user is a member of, leaving out archived
+    groups unless `include_archived` is set.
     """
-    return db.query(models.Group).join(models.group_members_table).filter(
+    query = select(models.Group).join(models.group_members_table).where(
         models.group_members_table.c.user_id == user_id
-    ).all()
+    ).options(selectinload(models.Group.members))
+    if not include_archived:
+        query = query.where(models.Group.status != models.GroupStatus.archived)
+    result = await db.execute(query)
+    return list(result.scalars())
 
-def add_member_to_group(db: Session, group: models.Group, user: models.User) -> models.Group:
+async def get_group_summaries(
+    db: AsyncSession,
+    user_id: int,
+    include_archived: bool = False,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 50,
+) -> List[dict]:
+    """
+    The current user's groups for the home screen, most recently active first:
+    name, member count, last activity and the user's balance, in one statement.
+    The balance comes from the user's `group_member_balances` row and the member
+    count from the `group_members` (group_id, user_id) index, so nothing is
+    aggregated over expenses or payments.
+    - `after`: the (last_activity_at, id) of the last group on the previous page (keyset pagination).
+    """
+    members = models.group_members_table
+    ledger = models.GroupMemberBalance
+    # `updated_at` is set by every `bump_version`, i.e. by every expense, payment
+    # or membership change; groups nothing has happened in yet fall back to creation.
+    last_activity = func.coalesce(models.Group.updated_at, models.Group.created_at)
+    member_count = (
+        select(func.count())
+        .select_from(members)
+        .where(members.c.group_id == models.Group.id)
+        .correlate(models.Group)
+        .scalar_subquery()
+    )
+    balance = ledger.total_paid - ledger.total_owed + ledger.payments_sent - ledger.payments_received
+
+    query = (
+        select(
+            models.Group.id,
+            models.Group.name,
+            models.Group.status,
+            models.Group.default_currency,
+            member_count.label("member_count"),
+            last_activity.label("last_activity_at"),
+            func.coalesce(balance, 0).label("my_balance"),
+        )
+        .join(members, (members.c.group_id == models.Group.id) & (members.c.user_id == user_id))
+        .outerjoin(ledger, (ledger.group_id == models.Group.id) & (ledger.user_id == user_id))
+        .order_by(last_activity.desc(), models.Group.id.desc())
+        .limit(limit)
+    )
+    if not include_archived:
+        query = query.where(models.Group.status != models.GroupStatus.archived)
+    if after:
+        query = query.where(tuple_(last_activity, models.Group.id) < tuple_(*after))
+    rows = (await db.execute(query)).all()
+    return [{**row._mapping, "my_balance": round(row.my_balance, 2)} for row in rows]
+
+async def bump_version(db: AsyncSession, group_id: int) -> int | None:
+    """
+    Advances a group's version and returns the new one. Call it in the transaction
+    of every write that changes what the group's GET routes return, after the
+    ledger updates (so writers always lock ledger rows before the group row).
+    It also sets `updated_at`, the group's last activity.
+
+    Returns None, changing nothing, if the group is archived; the caller must then
+    roll back. This check on the group row itself, inside the write's transaction,
+    is what keeps archived groups read-only: a `GroupHandle` cached by another
+    worker may still say the group is open.
+    """
+    return await db.scalar(
+        update(models.Group)
+        .where(models.Group.id == group_id, models.Group.status != models.GroupStatus.archived)
+        .values(version=models.Group.version + 1)
+        .returning(models.Group.version)
+    )
+
+async def bump_member_group_versions(db: AsyncSession, user_id: int) -> None:
+    """
+    Advances the version of every group `user_id` belongs to, archived ones included,
+    for changes to the user that the groups' GET routes show (their name or email).
+    Leaves `updated_at` alone: that is not activity in the groups.
+    """
+    members = models.group_members_table
+    group_ids = select(members.c.group_id).where(members.c.user_id == user_id)
+    # Lock the groups in id order first, so concurrent profile updates cannot deadlock.
+    await db.execute(
+        select(models.Group.id)
+        .where(models.Group.id.in_(group_ids))
+        .order_by(models.Group.id)
+        .with_for_update()
+    )
+    await db.execute(
+        update(models.Group)
+        .where(models.Group.id.in_(group_ids))
+        .values(version=models.Group.version + 1, updated_at=models.Group.updated_at),
+        execution_options={"synchronize_session": False},
+    )
+
+async def get_group_version(db: AsyncSession, group_id: int) -> int | None:
+    """
+    Reads a group's version with a primary-key lookup. None if there is no such group.
+    """
+    return await db.scalar(select(models.Group.version).where(models.Group.id == group_id))
+
+async def archive_group(db: AsyncSession, group_id: int) -> models.Group:
+    """
+    Marks a group as archived, which makes it read-only. `scripts/archive_groups.py`
+    later moves its expenses, splits and payments out of the hot tables.
+    """
+    version = await db.scalar(
+        update(models.Group)
+        .where(models.Group.id == group_id, models.Group.status != models.GroupStatus.archived)
+        .values(status=models.GroupStatus.archived, version=models.Group.version + 1)
+        .returning(models.Group.version)
+    )
+    await db.commit()
+    # This worker's cached handles carry the old status. Other workers' handles
+    # expire with MEMBERSHIP_CACHE_TTL_SECONDS; until then `bump_version` turns
+    # their writes away.
+    membership_cache.delete_where(lambda key: key[0] == group_id)
+    if version is not None:
+        await event_hub.publish(group_id, group_event("group.archived", group_id, version))
+    return await get_group(db, group_id=group_id)
+
+async def get_membership(db: AsyncSession, group_id: int, user_id: int) -> tuple[bool, GroupHandle | None]:
+    """
+    Checks whether a user belongs to a group with a single indexed EXISTS lookup
+    on `group_members`, answered from `membership_cache` when possible.
+
+    Returns (group_exists, handle). `handle` is None when the user is not a member.
+    """
+    cached = membership_cache.get((group_id, user_id))
+    if cached is not None:
+        return True, cached
+
+    is_member = exists().where(
+        models.group_members_table.c.group_id == group_id,
+        models.group_members_table.c.user_id == user_id,
+    )
+    row = (await db.execute(
+        select(
+            models.Group.id,
+            models.Group.name,
+            models.Group.status,
+            models.Group.default_currency,
+            is_member.label("is_member"),
+        ).where(models.Group.id == group_id)
+    )).first()
+    if row is None:
+        return False, None
+
+    if not row.is_member:
+        return True, None
+    handle = GroupHandle(row.id, row.name, row.status, row.default_currency)
+    membership_cache.set((group_id, user_id), handle)
+    return True, handle
+
+async def get_member_ids(db: AsyncSession, group_id: int) -> Set[int]:
+    """
+    Fetches the ids of a group's members without loading the User rows.
+    """
+    result = await db.execute(
+        select(models.group_members_table.c.user_id)
+        .where(models.group_members_table.c.group_id == group_id)
+    )
+    return set(result.scalars())
+
+async def add_member_to_group(db: AsyncSession, group: models.Group, user: models.User) -> models.Group:
     """
     Adds a user to a group's members list if they are not already a member.
-    Returns the updated group.
+    Returns the updated group, or None if the group has been archived.
     """
     if user not in group.members:
         group.members.append(user)
-        db.commit()
-        db.refresh(group)
+        await crud_balance.add_member_rows(db, group_id=group.id, user_ids=[user.id])
+        version = await bump_version(db, group_id=group.id)
+        if version is None:
+            await db.rollback()
+            return None
+        await db.commit()
+        await event_hub.publish(group.id, group_event("member.added", group.id, version, {
+            "user_id": user.id, "email": user.email, "full_name": user.full_name,
+        }))
+        notification_service.notify(
+            [user.id], type="member.added", message=f"You were added to {group.name}", related_entity_id=group.id
+        )
+        group = await get_group(db, group_id=group.id)
     return group
 
-def get_group_balances(db: Session, group_id: int) -> List[dict]:
+async def get_group_balances(db: AsyncSession, group_id: int) -> List[dict]:
     """
-    Calculates the net balance for each member in a group.
-    Balance = (Total amount they paid FOR the group) - (Total amount of THEIR share)
-    
-    Returns a list of dictionaries with user info and their calculated balance.
-    """
-    # This single, powerful query joins all necessary tables and performs the aggregation
-    # directly in the database for maximum efficiency.
-    balance_subquery = (
-        db.query(
-            models.Expense.paid_by_id.label("user_id"),
-            func.sum(models.Expense.total_amount).label("total_paid")
-        )
-        .filter(models.Expense.group_id == group_id)
-        .group_by(models.Expense.paid_by_id)
-        .subquery()
-    )
-
-    owed_subquery = (
-        db.query(
-            models.ExpenseSplit.user_id.label("user_id"),
-            func.sum(models.ExpenseSplit.owed_amount).label("total_owed")
-        )
-        .join(models.Expense)
-        .filter(models.Expense.group_id == group_id)
-        .group_by(models.ExpenseSplit.user_id)
-        .subquery()
-    )
+    Returns the net balance for each member in a group.
+    Balance = (Total they paid FOR the group) - (Total of THEIR share)
+              + (Payments they sent) - (Payments they received)
 
-    balance_query = (
-        db.query(
+    The totals are read straight from the `group_member_balances` ledger, which
+    is maintained by the expense and payment writes, so this is a primary-key
+    range lookup rather than an aggregation over every expense in the group.
+    """
+    ledger = models.GroupMemberBalance
+    result = await db.execute(
+        select(
             models.User.id,
             models.User.email,
             models.User.full_name,
-            func.coalesce(balance_subquery.c.total_paid, 0).label("total_paid"),
-            func.coalesce(owed_subquery.c.total_owed, 0).label("total_owed")
+            ledger.total_paid,
+            ledger.total_owed,
+            ledger.payments_sent,
+            ledger.payments_received,
         )
-        .select_from(models.User)
-        .join(models.group_members_table)
-        .filter(models.group_members_table.c.group_id == group_id)
-        .outerjoin(balance_subquery, models.User.id == balance_subquery.c.user_id)
-        .outerjoin(owed_subquery, models.User.id == owed_subquery.c.user_id)
+        .join(ledger, ledger.user_id == models.User.id)
+        .where(ledger.group_id == group_id)
     )
-
-    results = balance_query.all()
+    results = result.all()
 
     balances = [
         {
             "user_id": r.id,
             "email": r.email,
             "full_name": r.full_name,
-            "balance": round(r.total_paid - r.total_owed, 2) # round to 2 decimal places
+            "balance": round(
+                r.total_paid - r.total_owed + r.payments_sent - r.payments_received, 2
+            ) # round to 2 decimal places
         }
         for r in results
     ]
     
-    return balances
\ No newline at end of file
+    return balances
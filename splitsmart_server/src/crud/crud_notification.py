@@ -0,0 +1,56 @@
+from typing import List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db import models
+
+async def get_notifications_for_user(
+    db: AsyncSession,
+    user_id: int,
+    unread_only: bool = False,
+    after: Optional[int] = None,
+    limit: int = 50,
+) -> List[models.Notification]:
+    """
+    Retrieves a user's notifications, newest first.
+    - `after`: the id of the last notification on the previous page (keyset pagination).
+    """
+    query = (
+        select(models.Notification)
+        .where(models.Notification.user_id == user_id)
+        .order_by(models.Notification.id.desc())
+        .limit(limit)
+    )
+    if unread_only:
+        query = query.where(models.Notification.is_read.is_(False))
+    if after is not None:
+        query = query.where(models.Notification.id < after)
+    return list(await db.scalars(query))
+
+async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+    """Reads the user's denormalized unread counter; no notification rows are counted."""
+    return await db.scalar(
+        select(models.User.unread_notifications).where(models.User.id == user_id)
+    ) or 0
+
+async def mark_all_read(db: AsyncSession, user_id: int) -> int:
+    """
+    Marks all of a user's notifications read with one bulk UPDATE and returns how
+    many were unread. The counter goes down by exactly that many rather than to 0:
+    notifications the worker commits meanwhile stay unread and counted.
+    """
+    result = await db.execute(
+        update(models.Notification)
+        .where(models.Notification.user_id == user_id, models.Notification.is_read.is_(False))
+        .values(is_read=True),
+        execution_options={"synchronize_session": False},
+    )
+    marked = result.rowcount
+    if marked:
+        await db.execute(
+            update(models.User)
+            .where(models.User.id == user_id)
+            .values(unread_notifications=models.User.unread_notifications - marked),
+            execution_options={"synchronize_session": False},
+        )
+    await db.commit()
+    return marked
@@ -1,20 +1,27 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from src.db import models
 from src.schemas import payment as payment_schema
-from src.crud import crud_group
-from .crud_expense import CrudError
+from src.crud import crud_group, crud_balance
+from src.core.events import balances_event, event_hub, group_event
+from src.core.notifications import display_name, notification_service
+from .crud_expense import CrudError, bump_open_group_version, ensure_group_is_open
 
-def create_payment(
-    db: Session,
+async def create_payment(
+    db: AsyncSession,
     payment_in: payment_schema.PaymentCreate,
-    group: models.Group,
+    group: crud_group.GroupHandle,
     payer: models.User
 ) -> models.Payment:
     # --- (Validation logic remains the same) ---
+    ensure_group_is_open(group)
     if payer.id == payment_in.paid_to_id:
         raise CrudError("Cannot record a payment to yourself.")
-    member_ids = {member.id for member in group.members}
-    if payment_in.paid_to_id not in member_ids:
+    _, recipient_membership = await crud_group.get_membership(
+        db, group_id=group.id, user_id=payment_in.paid_to_id
+    )
+    if recipient_membership is None:
         raise CrudError("The user receiving the payment is not a member of this group.")
 
     db_payment = models.Payment(
@@ -25,14 +32,51 @@ def create_payment(
         paid_by_id=payer.id,
         paid_to_id=payment_in.paid_to_id
     )
-    db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
-    
-    # --- THIS IS THE SIMPLER FIX ---
-    # By accessing these attributes, we force SQLAlchemy to lazy-load them
-    # before the object is returned.
-    # _ = db_payment.paid_by_user
-    # _ = db_payment.paid_to_user
-    
-    return db_payment
\ No newline at end of file
+    try:
+        db.add(db_payment)
+        # Update the balance ledger in the same transaction as the payment row.
+        deltas = await crud_balance.apply_payment(
+            db,
+            group_id=group.id,
+            paid_by_id=payer.id,
+            paid_to_id=payment_in.paid_to_id,
+            amount=payment_in.amount,
+        )
+        version = await bump_open_group_version(db, group_id=group.id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    await event_hub.publish(
+        group.id,
+        group_event("payment.created", group.id, version, {
+            "id": db_payment.id,
+            "amount": db_payment.amount,
+            "currency": db_payment.currency,
+            "paid_by_id": db_payment.paid_by_id,
+            "paid_to_id": db_payment.paid_to_id,
+        }),
+        balances_event(group.id, version, deltas),
+    )
+    notification_service.notify(
+        [db_payment.paid_to_id],
+        type="payment.created",
+        message=f"{display_name(payer)} recorded a payment of {db_payment.amount:.2f} "
+                f"{db_payment.currency} to you in {group.name}",
+        related_entity_id=db_payment.id,
+    )
+    # Load both users with the payment in one statement for the response.
+    return await get_payment(db, payment_id=db_payment.id)
+
+async def get_payment(db: AsyncSession, payment_id: int) -> models.Payment | None:
+    """
+    Fetches a single payment with the paying and receiving users eagerly loaded.
+    """
+    result = await db.execute(
+        select(models.Payment)
+        .options(joinedload(models.Payment.paid_by_user), joinedload(models.Payment.paid_to_user))
+        .where(models.Payment.id == payment_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
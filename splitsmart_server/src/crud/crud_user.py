@@ -1,17 +1,47 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.db import models
 from src.schemas import user as user_schema
-from src.core.security import get_password_hash
+from src.crud import crud_group
+from src.core.security import hash_password
+from src.core.cache import TTLCache
+from src.core.config import settings
 from typing import Optional
-from sqlalchemy import func
+from sqlalchemy import func, select
 
-def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
+# Users behind access tokens, keyed by id. Entries are detached instances: they
+# can be read freely but must never be added to a session. Anything that changes
+# a user must call `invalidate_user`, which only reaches this worker's cache.
+# Other workers keep their copy for up to USER_CACHE_TTL_SECONDS, so that is how
+# long a revoked token (password change) or a deactivated account can still be
+# accepted there, and a changed name or email still shown. Set it to 0 to check
+# every request against the database.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl_seconds=settings.USER_CACHE_TTL_SECONDS)
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    """
+    Fetches a user by id, serving it from `user_cache` when possible.
+    The returned instance is detached from `db`.
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await db.get(models.User, user_id)
+        if user is None:
+            return None
+        db.expunge(user)
+        user_cache.set(user_id, user)
+    return user
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete(user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
     """Fetches a user from the database by their email."""
-    return db.query(models.User).filter(models.User.email == email).first()
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
-def create_user(db: Session, user: user_schema.UserCreate) -> models.User:
+async def create_user(db: AsyncSession, user: user_schema.UserCreate) -> models.User:
     """Creates a new user in the database."""
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     # Create a new SQLAlchemy User model instance
     db_user = models.User(
         email=user.email,
@@ -20,21 +50,108 @@ def create_user(db: Session, user: user_schema.UserCreate) -> models.User:
     )
     # Add the instance to the session, commit, and refresh to get the new ID
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def get_user_spending_summary(db: Session, user_id: int) -> dict:
+async def update_user(db: AsyncSession, user_id: int, user_in: user_schema.UserUpdate) -> models.User:
+    """
+    Updates a user's profile. Changing the password revokes the user's existing tokens.
+    Changing the name or email advances the versions of the user's groups, whose
+    member lists show them.
+    """
+    db_user = await db.get(models.User, user_id, populate_existing=True)
+    changes = user_in.model_dump(exclude_unset=True)
+    if (changes.get("email") is not None and changes["email"] != db_user.email) or \
+            ("full_name" in changes and changes["full_name"] != db_user.full_name):
+        await crud_group.bump_member_group_versions(db, user_id=user_id)
+    if changes.get("email") is not None:
+        db_user.email = changes["email"]
+    if "full_name" in changes:
+        db_user.full_name = changes["full_name"]
+    if changes.get("password") is not None:
+        db_user.hashed_password = await hash_password(changes["password"])
+        db_user.token_version += 1
+    await db.commit()
+    invalidate_user(user_id)
+    return db_user
+
+async def set_password_hash(db: AsyncSession, user: models.User, hashed_password: str) -> None:
+    """
+    Replaces a user's password hash without revoking their tokens,
+    e.g. to upgrade it to the current bcrypt cost factor.
+    """
+    user.hashed_password = hashed_password
+    await db.commit()
+    invalidate_user(user.id)
+
+async def deactivate_user(db: AsyncSession, user_id: int) -> models.User:
+    """
+    Marks a user as deactivated and revokes their existing tokens.
+    """
+    db_user = await db.get(models.User, user_id, populate_existing=True)
+    db_user.status = models.UserStatus.deactivated
+    db_user.token_version += 1
+    await db.commit()
+    invalidate_user(user_id)
+    return db_user
+
+async def get_user_spending_summary(db: AsyncSession, user_id: int) -> dict:
     # Query to get spending by category
-    category_spending = db.query(
+    category_spending = (await db.execute(select(
         models.Expense.category,
         func.sum(models.ExpenseSplit.owed_amount).label('total_spent')
-    ).join(models.ExpenseSplit).filter(models.ExpenseSplit.user_id == user_id).group_by(models.Expense.category).all()
+    ).join(models.ExpenseSplit).where(
+        models.ExpenseSplit.user_id == user_id,
+        models.expense_status_is(models.ExpenseStatus.active),
+    ).group_by(models.Expense.category))).all()
 
-    # Query to get overall balance
-    # (This can be optimized by reusing/adapting the group balance logic across all groups)
+    # Balances per group and per currency, read from the balance ledger
+    balances = await get_user_balances(db, user_id=user_id)
     
     return {
         "spending_by_category": [{"category": c, "total_spent": s} for c, s in category_spending],
-        # "net_balance": ... (add calculation here)
+        "net_balances": balances["totals"],
+        "group_balances": balances["groups"],
+    }
+
+async def get_user_balances(db: AsyncSession, user_id: int) -> dict:
+    """
+    Returns the user's balance in every group they belong to, plus a total for each
+    currency their groups use (balances in different currencies are never added up).
+    A single statement over the `group_member_balances` ledger: the per-group rows
+    come from the user_id index and the totals from a window function partitioned by
+    currency, so the cost stays flat however many groups the user is in. Payments are
+    already part of the ledger.
+    """
+    ledger = models.GroupMemberBalance
+    balance = (
+        ledger.total_paid - ledger.total_owed + ledger.payments_sent - ledger.payments_received
+    )
+    result = await db.execute(
+        select(
+            ledger.group_id,
+            models.Group.name,
+            models.Group.default_currency,
+            balance.label("balance"),
+            func.sum(balance).over(partition_by=models.Group.default_currency).label("currency_total"),
+        )
+        .join(models.Group, models.Group.id == ledger.group_id)
+        .where(ledger.user_id == user_id)
+        .order_by(ledger.group_id)
+    )
+    rows = result.all()
+    totals = {r.default_currency: round(r.currency_total, 2) for r in rows}
+
+    return {
+        "totals": [{"currency": currency, "balance": totals[currency]} for currency in sorted(totals)],
+        "groups": [
+            {
+                "group_id": r.group_id,
+                "group_name": r.name,
+                "currency": r.default_currency,
+                "balance": round(r.balance, 2),
+            }
+            for r in rows
+        ],
     }
\ No newline at end of file
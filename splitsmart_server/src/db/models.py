@@ -1,7 +1,8 @@
 # src/db/models.py
 import enum
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean, JSON, Enum
+    Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Table, Boolean, JSON, Enum, Index, LargeBinary,
+    literal, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -51,7 +52,9 @@ class FriendshipStatus(enum.Enum):
 group_members_table = Table(
     'group_members', Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('group_id', Integer, ForeignKey('groups.id'), primary_key=True)
+    Column('group_id', Integer, ForeignKey('groups.id'), primary_key=True),
+    # The primary key leads with user_id; membership checks and member lists go by group.
+    Index('ix_group_members_group_id_user_id', 'group_id', 'user_id'),
 )
 
 class Friendship(Base):
@@ -84,6 +87,11 @@ class User(Base):
     
     default_currency = Column(String(3), default="USD", nullable=False)
     preferences = Column(JSON, nullable=True)
+    # Bumped whenever existing access tokens must stop working (password change, deactivation).
+    token_version = Column(Integer, nullable=False, default=0, server_default='0')
+    # Denormalized count of unread notifications, kept in step by the notification
+    # worker and mark-all-read, so the unread badge never counts rows.
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default='0')
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     groups = relationship("Group", secondary=group_members_table, back_populates="members")
@@ -99,6 +107,9 @@ class Group(Base):
     
     # --- Added name for consistency ---
     status = Column(Enum(GroupStatus, name="group_status_enum"), nullable=False, default=GroupStatus.active)
+    # Bumped by every write to the group's members, expenses or payments; the
+    # ETags of the group's GET routes are built from it.
+    version = Column(Integer, nullable=False, default=0, server_default='0')
     
     created_by_id = Column(Integer, ForeignKey('users.id'))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -135,6 +146,25 @@ class Expense(Base):
     bill_upload = relationship("BillUpload", back_populates="expense")
     splits = relationship("ExpenseSplit", back_populates="expense", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Group expense listings, newest first, with `id` as the tie-breaker. Only live
+        # expenses are indexed; deleted ones get their own small index for the trash view.
+        Index('ix_expenses_group_id_expense_date_active', 'group_id', 'expense_date', 'id',
+              postgresql_where=text("status = 'active'")),
+        Index('ix_expenses_group_id_expense_date_deleted', 'group_id', 'expense_date', 'id',
+              postgresql_where=text("status = 'deleted'")),
+        Index('ix_expenses_paid_by_id', 'paid_by_id'),
+    )
+
+
+def expense_status_is(status: ExpenseStatus):
+    """
+    `expenses.status = '<status>'` with the value written into the SQL rather than
+    bound, so PostgreSQL can match the partial indexes above even when it reuses
+    a generic plan for a prepared statement.
+    """
+    return Expense.status == literal(status, Expense.status.type, literal_execute=True)
+
 
 class ExpenseSplit(Base):
     __tablename__ = 'expense_splits'
@@ -146,6 +176,35 @@ class ExpenseSplit(Base):
     expense = relationship("Expense", back_populates="splits")
     user = relationship("User")
 
+    __table_args__ = (
+        Index('ix_expense_splits_expense_id', 'expense_id'),
+        # Covers per-user share lookups without touching the table.
+        Index('ix_expense_splits_user_id_expense_id', 'user_id', 'expense_id', postgresql_include=['owed_amount']),
+    )
+
+
+class GroupMemberBalance(Base):
+    """
+    Running ledger of each member's position in a group.
+    Kept up to date by the expense and payment CRUD functions in the same
+    transaction as the rows they insert, so reading balances never has to
+    re-aggregate the raw expenses, splits and payments.
+    """
+    __tablename__ = 'group_member_balances'
+    group_id = Column(Integer, ForeignKey('groups.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    total_paid = Column(Float, nullable=False, default=0)
+    total_owed = Column(Float, nullable=False, default=0)
+    payments_sent = Column(Float, nullable=False, default=0)
+    payments_received = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    user = relationship("User")
+
+    # The primary key serves per-group lookups; this serves a user's cross-group position.
+    __table_args__ = (
+        Index('ix_group_member_balances_user_id_group_id', 'user_id', 'group_id'),
+    )
+
 
 class Payment(Base):
     __tablename__ = 'payments'
@@ -166,12 +225,51 @@ class Payment(Base):
     paid_by_user = relationship("User", foreign_keys=[paid_by_id])
     paid_to_user = relationship("User", foreign_keys=[paid_to_id])
 
+    __table_args__ = (
+        Index('ix_payments_group_id_timestamp', 'group_id', 'timestamp'),
+        Index('ix_payments_paid_by_id', 'paid_by_id'),
+        Index('ix_payments_paid_to_id', 'paid_to_id'),
+    )
+
+
+# --- Archive Tables ---
+# Once a group is archived, `scripts/archive_groups.py` moves its expenses, splits
+# and payments here, keeping the hot tables down to live groups. The rows keep
+# their ids; the group's ledger rows in `group_member_balances` stay where they
+# are, frozen at their final values.
+
+def _archive_columns(table: Table) -> list:
+    """Copies of `table`'s columns, without foreign keys, indexes or defaults."""
+    return [
+        Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, nullable=c.nullable)
+        for c in table.columns
+    ]
+
+expenses_archive_table = Table(
+    'expenses_archive', Base.metadata,
+    *_archive_columns(Expense.__table__),
+    Index('ix_expenses_archive_group_id', 'group_id'),
+)
+
+expense_splits_archive_table = Table(
+    'expense_splits_archive', Base.metadata,
+    *_archive_columns(ExpenseSplit.__table__),
+    Index('ix_expense_splits_archive_expense_id', 'expense_id'),
+)
+
+payments_archive_table = Table(
+    'payments_archive', Base.metadata,
+    *_archive_columns(Payment.__table__),
+    Index('ix_payments_archive_group_id', 'group_id'),
+)
+
 
 class BillUpload(Base):
     __tablename__ = 'bill_uploads'
     id = Column(Integer, primary_key=True, index=True)
     image_url = Column(String, nullable=False)
-    raw_scan_data = Column(JSON, nullable=False)
+    # The scan result; empty until the scan completes
+    raw_scan_data = Column(JSON, nullable=True)
     
     # --- Added name for consistency ---
     status = Column(Enum(BillUploadStatus, name="bill_upload_status_enum"), nullable=False, default=BillUploadStatus.pending)
@@ -181,7 +279,33 @@ class BillUpload(Base):
     error_message = Column(String, nullable=True)
     uploader_id = Column(Integer, ForeignKey('users.id'))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Scan results are looked up by image: the SHA-256 of the uploaded bytes for
+    # exact re-uploads, and a 64-bit difference hash (dHash, stored signed) for re-shots.
+    content_sha256 = Column(String(64), nullable=True)
+    perceptual_hash = Column(BigInteger, nullable=True)
+    # Scans run as background jobs. The preprocessed image is kept here until its
+    # scan finishes, so queued jobs survive a restart.
+    image_data = Column(LargeBinary, nullable=True)
+    image_content_type = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    started_at = Column(DateTime(timezone=True), nullable=True) # When the current attempt began
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    # A bill photographed in several pages is one upload (holding the merged scan)
+    # with an upload per page, numbered from 1.
+    batch_id = Column(Integer, ForeignKey('bill_uploads.id'), nullable=True)
+    page = Column(Integer, nullable=True)
     expense = relationship("Expense", back_populates="bill_upload", uselist=False)
+    pages = relationship("BillUpload", order_by="BillUpload.page")
+
+    __table_args__ = (
+        Index('ix_bill_uploads_content_sha256', 'content_sha256'),
+        # Recent uploads of a set of users, for near-duplicate matching
+        Index('ix_bill_uploads_uploader_id_created_at', 'uploader_id', 'created_at'),
+        Index('ix_bill_uploads_batch_id', 'batch_id'),
+        # The scan job queue: only unfinished uploads
+        Index('ix_bill_uploads_id_unfinished', 'id',
+              postgresql_where=text("status IN ('pending', 'processing')")),
+    )
 
 
 class Notification(Base):
@@ -192,4 +316,11 @@ class Notification(Base):
     is_read = Column(Boolean, default=False, nullable=False)
     type = Column(String)
     related_entity_id = Column(Integer, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # A user's notifications, newest first (keyset pagination by id)
+        Index('ix_notifications_user_id_id', 'user_id', 'id'),
+        # Only the unread ones: unread-only listings and mark-all-read
+        Index('ix_notifications_user_id_id_unread', 'user_id', 'id', postgresql_where=text('NOT is_read')),
+    )
\ No newline at end of file
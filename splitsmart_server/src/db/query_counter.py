@@ -0,0 +1,92 @@
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Per-Request SQL Statement Counting ---
+# A single engine-level listener records every statement into whichever
+# `QueryCounter` is active in the current context. The routes are async and run
+# in the request's own task, and anything they hand to another task or thread
+# gets a copy of its context, which still points at the same counter object, so
+# those statements are counted too. `benchmarks/check_query_budgets.py` runs the
+# main routes under per-route budgets.
+
+_active_counter: ContextVar[Optional["QueryCounter"]] = ContextVar("active_query_counter", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a block of code issues more SQL statements than its budget allows."""
+    def __init__(self, count: int, budget: int, statements: List[str]):
+        self.count = count
+        self.budget = budget
+        self.statements = statements
+        super().__init__(f"{count} SQL statements issued, budget is {budget}.")
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements issued while it is active.
+
+        with QueryCounter(budget=5) as counter:
+            crud_expense.get_expenses_for_group(db, group_id=1)
+        assert counter.count <= 5
+
+    With a `budget`, leaving the block raises `QueryBudgetExceeded` if it was exceeded.
+    """
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget
+        self.count = 0
+        self.statements: List[str] = []
+        self._token = None
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.statements.append(statement)
+
+    def check(self) -> None:
+        if self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded(self.count, self.budget, self.statements)
+
+    def __enter__(self) -> "QueryCounter":
+        self._token = _active_counter.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _active_counter.reset(self._token)
+        if exc_type is None:
+            self.check()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _active_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+def install_query_budget(app, budget: int) -> None:
+    """
+    Adds middleware that fails any request issuing more than `budget` SQL statements.
+    Meant for tests and local development (see `Settings.QUERY_BUDGET_PER_REQUEST`),
+    so N+1 query patterns fail loudly instead of quietly slowing down a route.
+    """
+    @app.middleware("http")
+    async def enforce_query_budget(request: Request, call_next):
+        counter = QueryCounter(budget=budget)
+        token = _active_counter.set(counter)
+        try:
+            response = await call_next(request)
+        finally:
+            _active_counter.reset(token)
+        response.headers["X-Query-Count"] = str(counter.count)
+        try:
+            counter.check()
+        except QueryBudgetExceeded as e:
+            return JSONResponse(
+                status_code=500,
+                content={"detail": str(e), "route": request.url.path, "statements": e.statements},
+            )
+        return response
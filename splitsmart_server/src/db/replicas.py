@@ -0,0 +1,90 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+logger = logging.getLogger(__name__)
+
+# --- Read Replica Routing ---
+# Read-only routes can be served by replicas of the primary database. Replicas
+# are used round-robin; one that fails a connection attempt or a health probe is
+# skipped until a later probe succeeds, and reads fall back to the primary when
+# none is available.
+
+
+class Replica:
+    def __init__(self, url, **engine_kwargs):
+        self.url = url
+        self.engine: AsyncEngine = create_async_engine(url, **engine_kwargs)
+        self.sessionmaker = async_sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+
+class ReplicaRouter:
+    """
+    Hands out sessions on healthy read replicas, round-robin.
+    With no replicas configured, `open_session` always returns None.
+    """
+    def __init__(self, urls: List, retry_after_seconds: float, **engine_kwargs):
+        self.replicas = [Replica(url, **engine_kwargs) for url in urls]
+        self.retry_after_seconds = retry_after_seconds
+        self._turns = itertools.cycle(range(len(self.replicas)))
+
+    def mark_down(self, replica: Replica) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s is unavailable, sending its reads elsewhere", replica.url)
+        replica.down_until = time.monotonic() + self.retry_after_seconds
+
+    def pick(self) -> Optional[Replica]:
+        """The next healthy replica in turn, or None if there is none."""
+        for _ in self.replicas:
+            replica = self.replicas[next(self._turns)]
+            if replica.healthy:
+                return replica
+        return None
+
+    async def open_session(self) -> Optional[AsyncSession]:
+        """
+        Opens a session on the next healthy replica, already connected so a dead
+        replica is noticed here rather than halfway through a route.
+        Returns None if no replica can be reached.
+        """
+        while (replica := self.pick()) is not None:
+            session = replica.sessionmaker()
+            try:
+                await session.connection()
+                return session
+            except (DBAPIError, OSError):
+                await session.close()
+                self.mark_down(replica)
+        return None
+
+    async def check_health(self) -> None:
+        """Probes every replica with `SELECT 1`, marking it up or down."""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as connection:
+                    await asyncio.wait_for(connection.execute(text("SELECT 1")), timeout=self.retry_after_seconds)
+            except (DBAPIError, OSError, asyncio.TimeoutError):
+                self.mark_down(replica)
+            else:
+                replica.down_until = 0.0
+
+    async def run_health_checks(self, interval_seconds: float) -> None:
+        """Runs `check_health` every `interval_seconds` until cancelled."""
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval_seconds)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
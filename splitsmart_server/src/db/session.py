@@ -1,19 +1,51 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from src.core.cache import TTLCache
 from src.core.config import settings
+from src.db.replicas import ReplicaRouter
+
+# DATABASE_URL is shared with Alembic, which uses the synchronous psycopg2 driver.
+# The application itself talks to the database through the matching asyncio driver.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
 
 # The engine is the entry point to the database. It's configured with our URL.
 # The pool_pre_ping checks connections for liveness before they are used.
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
+
+# SessionLocal is a factory for new AsyncSession objects.
+# expire_on_commit=False keeps loaded attributes usable after a commit, since an
+# AsyncSession cannot lazily reload them when a response is serialized.
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replicas for read-only routes (see `deps.get_read_db`).
+replica_router = ReplicaRouter(
+    [to_async_url(url) for url in settings.REPLICA_DATABASE_URLS],
+    retry_after_seconds=settings.REPLICA_HEALTH_CHECK_SECONDS,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
 
-# A SessionLocal class is a factory for new Session objects.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Ids of users who wrote in the last READ_YOUR_WRITES_SECONDS. Their reads go to
+# the primary so they see their own changes despite replication lag. This is per
+# worker, so it covers follow-up requests served by the same worker.
+recent_writers = TTLCache(maxsize=100_000, ttl_seconds=settings.READ_YOUR_WRITES_SECONDS)
 
 # This is a dependency for our API endpoints.
 # It creates a new session for each request, and ensures it's closed afterward.
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,8 +1,22 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class UserBalance(BaseModel):
     user_id: int
     email: str
     full_name: Optional[str] = None
-    balance: float # Positive means they are owed money, negative means they owe money
\ No newline at end of file
+    balance: float # Positive means they are owed money, negative means they owe money
+
+class GroupBalance(BaseModel):
+    group_id: int
+    group_name: str
+    currency: str
+    balance: float # The user's balance in this group, same sign convention as above
+
+class CurrencyBalance(BaseModel):
+    currency: str
+    balance: float # Sum of the user's balances in all their groups using this currency
+
+class UserNetBalance(BaseModel):
+    totals: List[CurrencyBalance] # One per currency, never converted or added across currencies
+    groups: List[GroupBalance]
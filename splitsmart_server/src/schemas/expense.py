@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 
-from src.db.models import SplitType # Import the Enum for use in the schema
+from src.db.models import SplitType, ExpenseStatus # Import the Enums for use in the schemas
 from .user import User # To show user details in responses
 
 # --- Schemas for Splits ---
@@ -12,8 +12,13 @@ class ExpenseSplitBase(BaseModel):
     user_id: int
     owed_amount: float = Field(..., gt=0, description="Amount must be positive")
 
-class ExpenseSplitCreate(ExpenseSplitBase):
-    pass
+# In requests, what a member owes is usually worked out by the server from the
+# expense's split_type, so each split only carries the input for that mode.
+class ExpenseSplitCreate(BaseModel):
+    user_id: int
+    owed_amount: Optional[float] = Field(None, gt=0, description="Exact amount, used when no split rule applies")
+    percentage: Optional[float] = Field(None, gt=0, le=100, description="Used by the by_percentage split type")
+    shares: Optional[float] = Field(None, gt=0, description="Used by the by_shares split type")
 
 class ExpenseSplit(ExpenseSplitBase):
     user: User # In responses, we want the full user object, not just the ID
@@ -32,10 +37,36 @@ class ExpenseBase(BaseModel):
 
 # --- Schema for Creating an Expense ---
 # This is the most complex schema. It's what the frontend sends to create an expense.
+# A line item for by_item splits, shared equally by the users who had it.
+class ExpenseItemCreate(BaseModel):
+    description: Optional[str] = Field(None, max_length=255)
+    amount: float = Field(..., gt=0)
+    user_ids: List[int] = Field(..., min_length=1)
+
 class ExpenseCreate(ExpenseBase):
     paid_by_id: int
-    # The frontend must provide the list of users and how much each one owes.
-    splits: List[ExpenseSplitCreate]
+    # Who takes part and the inputs for the split_type. For an equal split among
+    # the whole group this can be left empty.
+    splits: List[ExpenseSplitCreate] = []
+    items: List[ExpenseItemCreate] = []
+
+
+# --- Schemas for Bulk Import ---
+# One expense in a bulk upload. On top of what a single expense takes, an import
+# can carry the original date and category (e.g. history from another app).
+class ExpenseImportRow(ExpenseCreate):
+    expense_date: Optional[datetime] = None # Defaults to the time of the import
+    category: Optional[str] = None
+    notes: Optional[str] = None
+
+class ExpenseImportError(BaseModel):
+    row: int # 1-based position in the upload; for CSV the header is not counted
+    detail: str
+
+class ExpenseImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ExpenseImportError] = []
 
 
 # --- Schema for Responses ---
@@ -43,6 +74,7 @@ class ExpenseCreate(ExpenseBase):
 class Expense(ExpenseBase):
     id: int
     group_id: int
+    status: ExpenseStatus = ExpenseStatus.active
     paid_by: User # The full user object of the person who paid
     created_at: datetime
     splits: List[ExpenseSplit] = []
@@ -53,4 +85,36 @@ class Expense(ExpenseBase):
     model_config = ConfigDict(
         from_attributes=True,
         use_enum_values=True, # This tells Pydantic to convert Enums to their string values
-    )
\ No newline at end of file
+    )
+
+
+# --- Schemas for Normalized Responses ---
+# With `shape=normalized`, expenses refer to users by id only, and each user
+# appears once in a `users` side table instead of inside every expense and split.
+class ExpenseSplitNormalized(ExpenseSplitBase):
+    model_config = ConfigDict(from_attributes=True)
+
+class ExpenseNormalized(ExpenseBase):
+    id: int
+    group_id: int
+    status: ExpenseStatus = ExpenseStatus.active
+    paid_by_id: int
+    created_at: datetime
+    splits: List[ExpenseSplitNormalized] = []
+
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+
+class ExpenseListNormalized(BaseModel):
+    expenses: List[ExpenseNormalized]
+    users: List[User] # Everyone who paid for or has a split in one of the expenses
+
+
+# --- Schema for Listing Filters ---
+# Optional filters for a group's expense list. Unset fields do not filter.
+class ExpenseFilters(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    category: Optional[str] = None
+    paid_by_id: Optional[int] = None
+    participant_id: Optional[int] = None # Only expenses this user has a split in
+    status: Optional[ExpenseStatus] = None
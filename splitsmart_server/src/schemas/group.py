@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
+from datetime import datetime
 from typing import Optional, List
 from .user import User  # Import the User schema to use in responses
+from src.db.models import GroupStatus
 
 # --- Base Schema ---
 class GroupBase(BaseModel):
@@ -20,7 +22,23 @@ class GroupUpdate(GroupBase):
 class Group(GroupBase):
     id: int
     created_by_id: int
+    status: GroupStatus = GroupStatus.active
+    version: int = 0 # Changes whenever the group's members, expenses or payments do
     members: List[User] = [] # Return a list of full User objects
 
+    class Config:
+        from_attributes = True
+
+# --- Schema for the Group List Summary ---
+# One row of the home screen: no member list, just what the list shows.
+class GroupSummary(BaseModel):
+    id: int
+    name: str
+    status: GroupStatus
+    default_currency: str
+    member_count: int
+    last_activity_at: datetime
+    my_balance: float # Positive: the current user is owed money in this group
+
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+# --- Schema for API Responses ---
+class Notification(BaseModel):
+    id: int
+    type: Optional[str] = None # e.g. "expense.created", "payment.created", "member.added"
+    message: str
+    related_entity_id: Optional[int] = None # The expense, payment or group it is about
+    is_read: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# The unread badge
+class UnreadCount(BaseModel):
+    unread: int
+
+class NotificationsMarkedRead(BaseModel):
+    marked: int # How many notifications were unread until now
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+from src.db.models import BillUploadStatus
 
 # These are the exact models from your prototype.
 # They define the structure of the JSON we expect from the AI.
@@ -17,4 +19,31 @@ class TaxOrCharge(BaseModel):
 class BillScanResponse(BaseModel):
     line_items: List[LineItem]
     taxes_and_charges: List[TaxOrCharge]
-    grand_total: float
\ No newline at end of file
+    grand_total: float
+# One photo of a bill scanned in several pages
+class BillUploadPage(BaseModel):
+    id: int
+    page: int
+    status: BillUploadStatus
+    result: Optional[BillScanResponse] = Field(None, validation_alias="raw_scan_data")
+    error_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# A bill upload and its scan, as returned by `POST /scan-bill` and `POST /scan-bills`
+# and polled with `GET /bill-uploads/{id}`. `result` is set once `status` is
+# "completed" (or "review_needed": a bill of several pages some of which could not
+# be read); `error_message` says why when it is "failed". `pages` has each page's
+# own result, for bills scanned in several pages.
+class BillUpload(BaseModel):
+    id: int
+    status: BillUploadStatus
+    result: Optional[BillScanResponse] = Field(None, validation_alias="raw_scan_data")
+    error_message: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    pages: List[BillUploadPage] = []
+
+    class Config:
+        from_attributes = True
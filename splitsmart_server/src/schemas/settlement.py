@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from .payment import PaymentCreate
+
+class SettlementTransfer(BaseModel):
+    from_user_id: int # The member who should pay
+    to_user_id: int # The member who should receive the money
+    amount: float
+    # Present when the plan is requested with `as_payments=true`. The paying user
+    # can post it unchanged to `POST /groups/{group_id}/payments`.
+    payment: Optional[PaymentCreate] = None
+
+class SettlementPlan(BaseModel):
+    group_id: int
+    currency: str
+    transfers: List[SettlementTransfer]
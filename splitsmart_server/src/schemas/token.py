@@ -6,4 +6,6 @@ class Token(BaseModel):
     token_type: str
 
 class TokenData(BaseModel):
-    email: Optional[str] = None
\ No newline at end of file
+    sub: Optional[str] = None # The user's id (older tokens carry the email here)
+    email: Optional[str] = None
+    ver: Optional[int] = None # The user's token_version when the token was issued
\ No newline at end of file
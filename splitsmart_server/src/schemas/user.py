@@ -19,12 +19,15 @@ class UserCreate(UserBase):
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     full_name: Optional[str] = None
-    password: Optional[str] = None
+    password: Optional[str] = Field(None, min_length=8, max_length=72)
 
 # Schema for reading user data. Inherits from UserBase.
 # This is what we will return from the API. It should NEVER include the password.
 class User(UserBase):
     id: int
+    # Stored emails were validated when they were set. Checking them again with
+    # EmailStr on every response is slow, and users are embedded in many responses.
+    email: str = Field(..., json_schema_extra={"format": "email"})
 
     # This tells Pydantic to read the data even if it's not a dict,
     # but an ORM model (or any other arbitrary object with attributes).